@@ -1,6 +1,6 @@
 # Copyright (c) NiceBots.xyz
 # SPDX-License-Identifier: MIT
 
-from . import check_listings
+from . import benchmarks, check_listings, deabbreviate
 
-__all__ = ["check_listings"]
+__all__ = ["benchmarks", "check_listings", "deabbreviate"]
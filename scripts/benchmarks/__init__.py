@@ -0,0 +1,6 @@
+# Copyright (c) NiceBots.xyz
+# SPDX-License-Identifier: MIT
+
+from .__main__ import main
+
+__all__ = ["main"]
@@ -0,0 +1,66 @@
+# Copyright (c) NiceBots.xyz
+# SPDX-License-Identifier: MIT
+
+import argparse
+import sys
+from collections.abc import Callable, Mapping
+
+from termcolor import cprint
+
+from . import baseline, disambiguation, memory, stats, throughput
+
+BENCHMARKS: dict[str, Callable[[int], Mapping[str, float] | None]] = {
+    "disambiguation": disambiguation.run,
+    "memory": memory.run,
+    "stats": stats.run,
+    "throughput": throughput.run,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="Deabbreviator benchmarks",
+        description="Measure the speed of the deabbreviator translation paths",
+    )
+    parser.add_argument("benchmarks", nargs="*", choices=list(BENCHMARKS))
+    parser.add_argument("-n", "--number", type=int, default=2000, help="iterations per measurement")
+    parser.add_argument("--baseline", default=baseline.BASELINE_PATH, help="file the measurements are compared to")
+    parser.add_argument(
+        "--record", action="store_true", help="record the measurements as the baseline instead of comparing"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=baseline.DEFAULT_THRESHOLD,
+        help="largest accepted regression from the baseline, as a fraction",
+    )
+
+    args = parser.parse_args()
+    results: dict[str, float] = {}
+    for name in args.benchmarks or BENCHMARKS:
+        results.update(BENCHMARKS[name](args.number) or {})
+    if not results:
+        return
+    if args.record:
+        baseline.save(results, args.baseline)
+        cprint(f"Baseline saved to {args.baseline}", "green")
+        return
+    if not (saved := baseline.load(args.baseline)):
+        # nothing to compare to is a failed gate, not a passed one
+        cprint(f"No baseline at {args.baseline}, run with --record to record one", "red", attrs=["bold"])
+        sys.exit(1)
+    if missing := [name for name in results if name not in saved]:
+        cprint(f"{len(missing)} measurements have no baseline and were not compared, run with --record:", "yellow")
+        for name in missing:
+            cprint(f"  {name}", "yellow")
+    regressions = baseline.compare(saved, results, args.threshold)
+    if regressions:
+        cprint(f"{len(regressions)} regressions beyond {args.threshold:.0%}:", "red", attrs=["bold"])
+        for regression in regressions:
+            cprint(f"  {regression}", "red")
+        sys.exit(1)
+    cprint(f"No regression beyond {args.threshold:.0%}", "green")
+
+
+if __name__ == "__main__":
+    main()
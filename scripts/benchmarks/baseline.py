@@ -0,0 +1,57 @@
+# Copyright (c) NiceBots.xyz
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+import platform
+from collections.abc import Mapping
+from typing import Final
+
+BASELINE_PATH: Final = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD: Final = 0.25
+# metrics where a larger value is better, every other metric is a duration
+_HIGHER_IS_BETTER: Final = ("texts_per_s",)
+
+
+def load(path: str = BASELINE_PATH) -> dict[str, float]:
+    """Return the measurements saved to ``path``, or nothing if no baseline was recorded there."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["results"]
+    except FileNotFoundError:
+        return {}
+
+
+def save(results: Mapping[str, float], path: str = BASELINE_PATH) -> None:
+    """Record ``results`` as the baseline, keeping the saved measurements of benchmarks that were not run."""
+    data = {
+        # numbers only compare on the machine and interpreter they were measured on
+        "machine": f"{platform.node()} {platform.machine()} "
+        f"{platform.python_implementation()} {platform.python_version()}",
+        "results": {**load(path), **results},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(baseline: Mapping[str, float], results: Mapping[str, float], threshold: float) -> list[str]:
+    """Return a description of every measurement of ``results`` worse than its baseline by more than ``threshold``.
+
+    Measurements missing from either side are not compared.
+
+    :param threshold: The largest accepted regression, as a fraction of the baseline.
+    """
+    regressions: list[str] = []
+    for name, value in results.items():
+        if (before := baseline.get(name)) is None or before <= 0:
+            continue
+        change = value / before - 1
+        if name.endswith(_HIGHER_IS_BETTER):
+            change = -change
+        if change > threshold:
+            regressions.append(f"{name}: {before:.2f} -> {value:.2f} ({change:+.0%} worse)")
+    return regressions
+
+
+__all__ = ["BASELINE_PATH", "DEFAULT_THRESHOLD", "compare", "load", "save"]
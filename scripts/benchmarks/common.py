@@ -0,0 +1,23 @@
+# Copyright (c) NiceBots.xyz
+# SPDX-License-Identifier: MIT
+
+import timeit
+from collections.abc import Callable
+
+SAMPLES = [
+    "see you at 3 pm EST, pm me if you're late",
+    "btw idk if u saw it but the gm said 10 k views",
+    "send ss pls, ngl that u turn was wild",
+    "scored a td in the last drive, gg",
+    "k thx, ttyl",
+    "Hey there! I'll be late idk maybe 30min?",
+    "nothing to expand in this one at all",
+]
+
+
+def seconds_per_call(func: Callable[[], object], number: int) -> float:
+    """Return the best time of five runs of ``number`` calls, divided by ``number``."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+__all__ = ["SAMPLES", "seconds_per_call"]
@@ -0,0 +1,86 @@
+# Copyright (c) NiceBots.xyz
+# SPDX-License-Identifier: MIT
+# ruff: noqa: RUF001
+
+import random
+from typing import Final
+
+from src.extensions.deabbreviator.abbreviations import ABBREVIATIONS
+
+from .common import SAMPLES
+
+CORPUS_SIZE: Final = 200
+
+_PROSE: Final = (
+    "the meeting moved to thursday and nobody told the design team about the new deadline so we are scrambling to "
+    "finish the release notes before the build goes out tonight please check the staging server logs when you have "
+    "a minute because the cache keeps timing out under load and I could not reproduce it locally yesterday"
+)
+_WORDS: Final = _PROSE.split()
+_UNICODE: Final = (
+    "café",
+    "naïve",
+    "Ünïcödé",
+    "日本語",
+    "テスト",
+    "😂",
+    "🔥🔥",
+    "👍🏽",
+    "Привет",
+    "ｂｔｗ",
+    "ⓘⓓⓚ",
+    "𝐭𝐛𝐡",
+    "ｇｇ",
+    "ｌｏｌ",
+    "é",
+    "—",
+    "«ok»",
+)
+_CODE: Final = "```py\nprint('idk what u mean')\n```"
+
+
+def _sentence(rng: random.Random, words: int, abbreviations: list[str], density: float) -> str:
+    parts = [rng.choice(abbreviations) if rng.random() < density else rng.choice(_WORDS) for _ in range(words)]
+    return " ".join(parts).capitalize() + rng.choice((".", "!", "?", ",", ""))
+
+
+def _distinct(texts: list[str]) -> list[str]:
+    # every text of a corpus is distinct, so a first pass through the result cache only misses
+    return list(dict.fromkeys(texts))
+
+
+def corpora(size: int = CORPUS_SIZE, seed: int = 0) -> dict[str, list[str]]:
+    """Return reproducible corpora of ``size`` texts each, covering the inputs the bot sees.
+
+    - ``short_chat``: one-line chat messages with a few abbreviations.
+    - ``long_paste``: pasted text of a few thousand characters, with a code block.
+    - ``dense``: lines made of abbreviations only.
+    - ``free``: lines without a single abbreviation, which the pre-filter should reject.
+    - ``unicode``: lines mixing accents, emoji, scripts other than Latin and look-alike letters.
+    """
+    rng = random.Random(seed)  # noqa: S311 - reproducible corpora, nothing secret
+    abbreviations = sorted(ABBREVIATIONS)
+    short_chat = list(SAMPLES)
+    while len(short_chat) < size:
+        short_chat.append(_sentence(rng, rng.randint(3, 14), abbreviations, 0.2) + f" {len(short_chat)}")
+    long_paste = []
+    for i in range(size):
+        paragraphs = [_sentence(rng, rng.randint(20, 60), abbreviations, 0.05) for _ in range(rng.randint(12, 24))]
+        paragraphs.insert(rng.randint(0, len(paragraphs)), _CODE)
+        long_paste.append(f"{i}\n" + "\n\n".join(paragraphs))
+    dense = [f"{_sentence(rng, rng.randint(3, 14), abbreviations, 1.0)} {i}" for i in range(size)]
+    free = [f"{_sentence(rng, rng.randint(3, 14), abbreviations, 0.0)} {i}" for i in range(size)]
+    unicode = []
+    for i in range(size):
+        words = [rng.choice(_UNICODE) if rng.random() < 0.4 else rng.choice(_WORDS) for _ in range(rng.randint(3, 14))]
+        unicode.append(" ".join(words) + f" {rng.choice(abbreviations)} {i}")
+    return {
+        "short_chat": _distinct(short_chat[:size]),
+        "long_paste": _distinct(long_paste),
+        "dense": _distinct(dense),
+        "free": _distinct(free),
+        "unicode": _distinct(unicode),
+    }
+
+
+__all__ = ["CORPUS_SIZE", "corpora"]
@@ -0,0 +1,49 @@
+# Copyright (c) NiceBots.xyz
+# SPDX-License-Identifier: MIT
+
+from functools import partial
+
+from termcolor import cprint
+
+from src.extensions.deabbreviator.artifact import DictionaryArtifact, get_artifact
+from src.extensions.deabbreviator.context import ContextTable, load_context
+from src.extensions.deabbreviator.matchers import BACKENDS
+
+from .common import SAMPLES, seconds_per_call
+
+
+def _translate_samples(artifact: DictionaryArtifact) -> None:
+    for text in SAMPLES:
+        artifact.translate(text)
+
+
+def _keep_candidates(context: ContextTable, candidates: list[tuple[str, int, int]]) -> None:
+    keep = context.keep
+    for text, start, end in candidates:
+        keep(text, start, end)
+
+
+def run(number: int) -> None:
+    """Compare plain translation with context-aware translation of the sample messages."""
+    context = load_context()
+    for backend in BACKENDS:
+        plain = get_artifact(backend)
+        aware = plain.with_context(context)
+        candidates = [
+            (text, start, end)
+            for text in SAMPLES
+            for start, end in plain.matcher.finditer(text)
+            if text[start:end].lower() in context.rules
+        ]
+        plain_time = seconds_per_call(partial(_translate_samples, plain), number)
+        aware_time = seconds_per_call(partial(_translate_samples, aware), number)
+        overhead = aware_time - plain_time
+        keep_time = seconds_per_call(partial(_keep_candidates, context, candidates), number)
+        cprint(f"{backend}:", attrs=["bold"])
+        cprint(f"  plain            {plain_time / len(SAMPLES) * 1e6:8.2f} µs/message")
+        cprint(f"  disambiguated    {aware_time / len(SAMPLES) * 1e6:8.2f} µs/message")
+        cprint(f"  overhead         {overhead / max(len(candidates), 1) * 1e6:8.2f} µs/ambiguous candidate")
+        cprint(f"  rule lookup      {keep_time / max(len(candidates), 1) * 1e6:8.2f} µs/ambiguous candidate")
+
+
+__all__ = ["run"]
@@ -0,0 +1,87 @@
+# Copyright (c) NiceBots.xyz
+# SPDX-License-Identifier: MIT
+
+import gc
+import os
+import random
+import re
+import string
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from functools import partial
+
+from termcolor import cprint
+
+from src.extensions.deabbreviator.abbreviations import ABBREVIATIONS
+from src.extensions.deabbreviator.artifact import DictionaryArtifact, compile_artifact, dictionary_version
+from src.extensions.deabbreviator.compact import CompactDictionary
+from src.extensions.deabbreviator.matchers import BACKENDS
+
+from .common import SAMPLES, seconds_per_call
+
+# about the size of the default dictionary once community entries are merged
+DICTIONARY_SIZE = 50_000
+
+
+def community_dictionary(size: int = DICTIONARY_SIZE) -> dict[str, str]:
+    """Return the default dictionary padded with made-up entries up to ``size`` keys.
+
+    Like real slang, many abbreviations share an expansion: there are four keys for each distinct expansion.
+    """
+    rng = random.Random(0)  # noqa: S311 - reproducible made-up entries
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(2000)]
+    phrases = [" ".join(rng.choices(words, k=rng.randint(2, 4))) for _ in range(size // 4)]
+    abbreviations = dict(ABBREVIATIONS)
+    while len(abbreviations) < size:
+        key = "".join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(2, 7)))
+        abbreviations.setdefault(key, rng.choice(phrases))
+    return abbreviations
+
+
+def _measure(build: Callable[[], DictionaryArtifact]) -> tuple[DictionaryArtifact, int, float]:
+    # the dictionary is built inside the measurement, what the compiled artifact keeps of it counts
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    # or the second build would reuse the pattern compiled by the first one
+    re.purge()
+    tracemalloc.start()
+    artifact = build()
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return artifact, allocated, elapsed
+
+
+def _translate_samples(artifact: DictionaryArtifact) -> None:
+    for text in SAMPLES:
+        artifact.translate(text)
+
+
+def _report(name: str, artifact: DictionaryArtifact, allocated: int, elapsed: float, number: int) -> None:
+    translate_time = seconds_per_call(partial(_translate_samples, artifact), number)
+    cprint(f"{name}:", attrs=["bold"])
+    cprint(f"  private memory   {allocated / 1024 / 1024:8.2f} MiB/process")
+    cprint(f"  compile          {elapsed * 1e3:8.0f} ms")
+    cprint(f"  translate        {translate_time / len(SAMPLES) * 1e6:8.2f} µs/message")
+
+
+def run(number: int) -> None:
+    """Compare the memory every worker holds for a large dictionary with each backend."""
+    dictionary = partial(community_dictionary, DICTIONARY_SIZE)
+    cprint(f"{DICTIONARY_SIZE} abbreviations", attrs=["bold"])
+    for backend in BACKENDS:
+        _report(backend, *_measure(lambda backend=backend: compile_artifact(dictionary(), backend)), number)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "dictionary.dawg")
+        abbreviations = dictionary()
+        CompactDictionary.build(abbreviations, dictionary_version(abbreviations)).dump(path)
+        del abbreviations
+        # the pages of a mapped file are shared by every process that maps it, they are not private memory
+        _report("dawg, mapped", *_measure(lambda: compile_artifact(CompactDictionary.open(path), "dawg")), number)
+        cprint(f"  shared file      {os.path.getsize(path) / 1024 / 1024:8.2f} MiB")
+
+
+__all__ = ["community_dictionary", "run"]
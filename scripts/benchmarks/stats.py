@@ -0,0 +1,41 @@
+# Copyright (c) NiceBots.xyz
+# SPDX-License-Identifier: MIT
+
+from functools import partial
+
+from termcolor import cprint
+
+from src.extensions.deabbreviator.artifact import DictionaryArtifact, get_artifact
+from src.extensions.deabbreviator.stats import HitCounter
+
+from .common import SAMPLES, seconds_per_call
+
+
+def _translate_samples(artifact: DictionaryArtifact) -> None:
+    for text in SAMPLES:
+        artifact.translate(text)
+
+
+def _count_samples(artifact: DictionaryArtifact, counter: HitCounter) -> None:
+    for guild_id, text in enumerate(SAMPLES):
+        result = artifact.analyze(text)
+        counter.record(guild_id, result.keys)
+        result.output  # noqa: B018
+
+
+def run(number: int) -> None:
+    """Measure what counting abbreviation hits adds to translating the sample messages."""
+    artifact = get_artifact()
+    counter = HitCounter()
+    hits = sum(len(artifact.analyze(text).spans) for text in SAMPLES)
+    plain_time = seconds_per_call(partial(_translate_samples, artifact), number)
+    counted_time = seconds_per_call(partial(_count_samples, artifact, counter), number)
+    keys = ("btw", "idk", "btw")
+    record_time = seconds_per_call(partial(counter.record, 1, keys), number * 10) / len(keys)
+    cprint("hit statistics:", attrs=["bold"])
+    cprint(f"  translate        {plain_time / len(SAMPLES) * 1e6:8.2f} µs/message")
+    cprint(f"  analyze + count  {counted_time / len(SAMPLES) * 1e6:8.2f} µs/message")
+    cprint(f"  record           {record_time * 1e6:8.3f} µs/hit ({hits} hits in the samples)")
+
+
+__all__ = ["run"]
@@ -0,0 +1,166 @@
+# Copyright (c) NiceBots.xyz
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import math
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from termcolor import cprint
+
+from src import custom
+from src.config import config
+from src.extensions.deabbreviator.cache import NAMESPACE, cache_key
+from src.extensions.deabbreviator.main import Deabbreviator
+
+from .corpora import corpora
+
+type Results = dict[str, float]
+
+# like ``seconds_per_call``, the best of a few runs is kept, which filters out most of the noise of the machine
+REPEAT = 5
+
+
+def _summary(latencies: list[int]) -> dict[str, float]:
+    # latencies are in nanoseconds
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "texts_per_s": len(latencies) / (sum(latencies) / 1e9),
+        "p50_us": percentiles[49] / 1e3,
+        "p99_us": percentiles[98] / 1e3,
+    }
+
+
+def _best(summaries: list[dict[str, float]]) -> dict[str, float]:
+    return {
+        "texts_per_s": max(summary["texts_per_s"] for summary in summaries),
+        "p50_us": min(summary["p50_us"] for summary in summaries),
+        "p99_us": min(summary["p99_us"] for summary in summaries),
+    }
+
+
+def _passes(texts: list[str], number: int) -> int:
+    # every run makes at least ``number`` calls, going over the whole corpus each time
+    return max(1, math.ceil(number / len(texts)))
+
+
+def _time_sync(func: Callable[[str], object], texts: list[str], number: int) -> dict[str, float]:
+    for text in texts:
+        func(text)
+    summaries: list[dict[str, float]] = []
+    for _ in range(REPEAT):
+        latencies: list[int] = []
+        for _ in range(_passes(texts, number)):
+            for text in texts:
+                start = time.perf_counter_ns()
+                func(text)
+                latencies.append(time.perf_counter_ns() - start)
+        summaries.append(_summary(latencies))
+    return _best(summaries)
+
+
+async def _time_async(
+    func: Callable[[str], Awaitable[object]],
+    texts: list[str],
+    number: int,
+    before_pass: Callable[[], Awaitable[None]] | None = None,
+) -> dict[str, float]:
+    summaries: list[dict[str, float]] = []
+    for _ in range(REPEAT):
+        latencies: list[int] = []
+        for _ in range(_passes(texts, number)):
+            if before_pass is not None:
+                await before_pass()
+            for text in texts:
+                start = time.perf_counter_ns()
+                await func(text)
+                latencies.append(time.perf_counter_ns() - start)
+        summaries.append(_summary(latencies))
+    return _best(summaries)
+
+
+def _cache_configs() -> dict[str, tuple[str, dict[str, Any] | None]]:  # pyright: ignore[reportExplicitAny]
+    configs: dict[str, tuple[str, dict[str, Any] | None]] = {"memory": ("memory", None)}  # pyright: ignore[reportExplicitAny]
+    # the Redis server the bot is configured with, if any
+    cache = config.get("bot", {}).get("cache", {})
+    if cache.get("type") == "redis" and cache.get("redis"):
+        configs["redis"] = ("redis", cache["redis"])
+    return configs
+
+
+async def _measure_cache(
+    deabbreviator: Deabbreviator, texts_of: dict[str, list[str]], name: str, number: int
+) -> dict[str, dict[str, float]]:
+    cache = deabbreviator.bot.botkit_cache
+    measurements: dict[str, dict[str, float]] = {}
+    for corpus, texts in texts_of.items():
+        keys = [cache_key(deabbreviator.artifact.version, text) for text in texts]
+
+        async def forget(keys: list[str] = keys) -> None:
+            # only the entries of the corpus are deleted, never the rest of a shared cache
+            for key in keys:
+                await cache.delete(key, namespace=NAMESPACE)
+
+        translate = deabbreviator.async_translate_string
+        measurements[f"async_translate_string/{name}/miss/{corpus}"] = await _time_async(
+            translate, texts, number, forget
+        )
+        # the last pass left every text of the corpus cached
+        measurements[f"async_translate_string/{name}/hit/{corpus}"] = await _time_async(translate, texts, number)
+        await forget()
+    return measurements
+
+
+async def _measure(
+    cache_name: str,
+    cache_type: str,
+    cache_config: dict[str, Any] | None,  # pyright: ignore[reportExplicitAny]
+    texts_of: dict[str, list[str]],
+    number: int,
+) -> dict[str, dict[str, float]]:
+    # the bot is built on the loop that measures it: the connections of a Redis cache belong to the loop that opened
+    # them, and every cache configuration gets a loop of its own
+    bot = custom.Bot(cache_type=cache_type, cache_config=cache_config)
+    deabbreviator = Deabbreviator(bot, {"enabled": True, "reload_interval": 0})
+    measurements: dict[str, dict[str, float]] = {}
+    try:
+        if cache_name == "memory":
+            # the synchronous path never touches the cache
+            for corpus, texts in texts_of.items():
+                measurements[f"translate_string/{corpus}"] = _time_sync(deabbreviator.translate_string, texts, number)
+        measurements.update(await _measure_cache(deabbreviator, texts_of, cache_name, number))
+    finally:
+        deabbreviator.cog_unload()
+        await bot.botkit_cache.close()
+    return measurements
+
+
+def _report(name: str, summary: dict[str, float]) -> None:
+    cprint(
+        f"  {name:<48} {summary['texts_per_s']:10.0f} texts/s"
+        f"   p50 {summary['p50_us']:9.2f} µs   p99 {summary['p99_us']:9.2f} µs"
+    )
+
+
+def run(number: int) -> Results:
+    """Measure the throughput and latency of ``translate_string`` and ``async_translate_string`` on every corpus.
+
+    ``async_translate_string`` is measured with the memory cache, and with the Redis cache of the bot configuration
+    when there is one, both when every text misses the cache and when every text hits it.
+
+    :return: Every measurement, keyed by ``<path>/<corpus>/<metric>``.
+    """
+    results: Results = {}
+    texts_of = corpora()
+    for cache_name, (cache_type, cache_config) in _cache_configs().items():
+        measurements = asyncio.run(_measure(cache_name, cache_type, cache_config, texts_of, number))
+        cprint(f"{cache_name} cache:", attrs=["bold"])
+        for path, summary in measurements.items():
+            _report(path, summary)
+            results.update({f"{path}/{metric}": value for metric, value in summary.items()})
+    return results
+
+
+__all__ = ["run"]
@@ -0,0 +1,88 @@
+# Copyright (c) NiceBots.xyz
+# SPDX-License-Identifier: MIT
+
+import argparse
+import os
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import ExitStack
+from typing import IO
+
+from termcolor import cprint
+
+from src.extensions.deabbreviator.artifact import DictionaryArtifact, get_artifact
+from src.extensions.deabbreviator.context import load_context
+from src.extensions.deabbreviator.matchers import BACKENDS, DEFAULT_BACKEND
+
+from .pipeline import BLOCK_SIZE, BlockStats, count_block, read_blocks, run_ordered, translate_block
+
+
+def _open_inputs(stack: ExitStack, paths: list[str]) -> Iterator[IO[bytes]]:
+    for path in paths or ["-"]:
+        # opened one after the other, so any number of files can be given
+        yield sys.stdin.buffer if path == "-" else stack.enter_context(open(path, "rb"))  # noqa: SIM115
+
+
+def _artifact(args: argparse.Namespace) -> DictionaryArtifact:
+    artifact = get_artifact(args.backend)
+    return artifact.with_context(load_context()) if args.disambiguate else artifact
+
+
+def translate(args: argparse.Namespace) -> None:
+    with ExitStack() as stack:
+        output: IO[bytes] = stack.enter_context(open(args.output, "wb")) if args.output else sys.stdout.buffer
+        blocks = read_blocks(_open_inputs(stack, args.files), args.block_size)
+        for translated in run_ordered(translate_block, blocks, _artifact(args), text_field=args.field, jobs=args.jobs):
+            output.write(translated)
+        output.flush()
+
+
+def stats(args: argparse.Namespace) -> None:
+    total = BlockStats()
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        blocks = read_blocks(_open_inputs(stack, args.files), args.block_size)
+        for block_stats in run_ordered(count_block, blocks, _artifact(args), text_field=args.field, jobs=args.jobs):
+            total.update(block_stats)
+    elapsed = time.perf_counter() - start
+
+    matches = total.counts.total()
+    cprint("abbreviations:", attrs=["bold"])
+    for key, count in total.counts.most_common(args.top):
+        cprint(f"  {key:<12} {count:>12,} {count / matches:8.2%}")
+    cprint("totals:", attrs=["bold"])
+    cprint(f"  lines       {total.lines:>12,}")
+    cprint(f"  changed     {total.changed:>12,} {total.changed / (total.lines or 1):8.2%}")
+    cprint(f"  matches     {matches:>12,} ({len(total.counts):,} distinct abbreviations)")
+    cprint(f"  throughput  {total.bytes / 1e6 / elapsed:12.2f} MB/s ({total.bytes / 1e6:.1f} MB in {elapsed:.2f} s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="Deabbreviator",
+        description="Deabbreviate text or NDJSON offline, with the same engine as the bot",
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("files", nargs="*", help="input files, stdin if none or -")
+    common.add_argument("-b", "--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    common.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    common.add_argument("-f", "--field", default=None, help="read NDJSON and use this field of every record")
+    common.add_argument("-d", "--disambiguate", action="store_true", help="apply the context rules")
+    common.add_argument("--block-size", type=int, default=BLOCK_SIZE, help="bytes handed to a worker at once")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    translate_parser = subparsers.add_parser("translate", parents=[common], help="write the deabbreviated input")
+    translate_parser.add_argument("-o", "--output", default=None, help="output file, stdout if omitted")
+    translate_parser.set_defaults(func=translate)
+
+    stats_parser = subparsers.add_parser("stats", parents=[common], help="count abbreviations and measure throughput")
+    stats_parser.add_argument("-t", "--top", type=int, default=20, help="abbreviations to list")
+    stats_parser.set_defaults(func=stats)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
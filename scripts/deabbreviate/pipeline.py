@@ -0,0 +1,166 @@
+# Copyright (c) NiceBots.xyz
+# SPDX-License-Identifier: MIT
+
+import multiprocessing
+import re
+from collections import Counter, deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import IO, Final, cast
+
+import orjson
+
+from src.extensions.deabbreviator.artifact import DictionaryArtifact, install_artifact
+
+# bytes of input handed to a worker at once, large enough that pickling and scheduling stay negligible
+BLOCK_SIZE: Final = 1024 * 1024
+# an ASCII character that is neither part of a word nor of the spaces the context of a match is looked up across, the
+# same breaks as streaming.safe_boundary, which never fall inside a multi-byte UTF-8 character either
+_BREAK: Final = re.compile(rb"[^\w \t\x80-\xff]")
+
+_artifact: DictionaryArtifact | None = None
+
+
+def _init_worker(artifact: DictionaryArtifact) -> None:
+    global _artifact  # noqa: PLW0603
+    _artifact = artifact
+    install_artifact(artifact)
+
+
+def _texts(lines: list[str], text_field: str | None) -> Iterator[tuple[int, str, dict[str, object] | None]]:
+    """Yield the index, text and parsed record of every line holding a text, which is every line of plain text."""
+    for i, line in enumerate(lines):
+        if text_field is None:
+            yield i, line, None
+            continue
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            continue
+        if isinstance(record, dict) and isinstance(text := record.get(text_field), str):
+            yield i, text, record
+
+
+def translate_block(block: bytes, text_field: str | None = None) -> bytes:
+    """Translate every line of ``block``, or the ``text_field`` of every NDJSON record in it.
+
+    Lines that are not valid records are passed through unchanged, and so are bytes that are not valid UTF-8.
+    """
+    artifact = cast(DictionaryArtifact, _artifact)
+    lines = block.decode(errors="surrogateescape").split("\n")
+    for i, text, record in _texts(lines, text_field):
+        translated = artifact.translate(text)
+        if translated == text:
+            continue
+        if record is None:
+            lines[i] = translated
+        else:
+            record[text_field] = translated  # pyright: ignore[reportArgumentType]
+            lines[i] = orjson.dumps(record).decode()
+    return "\n".join(lines).encode(errors="surrogateescape")
+
+
+@dataclass(slots=True)
+class BlockStats:
+    """What :func:`count_block` found in some input.
+
+    Attributes
+    ----------
+        bytes (int): Size of the input.
+        lines (int): Lines that had text to analyze.
+        changed (int): Lines with at least one expansion.
+        counts (Counter[str]): Matches of each abbreviation.
+
+    """
+
+    bytes: int = 0
+    lines: int = 0
+    changed: int = 0
+    counts: Counter[str] = field(default_factory=Counter)
+
+    def update(self, other: "BlockStats") -> None:
+        self.bytes += other.bytes
+        self.lines += other.lines
+        self.changed += other.changed
+        self.counts.update(other.counts)
+
+
+def count_block(block: bytes, text_field: str | None = None) -> BlockStats:
+    """Count the abbreviations of every line of ``block``, or of the ``text_field`` of every NDJSON record in it."""
+    artifact = cast(DictionaryArtifact, _artifact)
+    stats = BlockStats(bytes=len(block))
+    counts = stats.counts
+    for _, text, _ in _texts(block.decode(errors="surrogateescape").split("\n"), text_field):
+        if not text:
+            continue
+        stats.lines += 1
+        result = artifact.analyze(text)
+        if result.spans:
+            counts.update(result.keys)
+            if result.changed:
+                stats.changed += 1
+    return stats
+
+
+def _safe_cut(block: bytes) -> int:
+    # searched from the end, so a block without any break is scanned once
+    if (match := _BREAK.search(block[::-1])) is None:
+        return len(block)
+    return len(block) - match.start()
+
+
+def read_blocks(files: Iterable[IO[bytes]], size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """Yield the content of ``files`` in blocks of at most ``size`` bytes, cut after a newline.
+
+    A line longer than ``size`` is cut after its last break, so no word or context of a match is split, and only a
+    block without any break is cut where it ends. A cut NDJSON record is no longer valid and passes through unchanged.
+    Each file ends its last block, so a block never holds lines of two files.
+    """
+    for file in files:
+        buffer = b""
+        while data := file.read(size - len(buffer)):
+            buffer += data
+            if len(buffer) < size:
+                continue
+            cut = buffer.rfind(b"\n") + 1 or _safe_cut(buffer)
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+        if buffer:
+            yield buffer
+
+
+def run_ordered[T](
+    func: Callable[[bytes, str | None], T],
+    blocks: Iterable[bytes],
+    artifact: DictionaryArtifact,
+    *,
+    text_field: str | None = None,
+    jobs: int = 1,
+) -> Iterator[T]:
+    """Apply ``func`` to every block on ``jobs`` processes and yield the results in input order.
+
+    At most two blocks per process are in flight, so memory stays bounded whatever the size of the input and however
+    far the slowest block lags behind.
+    """
+    if jobs <= 1:
+        _init_worker(artifact)
+        for block in blocks:
+            yield func(block, text_field)
+        return
+    # forking a process with helper threads is unsafe, prefer a fork server like the bot's batch pool
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    executor = ProcessPoolExecutor(
+        jobs, mp_context=multiprocessing.get_context(method), initializer=_init_worker, initargs=(artifact,)
+    )
+    pending: deque[Future[T]] = deque()
+    with executor:
+        for block in blocks:
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+            pending.append(executor.submit(func, block, text_field))
+        while pending:
+            yield pending.popleft().result()
+
+
+__all__ = ["BLOCK_SIZE", "BlockStats", "count_block", "read_blocks", "run_ordered", "translate_block"]
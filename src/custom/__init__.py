@@ -80,33 +80,36 @@ class ExtContext(bridge.BridgeExtContext):
         return r
 
 
+def make_cache(cache_type: str = "memory", cache_config: dict[str, Any] | None = None) -> aiocache.BaseCache:
+    """Create the botkit cache described by the ``bot.cache`` configuration.
+
+    Redis caches created with the same configuration see the same data through the server. A memory cache only holds
+    the entries of its own instance, so code sharing entries with the bot must use :attr:`Bot.botkit_cache` itself.
+    """
+    if cache_type == "redis":
+        if cache_config:
+            logger.info("Using Redis cache")
+            return aiocache.RedisCache(
+                endpoint=cache_config.get("host", "localhost"),
+                port=cache_config.get("port", 6379),
+                db=cache_config.get("db", 0),
+                password=cache_config.get("password"),
+                ssl=cache_config.get("ssl", False),
+                namespace="botkit",
+            )
+        logger.warning("Redis cache type specified but no configuration provided. Falling back to memory cache.")
+        return aiocache.SimpleMemoryCache(namespace="botkit")
+    logger.info("Using memory cache")
+    return aiocache.SimpleMemoryCache(namespace="botkit")
+
+
 class Bot(bridge.Bot):
     def __init__(
         self, *args: Any, cache_type: str = "memory", cache_config: dict[str, Any] | None = None, **options: Any
     ) -> None:
         self.translations: list[ExtensionTranslation] = options.pop("translations", [])
 
-        self.botkit_cache: aiocache.BaseCache
-        # Initialize cache based on type and config
-        if cache_type == "redis":
-            if cache_config:
-                logger.info("Using Redis cache")
-                self.botkit_cache = aiocache.RedisCache(
-                    endpoint=cache_config.get("host", "localhost"),
-                    port=cache_config.get("port", 6379),
-                    db=cache_config.get("db", 0),
-                    password=cache_config.get("password"),
-                    ssl=cache_config.get("ssl", False),
-                    namespace="botkit",
-                )
-            else:
-                logger.warning(
-                    "Redis cache type specified but no configuration provided. Falling back to memory cache."
-                )
-                self.botkit_cache = aiocache.SimpleMemoryCache(namespace="botkit")
-        else:
-            logger.info("Using memory cache")
-            self.botkit_cache = aiocache.SimpleMemoryCache(namespace="botkit")
+        self.botkit_cache: aiocache.BaseCache = make_cache(cache_type, cache_config)
 
         super().__init__(*args, **options)
 
@@ -184,4 +187,4 @@ if TYPE_CHECKING:  # temp fix for https://github.com/Pycord-Development/pycord/p
     type Context = ExtContext | ApplicationContext
     ...  # for some reason, this makes pycharm happy
 
-__all__ = ["ApplicationContext", "Bot", "Context", "ExtContext"]
+__all__ = ["ApplicationContext", "Bot", "Context", "ExtContext", "make_cache"]
@@ -0,0 +1,23 @@
+# Copyright (c) NiceBots
+# SPDX-License-Identifier: MIT
+
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "guild" ADD "dictionary_version" INT NOT NULL DEFAULT 0;
+CREATE TABLE IF NOT EXISTS "guild_abbreviation" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "abbreviation" VARCHAR(32) NOT NULL,
+    "expansion" VARCHAR(256) NOT NULL,
+    "guild_id" BIGINT NOT NULL REFERENCES "guild" ("id") ON DELETE CASCADE,
+    CONSTRAINT "uid_guild_abbre_guild_i_5c1f3e" UNIQUE ("guild_id", "abbreviation")
+);
+COMMENT ON TABLE "guild_abbreviation" IS 'Guild abbreviation model.';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "guild" DROP COLUMN "dictionary_version";
+DROP TABLE IF EXISTS "guild_abbreviation";"""
@@ -0,0 +1,18 @@
+# Copyright (c) NiceBots
+# SPDX-License-Identifier: MIT
+
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "channel" (
+    "id" BIGSERIAL NOT NULL PRIMARY KEY,
+    "auto_deabbreviate" BOOL NOT NULL DEFAULT False
+);
+COMMENT ON TABLE "channel" IS 'Channel model.';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "channel";"""
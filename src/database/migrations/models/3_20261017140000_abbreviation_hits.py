@@ -0,0 +1,21 @@
+# Copyright (c) NiceBots
+# SPDX-License-Identifier: MIT
+
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "abbreviation_hit" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "guild_id" BIGINT NOT NULL,
+    "abbreviation" VARCHAR(32) NOT NULL,
+    "count" BIGINT NOT NULL DEFAULT 0,
+    CONSTRAINT "uid_abbreviatio_guild_i_8e2b71" UNIQUE ("guild_id", "abbreviation")
+);
+COMMENT ON TABLE "abbreviation_hit" IS 'Abbreviation hit model.';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "abbreviation_hit";"""
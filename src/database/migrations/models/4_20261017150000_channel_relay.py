@@ -0,0 +1,14 @@
+# Copyright (c) NiceBots
+# SPDX-License-Identifier: MIT
+
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "channel" ADD "relay" BOOL NOT NULL DEFAULT False;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "channel" DROP COLUMN "relay";"""
@@ -1,10 +1,16 @@
 # Copyright (c) NiceBots
 # SPDX-License-Identifier: MIT
 
+from .abbreviation_hit import AbbreviationHit
+from .channel import Channel
 from .guild import Guild
+from .guild_abbreviation import GuildAbbreviation
 from .user import User
 
 __all__ = [
+    "AbbreviationHit",
+    "Channel",
     "Guild",
+    "GuildAbbreviation",
     "User",
 ]
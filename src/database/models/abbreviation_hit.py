@@ -0,0 +1,32 @@
+# Copyright (c) NiceBots
+# SPDX-License-Identifier: MIT
+
+from tortoise import fields
+from tortoise.models import Model
+
+
+class AbbreviationHit(Model):
+    """Abbreviation hit model.
+
+    Counts how many times an abbreviation was expanded in a guild.
+
+    Attributes
+    ----------
+        id (int): Row ID.
+        guild_id (int): Discord guild ID, ``0`` for direct messages and user installs outside of guilds.
+        abbreviation (str): The lowercase abbreviation.
+        count (int): How many times the abbreviation was expanded.
+
+    """
+
+    id: fields.Field[int] = fields.IntField(pk=True)
+    guild_id: fields.Field[int] = fields.BigIntField()
+    abbreviation: fields.Field[str] = fields.CharField(max_length=32)
+    count: fields.Field[int] = fields.BigIntField(default=0)
+
+    class Meta:  # pyright: ignore[reportIncompatibleVariableOverride]
+        table = "abbreviation_hit"
+        unique_together = (("guild_id", "abbreviation"),)
+
+
+__all__ = ["AbbreviationHit"]
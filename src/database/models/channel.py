@@ -0,0 +1,26 @@
+# Copyright (c) NiceBots
+# SPDX-License-Identifier: MIT
+
+from tortoise import fields
+from tortoise.models import Model
+
+
+class Channel(Model):
+    """Channel model.
+
+    Represents a channel in the database.
+
+    Attributes
+    ----------
+        id (int): Discord channel ID.
+        auto_deabbreviate (bool): Whether every message sent in the channel is deabbreviated automatically.
+        relay (bool): Whether automatic translations are reposted under the name of the author instead of as replies.
+
+    """
+
+    id: fields.Field[int] = fields.BigIntField(pk=True)
+    auto_deabbreviate: fields.Field[bool] = fields.BooleanField(default=False)
+    relay: fields.Field[bool] = fields.BooleanField(default=False)
+
+
+__all__ = ["Channel"]
@@ -15,10 +15,12 @@ class Guild(Model):
         id (int): Discord user ID.
         free_credits (int): Amount of free credits the user has.
         premium_credits (int): Amount of premium credits the user has.
+        dictionary_version (int): Bumped every time the guild's custom abbreviations change.
 
     """
 
     id: fields.Field[int] = fields.BigIntField(pk=True)
+    dictionary_version: fields.Field[int] = fields.IntField(default=0)
 
 
 __all__ = ["Guild"]
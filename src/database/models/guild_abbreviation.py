@@ -0,0 +1,39 @@
+# Copyright (c) NiceBots
+# SPDX-License-Identifier: MIT
+
+from typing import TYPE_CHECKING
+
+from tortoise import fields
+from tortoise.models import Model
+
+if TYPE_CHECKING:
+    from .guild import Guild
+
+
+class GuildAbbreviation(Model):
+    """Guild abbreviation model.
+
+    Represents a custom abbreviation a guild added on top of the default dictionary.
+
+    Attributes
+    ----------
+        id (int): Row ID.
+        guild (Guild): The guild the abbreviation belongs to.
+        abbreviation (str): The lowercase abbreviation.
+        expansion (str): What the abbreviation expands to.
+
+    """
+
+    id: fields.Field[int] = fields.IntField(pk=True)
+    guild: fields.ForeignKeyRelation["Guild"] = fields.ForeignKeyField(
+        "models.Guild", related_name="abbreviations", on_delete=fields.CASCADE
+    )
+    abbreviation: fields.Field[str] = fields.CharField(max_length=32)
+    expansion: fields.Field[str] = fields.CharField(max_length=256)
+
+    class Meta:  # pyright: ignore[reportIncompatibleVariableOverride]
+        table = "guild_abbreviation"
+        unique_together = (("guild", "abbreviation"),)
+
+
+__all__ = ["GuildAbbreviation"]
@@ -15,10 +15,12 @@ class User(Model):
         id (int): Discord user ID.
         free_credits (int): Amount of free credits the user has.
         premium_credits (int): Amount of premium credits the user has.
+        preferences (int): Bitmask of the categories of abbreviations the user wants left as written.
 
     """
 
     id: fields.Field[int] = fields.BigIntField(pk=True)
+    preferences: fields.Field[int] = fields.IntField(default=0)
 
 
 __all__ = ["User"]
@@ -1,5 +1,16 @@
 # Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
 
-from .main import default, setup
+from .api import setup_webserver
+from .batch import analyze_many, async_analyze_many, async_translate_many, translate_many
+from .main import default, schema, setup
 
-__all__ = ("default", "setup")
+__all__ = (
+    "analyze_many",
+    "async_analyze_many",
+    "async_translate_many",
+    "default",
+    "schema",
+    "setup",
+    "setup_webserver",
+    "translate_many",
+)
@@ -0,0 +1,47 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import os
+import re
+from typing import Final
+
+import yaml
+
+from src.log import logger as main_logger
+
+logger = main_logger.getChild("deabbreviator")
+
+DICTIONARIES_PATH: Final = os.path.join(os.path.dirname(__file__), "dictionaries")
+DEFAULT_DICTIONARY_PATH: Final = os.path.join(DICTIONARIES_PATH, "default.yml")
+
+# matchers only ever see whole \w+ tokens, any other key could never match
+ABBREVIATION_PATTERN: Final = re.compile(r"\w{1,32}")
+
+
+def is_valid_abbreviation(abbreviation: str) -> bool:
+    return ABBREVIATION_PATTERN.fullmatch(abbreviation) is not None
+
+
+def load_dictionary(path: str) -> dict[str, str]:
+    """Load an abbreviation dictionary file, skipping entries that could never match."""
+    with open(path, encoding="utf-8") as f:
+        data: dict[str, str] = yaml.safe_load(f) or {}
+    entries: dict[str, str] = {}
+    for key, value in data.items():
+        key = str(key).lower()  # noqa: PLW2901
+        if not is_valid_abbreviation(key):
+            logger.warning(f"Skipping invalid abbreviation {key!r} in {path}")
+            continue
+        entries[key] = str(value)
+    return entries
+
+
+ABBREVIATIONS: Final = load_dictionary(DEFAULT_DICTIONARY_PATH)
+
+__all__ = [
+    "ABBREVIATIONS",
+    "ABBREVIATION_PATTERN",
+    "DEFAULT_DICTIONARY_PATH",
+    "DICTIONARIES_PATH",
+    "is_valid_abbreviation",
+    "load_dictionary",
+]
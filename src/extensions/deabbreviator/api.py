@@ -0,0 +1,273 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import hmac
+import weakref
+from collections import Counter
+from collections.abc import AsyncIterable, AsyncIterator, Sequence
+from typing import Any, Final, final
+
+import aiocache
+import discord
+import orjson
+from quart import Quart, Response, request
+
+from src.config import config as global_config
+from src.custom import make_cache
+from src.log import logger as main_logger
+
+from .artifact import configured_artifact, get_artifact, install_artifact
+from .batch import INLINE_LIMIT, async_analyze_many
+from .cache import COMPRESS_THRESHOLD, MAX_CACHED_LENGTH, cached_translations
+from .matchers import DEFAULT_BACKEND
+
+NDJSON: Final = "application/x-ndjson"
+# lines of a stream translated together, enough to amortize a cache round trip without delaying the first results
+STREAM_BATCH: Final = 64
+
+logger = main_logger.getChild("deabbreviator")
+
+# the cache of the bot running in this process, if any, see share_cache
+_bot_cache: aiocache.BaseCache | None = None
+
+
+def share_cache(cache: aiocache.BaseCache | None) -> None:
+    """Make the HTTP API read and write the result cache of the bot through ``cache``, its own instance.
+
+    A memory cache only holds the entries of its own instance, so an API configured with the same cache would
+    otherwise share nothing with the bot.
+    """
+    global _bot_cache  # noqa: PLW0603
+    _bot_cache = cache
+
+
+@final
+class Slot:
+    """A request slot taken from a :class:`ClientLimiter`, given back exactly once.
+
+    The slot is given back by :meth:`release`, or else when it is garbage collected: a streamed response dropped
+    before it was sent, for instance because the client disconnected first, never runs the code that would release it.
+    """
+
+    __slots__ = ("__weakref__", "_release")
+
+    def __init__(self, limiter: "ClientLimiter", client: str) -> None:
+        self._release = weakref.finalize(self, limiter.release, client)
+
+    def release(self) -> None:
+        self._release()
+
+
+@final
+class ClientLimiter:
+    """Cap how many requests each client may have in flight at once.
+
+    Slots are counted per client key and held by the response until it is complete, which for streamed responses is
+    when the last line has been sent or the response is dropped.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.active: Counter[str] = Counter()
+
+    def acquire(self, client: str) -> Slot | None:
+        """Take a slot for ``client``, or return ``None`` if all of its slots are taken."""
+        if self.active[client] >= self.limit:
+            return None
+        self.active[client] += 1
+        return Slot(self, client)
+
+    def release(self, client: str) -> None:
+        self.active[client] -= 1
+        if self.active[client] <= 0:
+            del self.active[client]
+
+
+def _json(data: object, status: int = 200) -> Response:
+    return Response(orjson.dumps(data), status=status, mimetype="application/json")
+
+
+def _error(message: str, status: int) -> Response:
+    return _json({"error": message}, status)
+
+
+def _error_line(message: str) -> bytes:
+    return orjson.dumps({"error": message}) + b"\n"
+
+
+async def iter_lines(body: AsyncIterable[bytes], max_line: int) -> AsyncIterator[bytes | None]:
+    """Split a request body into lines as it arrives.
+
+    Lines longer than ``max_line`` bytes are never held in full, a single ``None`` is yielded in their place.
+    """
+    buffer = b""
+    skipping = False
+    async for data in body:
+        buffer += data
+        *complete, buffer = buffer.split(b"\n")
+        for line in complete:
+            if skipping:
+                # the end of the line already answered as too long
+                skipping = False
+                continue
+            yield line
+        if len(buffer) > max_line:
+            if not skipping:
+                yield None
+            buffer, skipping = b"", True
+    if not skipping:
+        yield buffer
+
+
+@final
+class DeabbreviatorApi:
+    """HTTP endpoints translating texts with the bot's artifact and result cache.
+
+    The artifact is built from the same configuration as the bot's, and looked up again on every request, so
+    dictionary reloads installed by the bot apply here as well. Requests need one of the ``api_tokens`` and are counted
+    per token, unless the API is made ``api_public``, where they are counted per address.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:  # pyright: ignore[reportExplicitAny]
+        install_artifact(configured_artifact(config))
+        self.backend: str = config.get("backend", DEFAULT_BACKEND)
+        self.tokens: Sequence[str] = config.get("api_tokens") or ()
+        self.public: bool = config.get("api_public", False)
+        self.max_batch: int = config.get("api_max_batch", 1000)
+        self.max_length: int = config.get("api_max_length", 20000)
+        self.cache_max_length: int = config.get("cache_max_length", MAX_CACHED_LENGTH)
+        self.threshold: int = config.get("cache_compress_threshold", COMPRESS_THRESHOLD)
+        self.limiter = ClientLimiter(config.get("api_concurrency", 4))
+        self._cache: aiocache.BaseCache | None = None
+
+    @property
+    def cache(self) -> aiocache.BaseCache:
+        """The cache of the bot running in this process, or a cache configured like it when the bot runs elsewhere."""
+        if _bot_cache is not None:
+            return _bot_cache
+        if self._cache is None:
+            # without the bot, only a redis server holds entries it wrote
+            cache_config: dict[str, Any] = global_config.get("bot", {}).get("cache", {})  # pyright: ignore[reportExplicitAny]
+            self._cache = make_cache(cache_config.get("type", "memory"), cache_config.get("redis"))
+        return self._cache
+
+    def client_key(self) -> str | None:
+        """Return the key the current request is limited by, or ``None`` if it is not authorized."""
+        if not self.tokens:
+            return (request.remote_addr or "unknown") if self.public else None
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not any(hmac.compare_digest(token, t) for t in self.tokens):
+            return None
+        return token
+
+    def admit(self) -> tuple[Slot, None] | tuple[None, Response]:
+        """Take a slot for the current request, or return the response refusing it."""
+        client = self.client_key()
+        if client is None:
+            return None, _error("unauthorized", 401)
+        if (slot := self.limiter.acquire(client)) is None:
+            return None, _error("too many concurrent requests", 429)
+        return slot, None
+
+    async def translate(self, texts: Sequence[str]) -> list[tuple[str, bool]]:
+        """Translate ``texts``, returning each translation and whether a match changed it."""
+        if sum(map(len, texts)) > INLINE_LIMIT:
+            # too large to hold the event loop, and too large to be worth caching
+            results = await async_analyze_many(texts, self.backend)
+        else:
+            artifact = get_artifact(self.backend)
+            results = await cached_translations(self.cache, artifact, texts, self.cache_max_length, self.threshold)
+        return [(text, False) if r is None else (r[0], True) for text, r in zip(texts, results, strict=True)]
+
+    def parse_batch(self, data: bytes) -> list[str] | Response:
+        """Return the texts of a batch request, or the response rejecting it."""
+        try:
+            body = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return _error("invalid json", 400)
+        texts = body.get("texts") if isinstance(body, dict) else None
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):  # pyright: ignore[reportUnknownVariableType]
+            return _error('expected {"texts": [string, ...]}', 400)
+        if len(texts) > self.max_batch:  # pyright: ignore[reportUnknownArgumentType]
+            return _error(f"at most {self.max_batch} texts per request", 413)
+        if any(len(text) > self.max_length for text in texts):  # pyright: ignore[reportUnknownArgumentType, reportUnknownVariableType]
+            return _error(f"texts are limited to {self.max_length} characters", 413)
+        return texts  # pyright: ignore[reportUnknownVariableType]
+
+    def parse_line(self, line: bytes | None) -> str | bytes:
+        """Return the text of a stream line, or the encoded error line answering it."""
+        if line is None:
+            return _error_line(f"limited to {self.max_length} characters")
+        try:
+            item = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            return _error_line("invalid json")
+        text = item.get("text") if isinstance(item, dict) else None
+        if not isinstance(text, str):
+            return _error_line('expected {"text": string}')
+        if len(text) > self.max_length:
+            return _error_line(f"limited to {self.max_length} characters")
+        return text
+
+    async def encode_batch(self, batch: Sequence[str | bytes]) -> bytes:
+        texts = [item for item in batch if isinstance(item, str)]
+        results = iter(await self.translate(texts) if texts else ())
+        out: list[bytes] = []
+        for item in batch:
+            if isinstance(item, str):
+                a, changed = next(results)
+                out.append(orjson.dumps({"text": a, "changed": changed}) + b"\n")
+            else:
+                # errors are answered in place so results stay aligned with the request lines
+                out.append(item)
+        return b"".join(out)
+
+    async def stream(self, slot: Slot, body: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        """Translate a body of NDJSON lines, giving ``slot`` back once the last line is answered or the stream closed.
+
+        A stream dropped before it started gives the slot back when it is garbage collected, see :class:`Slot`.
+        """
+        try:
+            batch: list[str | bytes] = []
+            # the longest line a valid text can take, with every character escaped as \uXXXX
+            async for line in iter_lines(body, self.max_length * 6 + 64):
+                if line is None or line.strip():
+                    batch.append(self.parse_line(line))
+                if len(batch) >= STREAM_BATCH:
+                    yield await self.encode_batch(batch)
+                    batch = []
+            if batch:
+                yield await self.encode_batch(batch)
+        finally:
+            slot.release()
+
+    async def translate_batch(self) -> Response:
+        slot, refused = self.admit()
+        if slot is None:
+            return refused  # pyright: ignore[reportReturnType]
+        try:
+            texts = self.parse_batch(await request.get_data())
+            if isinstance(texts, Response):
+                return texts
+            results = await self.translate(texts)
+            return _json({"translations": [a for a, _ in results], "changed": [changed for _, changed in results]})
+        finally:
+            slot.release()
+
+    async def translate_stream(self) -> Response:
+        slot, refused = self.admit()
+        if slot is None:
+            return refused  # pyright: ignore[reportReturnType]
+        # the body is handed over directly, the request context is gone by the time the response is streamed; only
+        # the stream holds the slot from here on, so it is given back with the stream whether or not it is ever sent
+        return Response(self.stream(slot, request.body), mimetype=NDJSON)
+
+
+def setup_webserver(app: Quart, bot: discord.Bot, config: dict[str, Any]) -> None:  # pyright: ignore[reportExplicitAny]  # noqa: ARG001
+    api = DeabbreviatorApi(config)
+    if not api.tokens and not api.public:
+        logger.warning("The deabbreviator HTTP API has no api_tokens and refuses every request, see api_public")
+    app.add_url_rule("/deabbreviator/translate", view_func=api.translate_batch, methods=["POST"])
+    app.add_url_rule("/deabbreviator/stream", view_func=api.translate_stream, methods=["POST"])
+
+
+__all__ = ["ClientLimiter", "DeabbreviatorApi", "Slot", "iter_lines", "setup_webserver", "share_cache"]
@@ -0,0 +1,414 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import hashlib
+import os
+import pickle
+from collections import ChainMap
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass, replace
+from typing import Any, Final, Self, final, override
+
+from src.log import logger as main_logger
+
+from .abbreviations import ABBREVIATIONS, DEFAULT_DICTIONARY_PATH, load_dictionary
+from .compact import CompactDictionary
+from .context import ContextTable, load_context
+from .folding import fold
+from .lexer import segments
+from .matchers import BACKENDS, DEFAULT_BACKEND, DawgMatcher, Matcher, get_matcher
+from .prefilter import might_match
+from .result import TranslationResult
+
+logger = main_logger.getChild("deabbreviator")
+
+ARTIFACT_FORMAT: Final = 3
+
+
+def dictionary_version(abbreviations: Mapping[str, str]) -> str:
+    """Return a short, stable fingerprint of a dictionary's content."""
+    if isinstance(abbreviations, CompactDictionary) and abbreviations.version:
+        # computed when it was built, walking every key back out of the buffer would take much longer
+        return abbreviations.version
+    if isinstance(abbreviations, ChainMap):
+        # overrides layered on a compact dictionary, fingerprinted layer by layer for the same reason
+        layers = "\0".join(dictionary_version(layer) for layer in abbreviations.maps)
+        return hashlib.blake2b(layers.encode(), digest_size=8).hexdigest()
+    if isinstance(abbreviations, _Without):
+        removed = "\0".join(sorted(abbreviations.removed))
+        layers = f"{dictionary_version(abbreviations.abbreviations)}\0-\0{removed}"
+        return hashlib.blake2b(layers.encode(), digest_size=8).hexdigest()
+    digest = hashlib.blake2b(digest_size=8)
+    for key, value in sorted(abbreviations.items()):
+        digest.update(f"{key}\0{value}\0".encode())
+    return digest.hexdigest()
+
+
+def _versioned(version: str, context: ContextTable | None) -> str:
+    # the same dictionary gives different results with and without context rules
+    return f"{version}+{context.version}" if context is not None else version
+
+
+def case_variants(abbreviations: Mapping[str, str]) -> dict[str, str]:
+    """Precompute the expansion of the lowercase, Capitalized and UPPER form of every key.
+
+    UPPER is written last so that keys with a single cased letter (``u``, ``b4``) resolve to the uppercase expansion,
+    exactly like ``str.isupper`` would decide at match time.
+    """
+    expansions: dict[str, str] = {}
+    for key, value in abbreviations.items():
+        key = key.lower()  # noqa: PLW2901
+        expansions[key] = value
+        expansions[key.capitalize()] = value.capitalize()
+        expansions[key.upper()] = value.upper()
+    return expansions
+
+
+@final
+class CaseVariants(Mapping[str, str]):
+    """The mapping :func:`case_variants` returns, computed on lookup instead of stored.
+
+    Used with compact dictionaries, where storing three forms of every key would defeat the purpose.
+    """
+
+    def __init__(self, abbreviations: Mapping[str, str]) -> None:
+        self.abbreviations = abbreviations
+
+    @override
+    def __getitem__(self, word: str) -> str:
+        lower = word.lower()
+        value = self.abbreviations[lower]
+        # in the precedence of case_variants, where UPPER overwrites Capitalized which overwrites lowercase
+        if word == lower.upper():
+            return value.upper()
+        if word == lower.capitalize():
+            return value.capitalize()
+        if word == lower:
+            return value
+        raise KeyError(word)
+
+    @override
+    def __iter__(self) -> Iterator[str]:
+        for key in self.abbreviations:
+            yield from dict.fromkeys((key, key.capitalize(), key.upper()))
+
+    @override
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+@final
+class _Without(Mapping[str, str]):
+    # a compact dictionary, or overrides layered on one, without some of its keys
+    def __init__(self, abbreviations: Mapping[str, str], removed: frozenset[str]) -> None:
+        self.abbreviations = abbreviations
+        self.removed = removed
+
+    @override
+    def __getitem__(self, key: str) -> str:
+        if key in self.removed:
+            raise KeyError(key)
+        return self.abbreviations[key]
+
+    @override
+    def __iter__(self) -> Iterator[str]:
+        return (key for key in self.abbreviations if key not in self.removed)
+
+    @override
+    def __len__(self) -> int:
+        return len(self.abbreviations) - sum(key in self.abbreviations for key in self.removed)
+
+
+def _remove(base: Mapping[str, str], removed: frozenset[str]) -> Mapping[str, str]:
+    if isinstance(base, dict):
+        return {key: value for key, value in base.items() if key not in removed}
+    return _Without(base, removed)
+
+
+def _layer(base: Mapping[str, str], overrides: Mapping[str, str]) -> Mapping[str, str]:
+    if isinstance(base, dict):
+        return {**base, **overrides}
+    # a compact dictionary stays shared, the overrides are looked up in front of it
+    return ChainMap(dict(overrides), base)
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class DictionaryArtifact:
+    """Everything needed to translate a text, compiled once and shared read-only.
+
+    Attributes
+    ----------
+        backend (str): Name of the matcher backend.
+        version (str): Fingerprint of the dictionary the artifact was compiled from.
+        abbreviations (Mapping[str, str]): The source dictionary.
+        matcher (Matcher): The compiled matcher.
+        expansions (Mapping[str, str]): Expansion of each lowercase, Capitalized and UPPER surface form.
+        context (ContextTable | None): Rules that leave ambiguous abbreviations alone in some contexts.
+        folding (bool): Whether look-alikes are folded to ASCII before matching, only when every key is ASCII so that
+            folding can never hide a key.
+
+    """
+
+    backend: str
+    version: str
+    abbreviations: Mapping[str, str]
+    matcher: Matcher
+    expansions: Mapping[str, str]
+    context: ContextTable | None = None
+    folding: bool = True
+
+    def expand(self, word: str) -> str:
+        try:
+            return self.expansions[word]
+        except KeyError:
+            # mixed case such as "bTw" or "BTw", only the first letter decides
+            lower = word.lower()
+            return self.expansions[lower.capitalize() if word[0].isupper() else lower]
+
+    def might_match(self, text: str) -> bool:
+        """Return ``False`` when ``text`` definitely contains nothing to expand."""
+        return might_match(self.matcher.keys, self.fold(text))
+
+    def fold(self, text: str) -> str:
+        """Return ``text`` with its look-alikes folded to ASCII, or ``text`` itself if there is nothing to fold."""
+        return fold(text) if self.folding else text
+
+    def translate_segment(self, text: str) -> str:
+        """Translate ``text`` as prose, without looking for code, links or mentions."""
+        folded = self.fold(text)
+        if not might_match(self.matcher.keys, folded):
+            return text
+        if folded is not text:
+            return TranslationResult(text, tuple(self._finditer(folded)), self.expand, folded).output
+        if self.context is not None:
+            return self.matcher.sub(self.expand, text, self.context.keep)
+        return self.matcher.sub(self.expand, text)
+
+    def translate(self, text: str) -> str:
+        """Translate ``text``, leaving code, links, mentions, custom emoji and timestamps untouched."""
+        folded = self.fold(text)
+        if not might_match(self.matcher.keys, folded):
+            return text
+        if folded is not text:
+            return self._analyze(text, folded).output
+        parts: list[str] = []
+        for start, end, translatable in segments(text):
+            if not translatable:
+                parts.append(text[start:end])
+            elif self.context is not None:
+                parts.append(self.matcher.sub(self.expand, text[start:end], self.context.keep))
+            else:
+                parts.append(self.matcher.sub(self.expand, text[start:end]))
+        return parts[0] if len(parts) == 1 else "".join(parts)
+
+    def analyze(self, text: str, *, prefiltered: bool = False) -> TranslationResult:
+        """Find every match of ``text`` in a single pass, without building the translated text.
+
+        :param prefiltered: Whether ``text`` already passed :meth:`might_match`, which is then not run again.
+        """
+        folded = self.fold(text)
+        if not prefiltered and not might_match(self.matcher.keys, folded):
+            return TranslationResult(text, (), self.expand)
+        return self._analyze(text, folded)
+
+    def _analyze(self, text: str, folded: str) -> TranslationResult:
+        spans: list[tuple[int, int]] = []
+        for start, end, translatable in segments(folded):
+            if not translatable:
+                continue
+            found = self._finditer(folded[start:end])
+            spans.extend((start + match_start, start + match_end) for match_start, match_end in found)
+        return TranslationResult(text, tuple(spans), self.expand, None if folded is text else folded)
+
+    def analyze_segment(self, text: str) -> TranslationResult:
+        """Like :meth:`analyze`, but treat ``text`` as prose, like :meth:`translate_segment`."""
+        folded = self.fold(text)
+        if not might_match(self.matcher.keys, folded):
+            return TranslationResult(text, (), self.expand)
+        return TranslationResult(text, tuple(self._finditer(folded)), self.expand, None if folded is text else folded)
+
+    def _finditer(self, text: str) -> Iterator[tuple[int, int]]:
+        found = self.matcher.finditer(text)
+        if self.context is not None:
+            return self.context.filter(text, found)
+        return found
+
+    def with_context(self, context: ContextTable | None) -> "DictionaryArtifact":
+        """Return this artifact disambiguating matches with ``context``, or without disambiguation if ``None``."""
+        if context is self.context:
+            return self
+        return replace(self, version=_versioned(dictionary_version(self.abbreviations), context), context=context)
+
+    def extend(self, overrides: Mapping[str, str]) -> "DictionaryArtifact":
+        """Return a new artifact with ``overrides`` layered on top of this one.
+
+        Only the case variants of ``overrides`` are computed, the others are copied from this artifact, or looked up
+        behind the overrides when this artifact is compact.
+        """
+        if not overrides:
+            return self
+        abbreviations = _layer(self.abbreviations, overrides)
+        return DictionaryArtifact(
+            backend=self.backend,
+            version=_versioned(dictionary_version(abbreviations), self.context),
+            abbreviations=abbreviations,
+            matcher=self.matcher.extend(overrides),
+            expansions=_layer(self.expansions, case_variants(overrides)),
+            context=self.context,
+            folding=self.folding and all(key.isascii() for key in overrides),
+        )
+
+    def without(self, keys: Iterable[str]) -> "DictionaryArtifact":
+        """Return a new artifact that leaves ``keys`` as written.
+
+        The matcher is compiled again without them, or, for compact artifacts, told to skip them.
+        """
+        removed = frozenset(key for key in map(str.lower, keys) if key in self.abbreviations)
+        if not removed:
+            return self
+        abbreviations = _remove(self.abbreviations, removed)
+        return replace(
+            self,
+            version=_versioned(dictionary_version(abbreviations), self.context),
+            abbreviations=abbreviations,
+            matcher=self.matcher.without(removed),
+        )
+
+    def dump(self, path: str) -> None:
+        """Atomically write the artifact to ``path``."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((ARTIFACT_FORMAT, self), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Self | None:
+        """Read an artifact written by :meth:`dump`, or ``None`` if it is unusable."""
+        try:
+            with open(path, "rb") as f:
+                fmt, artifact = pickle.load(f)  # noqa: S301 - written by dump, never user supplied
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, TypeError):
+            return None
+        if fmt != ARTIFACT_FORMAT or not isinstance(artifact, cls):
+            return None
+        return artifact
+
+
+def compile_artifact(abbreviations: Mapping[str, str], backend: str = DEFAULT_BACKEND) -> DictionaryArtifact:
+    if BACKENDS.get(backend) is DawgMatcher:
+        if not isinstance(abbreviations, CompactDictionary):
+            abbreviations = CompactDictionary.build(abbreviations, dictionary_version(abbreviations))
+        # the dictionary, its matcher and its expansions all read the same buffer
+        return DictionaryArtifact(
+            backend=backend,
+            version=dictionary_version(abbreviations),
+            abbreviations=abbreviations,
+            matcher=DawgMatcher(abbreviations),
+            expansions=CaseVariants(abbreviations),
+            folding=abbreviations.ascii,
+        )
+    return DictionaryArtifact(
+        backend=backend,
+        version=dictionary_version(abbreviations),
+        abbreviations=abbreviations,
+        matcher=get_matcher(abbreviations, backend),
+        expansions=case_variants(abbreviations),
+        folding=all(key.isascii() for key in abbreviations),
+    )
+
+
+_artifacts: dict[str, DictionaryArtifact] = {}
+
+
+def get_artifact(backend: str = DEFAULT_BACKEND) -> DictionaryArtifact:
+    """Return the process-wide artifact for ``backend``, compiling it on first use.
+
+    Worker processes forked after the first call inherit the compiled artifact as-is.
+    """
+    try:
+        return _artifacts[backend]
+    except KeyError:
+        artifact = _artifacts[backend] = compile_artifact(ABBREVIATIONS, backend)
+        return artifact
+
+
+def install_artifact(artifact: DictionaryArtifact) -> None:
+    """Make ``artifact`` the process-wide artifact for its backend."""
+    _artifacts[artifact.backend] = artifact
+
+
+def save_artifact(artifact: DictionaryArtifact, path: str) -> DictionaryArtifact:
+    """Write ``artifact`` to ``path`` and return the artifact to use from now on.
+
+    A compact dictionary is written to ``{path}.dawg`` and mapped back from there, so the artifact written to ``path``
+    only refers to that file by its path. Other artifacts are returned as they are.
+
+    :raises OSError: If a file cannot be written.
+    :raises ValueError: If the written dictionary cannot be mapped back.
+    """
+    if isinstance(artifact.abbreviations, CompactDictionary):
+        artifact.abbreviations.dump(f"{path}.dawg")
+        artifact = compile_artifact(CompactDictionary.open(f"{path}.dawg"), artifact.backend)
+    artifact.dump(path)
+    return artifact
+
+
+def load_artifact(
+    path: str, backend: str = DEFAULT_BACKEND, abbreviations: Mapping[str, str] = ABBREVIATIONS
+) -> DictionaryArtifact:
+    """Install the artifact stored at ``path`` as the process-wide one, rebuilding it if missing or stale.
+
+    A compact dictionary is written next to the artifact, to ``{path}.dawg``, and the artifact only refers to it: the
+    process and its batch workers all map that file, sharing a single copy of its pages.
+
+    :param path: Where the artifact is cached on disk.
+    :param backend: The matcher backend the artifact must use.
+    :param abbreviations: The dictionary the artifact must be compiled from.
+    :return: The installed artifact.
+    """
+    artifact = DictionaryArtifact.load(path)
+    if artifact is None or artifact.backend != backend or artifact.version != dictionary_version(abbreviations):
+        logger.info(f"Compiling deabbreviator dictionary artifact to {path}")
+        artifact = compile_artifact(abbreviations, backend)
+        try:
+            artifact = save_artifact(artifact, path)
+        except (OSError, ValueError):
+            logger.warning(f"Could not write deabbreviator dictionary artifact to {path}", exc_info=True)
+    install_artifact(artifact)
+    return artifact
+
+
+def configured_artifact(config: Mapping[str, Any]) -> DictionaryArtifact:  # pyright: ignore[reportExplicitAny]
+    """Return the artifact an extension configuration describes.
+
+    The bot and the HTTP API both build their artifact here, so they translate with the same backend, dictionary and
+    context rules.
+
+    :param config: The ``deabbreviator`` section of the configuration.
+    :return: The artifact, compiled or loaded from ``artifact_path``, with context rules if ``disambiguate`` is set.
+    """
+    backend: str = config.get("backend", DEFAULT_BACKEND)
+    dictionary_path: str = config.get("dictionary_path") or DEFAULT_DICTIONARY_PATH
+    artifact_path: str | None = config.get("artifact_path")
+    abbreviations = ABBREVIATIONS if dictionary_path == DEFAULT_DICTIONARY_PATH else load_dictionary(dictionary_path)
+    if artifact_path:
+        artifact = load_artifact(artifact_path, backend, abbreviations)
+    elif abbreviations is ABBREVIATIONS:
+        artifact = get_artifact(backend)
+    else:
+        artifact = compile_artifact(abbreviations, backend)
+    return artifact.with_context(load_context() if config.get("disambiguate", False) else None)
+
+
+__all__ = [
+    "CaseVariants",
+    "DictionaryArtifact",
+    "case_variants",
+    "compile_artifact",
+    "configured_artifact",
+    "dictionary_version",
+    "get_artifact",
+    "install_artifact",
+    "load_artifact",
+    "save_artifact",
+]
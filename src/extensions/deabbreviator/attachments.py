@@ -0,0 +1,200 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import asyncio
+import contextlib
+import mmap
+import os
+import tempfile
+from collections import Counter
+from typing import IO, Final, final
+
+import aiohttp
+import discord
+
+from .artifact import DictionaryArtifact
+from .batch import INLINE_LIMIT
+from .history import SPOOL_SIZE
+from .lexer import segments
+from .stats import HitCounter
+
+MAX_ATTACHMENT_SIZE: Final = 4 * 1024 * 1024
+# the upload limit of every guild and DM, whatever its boost level
+UPLOAD_LIMIT: Final = 10 * 1024 * 1024
+# bytes translated at once
+CHUNK_SIZE: Final = 64 * 1024
+DOWNLOAD_CHUNK: Final = 64 * 1024
+TEXT_EXTENSIONS: Final = (".txt", ".log", ".md", ".csv")
+
+
+def is_text_attachment(attachment: discord.Attachment) -> bool:
+    content_type = attachment.content_type or ""
+    return content_type.startswith("text/") or attachment.filename.lower().endswith(TEXT_EXTENSIONS)
+
+
+def _safe_cut(text: str) -> int:
+    # The longest prefix ending after a newline in prose, before any backtick left in prose. Its code spans are all
+    # complete and none of its backticks can pair with one further on, so it is lexed exactly as in the whole text.
+    cut = 0
+    for start, end, translatable in segments(text):
+        if not translatable:
+            continue
+        stray = text.find("`", start, end)
+        if (newline := text.rfind("\n", start, end if stray == -1 else stray)) != -1:
+            cut = newline + 1
+        if stray != -1:
+            break
+    return cut
+
+
+def chunk_end(data: mmap.mmap | bytes, start: int, size: int = CHUNK_SIZE) -> int:
+    """Return where the chunk of ``data`` starting at ``start`` ends, at most ``size`` bytes later when it can.
+
+    Chunks end after a line, which is never inside a character or across the context of a word, and never inside code:
+    inline code may span lines, so a backtick that may pair with one further on keeps its line in the next chunk.
+    Translating the chunks one by one gives exactly the translation of the whole text. A chunk holding a single line
+    or code span longer than ``size`` grows until it ends.
+    """
+    end = start + size
+    while end < len(data):
+        if (newline := data.rfind(b"\n", start, end)) != -1:
+            cut = newline + 1
+            if data.find(b"`", start, cut) == -1 or data.find(b"`", cut) == -1:
+                return cut
+            text = data[start:cut].decode(errors="surrogateescape")
+            if safe := _safe_cut(text):
+                return start + len(text[:safe].encode(errors="surrogateescape"))
+        end += size
+    return len(data)
+
+
+def translate_file(
+    source: IO[bytes], artifact: DictionaryArtifact, chunk_size: int = CHUNK_SIZE
+) -> tuple[IO[bytes], Counter[str]]:
+    """Translate the text of ``source`` chunk by chunk into a new file.
+
+    ``source`` is memory-mapped, so only the chunk being translated is ever copied into memory. Chunks without
+    abbreviations are written back byte for byte, and bytes that are not valid UTF-8 are kept as they are.
+
+    :return: The translated file, positioned at its start, and the number of matches of every key.
+    """
+    output = tempfile.SpooledTemporaryFile(SPOOL_SIZE)  # noqa: SIM115
+    counts: Counter[str] = Counter()
+    # an empty file cannot be mapped
+    if os.fstat(source.fileno()).st_size:
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            while start < len(data):
+                end = chunk_end(data, start, chunk_size)
+                chunk = data[start:end]
+                text = chunk.decode(errors="surrogateescape")
+                result = artifact.analyze(text)
+                if result.changed:
+                    counts.update(result.keys)
+                    output.write(result.output.encode(errors="surrogateescape"))
+                else:
+                    output.write(chunk)
+                start = end
+    output.seek(0)
+    return output, counts
+
+
+async def download(attachment: discord.Attachment, max_size: int, session: aiohttp.ClientSession) -> IO[bytes] | None:
+    """Save ``attachment`` into a temporary file, or return ``None`` if it is larger than ``max_size`` bytes.
+
+    The body is written to the file chunk by chunk as it arrives, and the download stops as soon as it grows past
+    ``max_size``, whatever size Discord announced.
+
+    :raises discord.HTTPException: If Discord refuses the download.
+    :raises aiohttp.ClientError: If the connection fails.
+    """
+    if attachment.size > max_size:
+        return None
+    async with session.get(attachment.url) as response:
+        if not response.ok:
+            raise discord.HTTPException(response, f"Could not download {attachment.filename}")
+        file = tempfile.TemporaryFile()  # noqa: SIM115
+        try:
+            written = 0
+            async for data in response.content.iter_chunked(DOWNLOAD_CHUNK):
+                written += len(data)
+                if written > max_size:
+                    file.close()
+                    return None
+                file.write(data)
+        except BaseException:
+            file.close()
+            raise
+    file.seek(0)
+    return file
+
+
+@final
+class AttachmentTranslator:
+    """Translate text attachments into files ready to be uploaded.
+
+    Attachments are downloaded into a temporary file and translated from a memory map of it, so neither the original
+    nor the translation is held in memory in full. Files larger than the inline limit of the batch API are translated
+    in a thread, leaving the event loop free. At most ``concurrency`` attachments are handled at once, and every
+    download goes through the same HTTP session.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int = MAX_ATTACHMENT_SIZE,
+        concurrency: int = 2,
+        stats: HitCounter | None = None,
+    ) -> None:
+        self.max_size = max_size
+        self.stats = stats
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self._session: aiohttp.ClientSession | None = None
+        self._closing: asyncio.Task[None] | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # created on first use, a session must belong to the running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    def stop(self) -> None:
+        if self._session is not None and not self._session.closed:
+            with contextlib.suppress(RuntimeError):
+                self._closing = asyncio.create_task(self._session.close())
+        self._session = None
+
+    async def translate(
+        self, attachment: discord.Attachment, artifact: DictionaryArtifact, guild_id: int | None = None
+    ) -> tuple[IO[bytes], int] | None:
+        """Translate ``attachment`` with ``artifact``.
+
+        :return: The translated file and how many abbreviations were expanded in it, or ``None`` if the attachment is
+            larger than ``max_size``.
+        :raises discord.HTTPException: If Discord refuses the download.
+        :raises aiohttp.ClientError: If the connection fails.
+        """
+        async with self.semaphore:
+            source = await download(attachment, self.max_size, self.session)
+            if source is None:
+                return None
+            with source:
+                # the size Discord announced may be smaller than what was downloaded
+                if os.fstat(source.fileno()).st_size <= INLINE_LIMIT:
+                    output, counts = translate_file(source, artifact)
+                else:
+                    output, counts = await asyncio.to_thread(translate_file, source, artifact)
+        if self.stats and counts:
+            self.stats.record(guild_id, counts.elements())
+        return output, counts.total()
+
+
+__all__ = [
+    "MAX_ATTACHMENT_SIZE",
+    "UPLOAD_LIMIT",
+    "AttachmentTranslator",
+    "chunk_end",
+    "download",
+    "is_text_attachment",
+    "translate_file",
+]
@@ -0,0 +1,185 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import asyncio
+import contextlib
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Final, cast, final
+
+import discord
+
+from src.database.models import Channel
+from src.log import logger as main_logger
+
+from .artifact import DictionaryArtifact
+from .edits import EditTracker
+from .relay import WebhookRelay
+from .result import TranslationResult
+from .stats import HitCounter
+from .streaming import iter_pages
+
+logger = main_logger.getChild("deabbreviator")
+
+DROP_LOG_EVERY: Final = 100
+
+type ArtifactResolver = Callable[[discord.Message], Awaitable[DictionaryArtifact]]
+type ReplyFormatter = Callable[[discord.Message, str], str]
+type Translation = tuple[discord.Message, DictionaryArtifact, TranslationResult]
+
+
+@final
+class AutoDeabbreviator:
+    """Deabbreviate every message of opted-in channels.
+
+    Messages are pushed on a bounded queue and drained by a few worker tasks. Each worker takes up to ``batch_size``
+    messages at once and sends a single reply per channel for the whole batch. When the queue is full, new messages
+    are dropped instead of letting the backlog grow. Channels in relay mode get each message reposted under the name
+    of its author through ``relay`` instead, and fall back to replies if the bot may not manage their webhooks.
+    Replies that fit in a single message are kept in ``edits``, so editing a message updates its translation.
+    """
+
+    def __init__(
+        self,
+        artifact_for: ArtifactResolver,
+        formatter: ReplyFormatter,
+        *,
+        queue_size: int = 1000,
+        workers: int = 2,
+        batch_size: int = 50,
+        stats: HitCounter | None = None,
+        relay: WebhookRelay | None = None,
+        edits: EditTracker | None = None,
+    ) -> None:
+        self.artifact_for = artifact_for
+        self.formatter = formatter
+        self.stats = stats
+        self.relay = relay
+        self.edits = edits
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue: asyncio.Queue[discord.Message] = asyncio.Queue(maxsize=queue_size)
+        self.channels: set[int] = set()
+        self.relay_channels: set[int] = set()
+        self.dropped = 0
+        self._tasks: list[asyncio.Task[None]] = []
+
+    async def load_channels(self) -> None:
+        rows = cast(list[tuple[int, bool]], await Channel.filter(auto_deabbreviate=True).values_list("id", "relay"))
+        self.channels = {channel_id for channel_id, _ in rows}
+        self.relay_channels = {channel_id for channel_id, relay in rows if relay}
+
+    async def set_channel(self, channel_id: int, enabled: bool, relay: bool = False) -> None:
+        await Channel.update_or_create(id=channel_id, defaults={"auto_deabbreviate": enabled, "relay": relay})
+        if enabled:
+            self.channels.add(channel_id)
+        else:
+            self.channels.discard(channel_id)
+        if enabled and relay:
+            self.relay_channels.add(channel_id)
+        else:
+            self.relay_channels.discard(channel_id)
+
+    def submit(self, message: discord.Message) -> bool:
+        """Queue ``message`` for translation.
+
+        :return: ``False`` if the queue was full and the message was dropped.
+        """
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped % DROP_LOG_EVERY == 1:
+                logger.warning(f"Auto deabbreviation queue is full, {self.dropped} messages dropped so far")
+            return False
+        return True
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self.relay:
+            self.relay.stop()
+
+    def _drain(self, first: discord.Message) -> list[discord.Message]:
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _work(self) -> None:
+        while True:
+            batch = self._drain(await self.queue.get())
+            try:
+                await self._process(batch)
+            except Exception:
+                logger.exception("Failed to auto deabbreviate messages")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _process(self, batch: list[discord.Message]) -> None:
+        replies: defaultdict[int, list[Translation]] = defaultdict(list)
+        for message in batch:
+            artifact = await self.artifact_for(message)
+            result = artifact.analyze(message.content)
+            if result.changed:
+                replies[message.channel.id].append((message, artifact, result))
+                if self.stats:
+                    self.stats.record(message.guild.id if message.guild else None, result.keys)
+
+        for channel_id, translations in replies.items():
+            if self.relay and channel_id in self.relay_channels:
+                for translation in translations:
+                    self._track(await self._relay(translation[0], translation[2].output), [translation])
+                continue
+            if len(translations) == 1:
+                message, _, result = translations[0]
+                self._track(await self._reply(message, result.output), translations)
+                continue
+            # several messages of the same channel share one reply instead of one each
+            channel = translations[0][0].channel
+            entries = (self.formatter(message, result.output) + "\n" for message, _, result in translations)
+            sent = [
+                await channel.send(page, allowed_mentions=discord.AllowedMentions.none())
+                for page in iter_pages(entries)
+            ]
+            self._track(sent, translations)
+
+    def _track(self, sent: Sequence[discord.Message | discord.WebhookMessage], translations: list[Translation]) -> None:
+        # an edit could move text from one page of a longer reply to another, so only single pages are followed
+        if self.edits is not None and len(sent) == 1:
+            self.edits.track(sent[0], translations)
+
+    async def _reply(self, message: discord.Message, translated: str) -> list[discord.Message]:
+        return [
+            await message.reply(page, mention_author=False, allowed_mentions=discord.AllowedMentions.none())
+            for page in iter_pages((self.formatter(message, translated),))
+        ]
+
+    async def _relay(self, message: discord.Message, translated: str) -> Sequence[discord.Message]:
+        relay = cast(WebhookRelay, self.relay)
+        try:
+            return [await relay.send(message, page) for page in iter_pages((self.formatter(message, translated),))]
+        except discord.Forbidden:
+            logger.warning(
+                f"Missing the permission to manage webhooks in channel {message.channel.id}, replying instead"
+            )
+            return await self._reply(message, translated)
+
+    async def edit(self, message: discord.Message) -> None:
+        """Update the translation of ``message`` after it was edited, if it was answered recently."""
+        if self.edits is None or self.edits.get(message.id) is None:
+            return
+        # the reply may have been deleted in the meantime
+        with contextlib.suppress(discord.NotFound):
+            await self.edits.update(message, await self.artifact_for(message))
+
+
+__all__ = ["AutoDeabbreviator"]
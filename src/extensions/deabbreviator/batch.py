@@ -0,0 +1,155 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import asyncio
+import multiprocessing
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import batched, chain
+from typing import Final
+
+from .artifact import DictionaryArtifact, get_artifact, install_artifact
+from .cache import Cached
+from .matchers import DEFAULT_BACKEND
+
+# Batches up to this many characters are translated inline, a process round trip costs more than the work itself.
+INLINE_LIMIT: Final = 64 * 1024
+CHUNK_SIZE: Final = 256
+
+_pool: ProcessPoolExecutor | None = None
+# the artifact the workers of ``_pool`` were started with
+_pool_artifact: DictionaryArtifact | None = None
+
+
+def _init_worker(artifact: DictionaryArtifact) -> None:
+    # the compiled artifact is shipped once per worker instead of being rebuilt for every task
+    install_artifact(artifact)
+
+
+def _translate_chunk(backend: str, texts: Sequence[str]) -> list[str]:
+    translate = get_artifact(backend).translate
+    return [translate(text) for text in texts]
+
+
+def _analyze_chunk(backend: str, texts: Sequence[str]) -> list[Cached]:
+    # the matches decide whether a text changed, like for the results of the cache
+    analyze = get_artifact(backend).analyze
+    results: list[Cached] = []
+    for text in texts:
+        result = analyze(text)
+        results.append((result.output, result.keys) if result.changed else None)
+    return results
+
+
+def get_pool(backend: str = DEFAULT_BACKEND) -> ProcessPoolExecutor:
+    """Return the shared process pool for the artifact of ``backend``, starting it on first use.
+
+    Workers only hold the artifact they were started with, so a pool started for another backend, or for an artifact
+    installed since, is retired and a new one started.
+    """
+    global _pool, _pool_artifact  # noqa: PLW0603
+    artifact = get_artifact(backend)
+    if _pool is not None and _pool_artifact is not artifact:
+        reset_pool()
+    if _pool is None:
+        # forking a process that runs an event loop and helper threads is unsafe, prefer a fork server
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pool = ProcessPoolExecutor(
+            mp_context=multiprocessing.get_context(method),
+            initializer=_init_worker,
+            initargs=(artifact,),
+        )
+        _pool_artifact = artifact
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool, _pool_artifact  # noqa: PLW0603
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = _pool_artifact = None
+
+
+def reset_pool() -> None:
+    """Retire the shared pool so the next batch starts workers with the current artifact.
+
+    Tasks already submitted still run to completion on the old workers.
+    """
+    global _pool, _pool_artifact  # noqa: PLW0603
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+        _pool = _pool_artifact = None
+
+
+def _is_small(texts: Sequence[str]) -> bool:
+    return sum(map(len, texts)) <= INLINE_LIMIT
+
+
+def _map_chunks[T](
+    func: Callable[[str, Sequence[str]], list[T]], texts: Sequence[str], backend: str, chunk_size: int
+) -> list[T]:
+    if _is_small(texts):
+        return func(backend, texts)
+    pool = get_pool(backend)
+    chunks = pool.map(partial(func, backend), batched(texts, chunk_size))
+    return list(chain.from_iterable(chunks))
+
+
+async def _async_map_chunks[T](
+    func: Callable[[str, Sequence[str]], list[T]], texts: Sequence[str], backend: str, chunk_size: int
+) -> list[T]:
+    if _is_small(texts):
+        return func(backend, texts)
+    loop = asyncio.get_running_loop()
+    pool = get_pool(backend)
+    chunks = await asyncio.gather(
+        *(loop.run_in_executor(pool, func, backend, chunk) for chunk in batched(texts, chunk_size))
+    )
+    return list(chain.from_iterable(chunks))
+
+
+def translate_many(texts: Sequence[str], backend: str = DEFAULT_BACKEND, chunk_size: int = CHUNK_SIZE) -> list[str]:
+    """Translate many texts at once, preserving their order.
+
+    Small batches are translated inline, large ones are split into chunks and spread over a process pool.
+
+    :param texts: The texts to translate.
+    :param backend: The matcher backend to use.
+    :param chunk_size: How many texts are sent to a worker per task.
+    :return: The translated texts, in the same order as ``texts``.
+    """
+    return _map_chunks(_translate_chunk, texts, backend, chunk_size)
+
+
+async def async_translate_many(
+    texts: Sequence[str], backend: str = DEFAULT_BACKEND, chunk_size: int = CHUNK_SIZE
+) -> list[str]:
+    """Like :func:`translate_many`, but waits for the process pool without blocking the event loop."""
+    return await _async_map_chunks(_translate_chunk, texts, backend, chunk_size)
+
+
+def analyze_many(texts: Sequence[str], backend: str = DEFAULT_BACKEND, chunk_size: int = CHUNK_SIZE) -> list[Cached]:
+    """Like :func:`translate_many`, but with the matches of every text.
+
+    :return: For every text, its translation and the key of every match, or ``None`` if no match changed it: the same
+        results as :func:`~.cache.cached_translations`.
+    """
+    return _map_chunks(_analyze_chunk, texts, backend, chunk_size)
+
+
+async def async_analyze_many(
+    texts: Sequence[str], backend: str = DEFAULT_BACKEND, chunk_size: int = CHUNK_SIZE
+) -> list[Cached]:
+    """Like :func:`analyze_many`, but waits for the process pool without blocking the event loop."""
+    return await _async_map_chunks(_analyze_chunk, texts, backend, chunk_size)
+
+
+__all__ = [
+    "analyze_many",
+    "async_analyze_many",
+    "async_translate_many",
+    "get_pool",
+    "reset_pool",
+    "shutdown_pool",
+    "translate_many",
+]
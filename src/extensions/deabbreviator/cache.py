@@ -0,0 +1,150 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import base64
+import hashlib
+import zlib
+from collections.abc import Sequence
+from typing import Any, Final, cast
+
+import aiocache
+
+from .artifact import DictionaryArtifact
+from .result import TranslationResult
+
+COMPRESS_THRESHOLD: Final = 512
+MAX_CACHED_LENGTH: Final = 2000
+NAMESPACE: Final = "deabbreviator"
+TTL: Final = 60 * 60
+
+# part of every key, bumped whenever the value encoding or the matching rules change so old entries are never misread
+CACHE_FORMAT: Final = 3
+# markers prefixed to cached values, values must stay strings for the redis json serializer
+_UNCHANGED: Final = "="
+_RAW: Final = "r"
+_COMPRESSED: Final = "z"
+
+
+def cache_key(version: str, text: str) -> str:
+    """Return a short fixed-size cache key for the translation of ``text`` with a dictionary ``version``.
+
+    The length is part of the key so a hash collision would also need two texts of the same length.
+    """
+    digest = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+    return f"{CACHE_FORMAT}:{version}:{len(text)}:{digest}"
+
+
+def encode_value(result: TranslationResult, threshold: int = COMPRESS_THRESHOLD) -> str:
+    """Encode a translation and the keys it matched for the cache.
+
+    Texts with nothing to expand are stored as a single marker, and long translations are compressed when it makes
+    them smaller.
+    """
+    if not result.changed:
+        return _UNCHANGED
+    # keys are \w+ tokens, so the first newline always ends them
+    payload = " ".join(result.keys) + "\n" + result.output
+    if len(payload) >= threshold:
+        compressed = base64.b85encode(zlib.compress(payload.encode(), 6)).decode("ascii")
+        if len(compressed) < len(payload):
+            return _COMPRESSED + compressed
+    return _RAW + payload
+
+
+def decode_value(value: str) -> tuple[str, list[str]] | None:
+    """Decode a value stored by :func:`encode_value`.
+
+    :return: The translation and the keys it matched, or ``None`` if the text had nothing to expand.
+    """
+    marker, data = value[:1], value[1:]
+    if marker == _UNCHANGED:
+        return None
+    if marker == _COMPRESSED:
+        data = zlib.decompress(base64.b85decode(data)).decode()
+    keys, translated = data.split("\n", 1)
+    return translated, keys.split()
+
+
+type Cached = tuple[str, Sequence[str]] | None
+
+
+def _uncached(artifact: DictionaryArtifact, text: str) -> Cached:
+    result = artifact.analyze(text, prefiltered=True)
+    return (result.output, result.keys) if result.changed else None
+
+
+async def cached_translation(
+    cache: aiocache.BaseCache,
+    artifact: DictionaryArtifact,
+    text: str,
+    max_length: int = MAX_CACHED_LENGTH,
+    threshold: int = COMPRESS_THRESHOLD,
+) -> Cached:
+    """Translate ``text`` through the result cache, texts longer than ``max_length`` are translated directly.
+
+    Texts the pre-filter rejects are answered without a cache round trip. It runs once per text: the cache misses are
+    analyzed without running it again.
+
+    :return: The translation and the key of every match, or ``None`` if the text has nothing to expand.
+    """
+    if not artifact.might_match(text):
+        return None
+    if len(text) > max_length:
+        return _uncached(artifact, text)
+    # the version keeps results of guilds with custom abbreviations apart
+    key = cache_key(artifact.version, text)
+    value: Any = None  # pyright: ignore[reportExplicitAny]
+    if value := await cache.get(key, namespace=NAMESPACE):
+        return decode_value(cast(str, value))
+    result = artifact.analyze(text, prefiltered=True)
+    await cache.set(key, encode_value(result, threshold), namespace=NAMESPACE, ttl=TTL)
+    return (result.output, result.keys) if result.changed else None
+
+
+async def cached_translations(
+    cache: aiocache.BaseCache,
+    artifact: DictionaryArtifact,
+    texts: Sequence[str],
+    max_length: int = MAX_CACHED_LENGTH,
+    threshold: int = COMPRESS_THRESHOLD,
+) -> list[Cached]:
+    """Like :func:`cached_translation` for many texts, with one cache read and one cache write for the whole batch."""
+    results: list[Cached] = [None] * len(texts)
+    # identical texts share a single cache entry and a single translation
+    positions: dict[str, list[int]] = {}
+    for i, text in enumerate(texts):
+        if not artifact.might_match(text):
+            continue
+        if len(text) > max_length:
+            results[i] = _uncached(artifact, text)
+        else:
+            positions.setdefault(text, []).append(i)
+    if not positions:
+        return results
+    keys = [cache_key(artifact.version, text) for text in positions]
+    values: list[Any] = await cache.multi_get(keys, namespace=NAMESPACE)  # pyright: ignore[reportExplicitAny]
+    missing: list[tuple[str, str]] = []
+    for key, value, (text, indices) in zip(keys, values, positions.items(), strict=True):
+        if value:
+            cached = decode_value(cast(str, value))
+        else:
+            result = artifact.analyze(text, prefiltered=True)
+            missing.append((key, encode_value(result, threshold)))
+            cached = (result.output, result.keys) if result.changed else None
+        for i in indices:
+            results[i] = cached
+    if missing:
+        await cache.multi_set(missing, namespace=NAMESPACE, ttl=TTL)
+    return results
+
+
+__all__ = [
+    "COMPRESS_THRESHOLD",
+    "MAX_CACHED_LENGTH",
+    "NAMESPACE",
+    "Cached",
+    "cache_key",
+    "cached_translation",
+    "cached_translations",
+    "decode_value",
+    "encode_value",
+]
@@ -0,0 +1,270 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from collections.abc import Iterator, Mapping
+from typing import Any, Final, Self, final, override
+
+MAGIC: Final = b"DAWG"
+COMPACT_FORMAT: Final = 1
+# magic, format, flags, states, edges, keys, values, blob size, then the version of the source dictionary
+_HEADER: Final = struct.Struct("=4s7I16s")
+_ASCII: Final = 1
+
+type _Signature = tuple[bool, tuple[tuple[str, int], ...]]
+
+
+@final
+class _Node:
+    __slots__ = ("edges", "final", "id")
+
+    def __init__(self) -> None:
+        self.edges: dict[str, _Node] = {}
+        self.final = False
+        self.id = -1
+
+    def signature(self) -> _Signature:
+        return self.final, tuple((label, node.id) for label, node in sorted(self.edges.items()))
+
+
+def _minimal_automaton(keys: list[str]) -> _Node:
+    # Daciuk's incremental construction: keys arrive sorted, so once a key is added the states past its common prefix
+    # with the next one are final and can be merged with an equivalent state seen before.
+    root = _Node()
+    register: dict[_Signature, _Node] = {}
+    unchecked: list[tuple[_Node, str, _Node]] = []
+
+    def minimize(depth: int) -> None:
+        while len(unchecked) > depth:
+            parent, label, child = unchecked.pop()
+            signature = child.signature()
+            if (twin := register.get(signature)) is not None:
+                parent.edges[label] = twin
+            else:
+                child.id = len(register)
+                register[signature] = child
+
+    previous = ""
+    for key in keys:
+        common = 0
+        for a, b in zip(previous, key, strict=False):
+            if a != b:
+                break
+            common += 1
+        minimize(common)
+        node = unchecked[-1][2] if unchecked else root
+        for label in key[common:]:
+            child = _Node()
+            node.edges[label] = child
+            unchecked.append((node, label, child))
+            node = child
+        node.final = True
+        previous = key
+    minimize(0)
+    return root
+
+
+def _topological(root: _Node) -> list[_Node]:
+    # reverse post-order of a depth first walk
+    order: list[_Node] = []
+    seen = {id(root)}
+    stack = [(root, iter(root.edges.values()))]
+    while stack:
+        node, children = stack[-1]
+        for child in children:
+            if id(child) not in seen:
+                seen.add(id(child))
+                stack.append((child, iter(child.edges.values())))
+                break
+        else:
+            stack.pop()
+            order.append(node)
+    order.reverse()
+    return order
+
+
+def encode(abbreviations: Mapping[str, str], version: str = "") -> bytes:
+    """Serialize ``abbreviations`` into the buffer read by :class:`CompactDictionary`.
+
+    Keys are stored in a minimal acyclic automaton, where keys sharing a suffix share its states. Every edge records how
+    many keys sort before the ones it leads to, so walking a key also yields its rank among all keys, which indexes the
+    expansions. Each distinct expansion is stored once.
+
+    :param abbreviations: Lowercase keys and their expansions.
+    :param version: Fingerprint of ``abbreviations``, kept as is in the header.
+    """
+    keys = sorted(abbreviations)
+    root = _minimal_automaton(keys)
+
+    # number the states so that every state comes before the states it leads to, the root first
+    states = _topological(root)
+    numbers = {id(node): number for number, node in enumerate(states)}
+    words = [0] * len(states)
+    for number in reversed(range(len(states))):
+        node = states[number]
+        words[number] = node.final + sum(words[numbers[id(child)]] for child in node.edges.values())
+
+    first: list[int] = []
+    labels: list[int] = []
+    targets: list[int] = []
+    ranks: list[int] = []
+    for node in states:
+        first.append(len(labels))
+        rank = int(node.final)
+        for label, child in sorted(node.edges.items()):
+            labels.append(ord(label))
+            targets.append(numbers[id(child)])
+            ranks.append(rank)
+            rank += words[numbers[id(child)]]
+    first.append(len(labels))
+
+    interned: dict[str, int] = {}
+    values = [interned.setdefault(abbreviations[key], len(interned)) for key in keys]
+    blobs = [value.encode() for value in interned]
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+
+    flags = _ASCII if all(key.isascii() for key in keys) else 0
+    header = _HEADER.pack(
+        MAGIC,
+        COMPACT_FORMAT,
+        flags,
+        len(states),
+        len(labels),
+        len(keys),
+        len(interned),
+        offsets[-1],
+        version.encode().ljust(16, b"\0"),
+    )
+    arrays = (first, labels, targets, ranks, values, offsets)
+    return b"".join(
+        [
+            header,
+            *(struct.pack(f"={len(array)}I", *array) for array in arrays),
+            bytes(node.final for node in states),
+            *blobs,
+        ]
+    )
+
+
+@final
+class CompactDictionary(Mapping[str, str]):
+    """Read-only dictionary of abbreviations stored in a single flat buffer.
+
+    Lookups walk the automaton written by :func:`encode` in place, so no Python object is created per key or per
+    expansion until one is looked up. Opened with :meth:`open`, the buffer is a read-only memory map of the file:
+    every process mapping the same file shares its pages, and a pickled dictionary only carries the path. Arrays are
+    stored in native byte order, the file is meant to be written and read on the same machine.
+
+    Attributes
+    ----------
+        version (str): Fingerprint of the source dictionary, empty if it was not given.
+        ascii (bool): Whether every key is ASCII.
+        path (str | None): The file the buffer is mapped from, if any.
+
+    """
+
+    def __init__(self, buffer: bytes | mmap.mmap, path: str | None = None) -> None:
+        if len(buffer) < _HEADER.size:
+            raise ValueError("Truncated compact dictionary")
+        magic, fmt, flags, states, edges, keys, values, blob_size, version = _HEADER.unpack_from(buffer)
+        if magic != MAGIC or fmt != COMPACT_FORMAT:
+            raise ValueError("Not a compact dictionary of the current format")
+        self.buffer = buffer
+        self.path = path
+        self.version: str = version.rstrip(b"\0").decode()
+        self.ascii = bool(flags & _ASCII)
+        self._len: int = keys
+        view = memoryview(buffer)
+        offset = _HEADER.size
+        arrays: list[memoryview] = []
+        for count in (states + 1, edges, edges, edges, keys, values + 1):
+            arrays.append(view[offset : offset + count * 4].cast("I"))
+            offset += count * 4
+        self._first, self._labels, self._targets, self._ranks, self._values, self._offsets = arrays
+        self._final = view[offset : offset + states]
+        self._blob = view[offset + states : offset + states + blob_size]
+        if len(self._blob) != blob_size:
+            raise ValueError("Truncated compact dictionary")
+
+    @classmethod
+    def build(cls, abbreviations: Mapping[str, str], version: str = "") -> Self:
+        """Compile ``abbreviations`` into an in-memory compact dictionary."""
+        return cls(encode({key.lower(): value for key, value in abbreviations.items()}, version))
+
+    @classmethod
+    def open(cls, path: str) -> Self:
+        """Map the dictionary written to ``path`` by :meth:`dump`.
+
+        :raises OSError: If the file cannot be read.
+        :raises ValueError: If the file is not a compact dictionary of the current format.
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, os.path.abspath(path))
+
+    def dump(self, path: str) -> None:
+        """Atomically write the buffer to ``path``, leaving processes that still map the previous file unaffected."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.buffer)
+        os.replace(tmp, path)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.buffer)
+
+    def find(self, key: str) -> int:
+        """Return the rank of ``key`` among the sorted keys, or ``-1`` if it is not one of them."""
+        first, labels, targets, ranks = self._first, self._labels, self._targets, self._ranks
+        state = rank = 0
+        for char in key:
+            low, high = first[state], first[state + 1]
+            code = ord(char)
+            edge = bisect_left(labels, code, low, high)
+            if edge == high or labels[edge] != code:
+                return -1
+            rank += ranks[edge]
+            state = targets[edge]
+        return rank if self._final[state] else -1
+
+    def value(self, rank: int) -> str:
+        index = self._values[rank]
+        return str(self._blob[self._offsets[index] : self._offsets[index + 1]], "utf-8")
+
+    @override
+    def __getitem__(self, key: str) -> str:
+        if (rank := self.find(key)) == -1:
+            raise KeyError(key)
+        return self.value(rank)
+
+    @override
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.find(key) != -1
+
+    @override
+    def __iter__(self) -> Iterator[str]:
+        # depth first along edges in label order, which yields the keys sorted, exactly in the order of their ranks
+        first, labels, targets, final = self._first, self._labels, self._targets, self._final
+        stack = [(0, "")]
+        while stack:
+            state, prefix = stack.pop()
+            if final[state]:
+                yield prefix
+            edges = reversed(range(first[state], first[state + 1]))
+            stack.extend((targets[edge], prefix + chr(labels[edge])) for edge in edges)
+
+    @override
+    def __len__(self) -> int:
+        return self._len
+
+    def __reduce__(self) -> tuple[Any, ...]:  # pyright: ignore[reportExplicitAny]
+        if self.path is not None:
+            return type(self).open, (self.path,)
+        return type(self), (bytes(self.buffer),)
+
+
+__all__ = ["COMPACT_FORMAT", "CompactDictionary", "encode"]
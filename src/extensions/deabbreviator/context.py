@@ -0,0 +1,95 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import hashlib
+import os
+import re
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass
+from typing import Final, final
+
+import yaml
+
+from .abbreviations import DICTIONARIES_PATH
+
+CONTEXT_PATH: Final = os.path.join(DICTIONARIES_PATH, "context.yml")
+# neighbours made of digits only are looked up under this token, so "3 pm" and "11 pm" share a single rule
+NUMBER: Final = "<num>"
+
+# the next word, only across spaces so that punctuation ends the context
+_NEXT_WORD: Final = re.compile(r"[ \t]*(\w+)")
+
+type Scores = Mapping[str, int]
+
+
+def _token(word: str) -> str:
+    return NUMBER if word.isdigit() else word.lower()
+
+
+def _previous_word(text: str, start: int) -> str | None:
+    end = start
+    while end and text[end - 1] in " \t":
+        end -= 1
+    begin = end
+    while begin and (text[begin - 1].isalnum() or text[begin - 1] == "_"):
+        begin -= 1
+    return text[begin:end] if begin != end else None
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class ContextTable:
+    """Scores of the words around ambiguous abbreviations.
+
+    A candidate match is scored by looking up the word right before it in ``previous`` and the word right after it in
+    ``following``. Matches with a negative total are left as written, which takes two dict lookups per candidate and
+    none at all for abbreviations that have no rule.
+
+    Attributes
+    ----------
+        rules (dict[str, tuple[Scores, Scores]]): ``(previous, following)`` scores of each ambiguous abbreviation.
+        version (str): Fingerprint of the rules, part of the version of artifacts using them.
+
+    """
+
+    rules: dict[str, tuple[Scores, Scores]]
+    version: str
+
+    def keep(self, text: str, start: int, end: int) -> bool:
+        """Return ``True`` if the match ``text[start:end]`` should be expanded."""
+        rule = self.rules.get(text[start:end].lower())
+        if rule is None:
+            return True
+        previous, following = rule
+        score = 0
+        if previous and (word := _previous_word(text, start)):
+            score += previous.get(_token(word), 0)
+        if following and (match := _NEXT_WORD.match(text, end)):
+            score += following.get(_token(match.group(1)), 0)
+        return score >= 0
+
+    def filter(self, text: str, spans: Iterable[tuple[int, int]]) -> Iterator[tuple[int, int]]:
+        keep = self.keep
+        for start, end in spans:
+            if keep(text, start, end):
+                yield start, end
+
+
+def load_context(path: str = CONTEXT_PATH) -> ContextTable:
+    """Load a context table file.
+
+    Each top-level key is an abbreviation with optional ``previous`` and ``following`` mappings of neighbouring words
+    to scores.
+    """
+    with open(path, encoding="utf-8") as f:
+        data: dict[str, dict[str, dict[str, int]]] = yaml.safe_load(f) or {}
+    rules: dict[str, tuple[Scores, Scores]] = {}
+    digest = hashlib.blake2b(digest_size=4)
+    for key, rule in sorted(data.items()):
+        previous = {str(word).lower(): int(score) for word, score in (rule.get("previous") or {}).items()}
+        following = {str(word).lower(): int(score) for word, score in (rule.get("following") or {}).items()}
+        rules[str(key).lower()] = (previous, following)
+        digest.update(repr((key, sorted(previous.items()), sorted(following.items()))).encode())
+    return ContextTable(rules, digest.hexdigest())
+
+
+__all__ = ["CONTEXT_PATH", "NUMBER", "ContextTable", "load_context"]
@@ -0,0 +1,214 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Final, final
+
+import discord
+
+from .artifact import DictionaryArtifact
+from .lexer import TRIGGERS
+from .result import TranslationResult
+from .streaming import MESSAGE_LIMIT
+
+EDIT_TTL: Final = 15 * 60
+
+type Spans = tuple[tuple[int, int], ...]
+type ReplyFormatter = Callable[[discord.Message, str], str]
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _common_prefix(a: str, b: str) -> int:
+    # a binary search over slice comparisons, which run in C, beats comparing characters one by one in Python
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[len(a) - mid :] == b[len(b) - mid :]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _expand_left(text: str, index: int, words: int) -> int:
+    # to the start of the word around index, then over as many words before it as separated by spaces or tabs only
+    while index and _is_word(text[index - 1]):
+        index -= 1
+    for _ in range(words):
+        before = index
+        while before and text[before - 1] in " \t":
+            before -= 1
+        start = before
+        while start and _is_word(text[start - 1]):
+            start -= 1
+        if start == before:
+            break
+        index = start
+    return index
+
+
+def _expand_right(text: str, index: int, words: int) -> int:
+    while index < len(text) and _is_word(text[index]):
+        index += 1
+    for _ in range(words):
+        after = index
+        while after < len(text) and text[after] in " \t":
+            after += 1
+        end = after
+        while end < len(text) and _is_word(text[end]):
+            end += 1
+        if end == after:
+            break
+        index = end
+    return index
+
+
+def reanalyze(artifact: DictionaryArtifact, old_text: str, old_spans: Spans, new_text: str) -> Spans:
+    """Return the spans of ``new_text``, running the matcher only around what changed since ``old_text``.
+
+    A match depends on its word and on the words right before and after it, so the words touching the edit and their
+    neighbours are matched again, with one more word on each side as context. The matches of ``old_spans`` before and
+    after them are kept as they are. Texts containing code, links or mentions are analyzed in full.
+
+    :param old_spans: The spans of ``old_text`` with ``artifact``.
+    """
+    if any(trigger in text for text in (old_text, new_text) for trigger in TRIGGERS):
+        return artifact.analyze(new_text).spans
+    prefix = _common_prefix(old_text, new_text)
+    # the common suffix must not overlap the common prefix in either text
+    suffix = _common_suffix(old_text, new_text, min(len(old_text), len(new_text)) - prefix)
+    delta = len(new_text) - len(old_text)
+    # folding maps look-alikes to word characters, so words are found in the folded text like the matcher does
+    folded = artifact.fold(new_text)
+    zone_start = _expand_left(folded, prefix, 1)
+    zone_end = _expand_right(folded, len(new_text) - suffix, 1)
+    start = _expand_left(folded, zone_start, 1)
+    end = _expand_right(folded, zone_end, 1)
+    found = artifact.analyze_segment(new_text[start:end]).spans
+    return (
+        tuple(span for span in old_spans if span[1] <= zone_start)
+        + tuple((start + a, start + b) for a, b in found if zone_start <= start + a and start + b <= zone_end)
+        + tuple((a + delta, b + delta) for a, b in old_spans if a + delta >= zone_end)
+    )
+
+
+@final
+@dataclass(slots=True)
+class _Entry:
+    message: discord.Message
+    version: str
+    result: TranslationResult
+    reply: "_Reply"
+    expires: float
+
+
+@final
+@dataclass(slots=True)
+class _Reply:
+    message: discord.Message | discord.WebhookMessage
+    entries: list[_Entry] = field(default_factory=list)
+
+
+@final
+class EditTracker:
+    """Keep the translations of recently answered messages so edits update the reply instead of sending a new one.
+
+    Entries expire ``ttl`` seconds after the message was answered and the oldest ones are dropped beyond ``maxsize``.
+    An edit is matched again only around the words that changed, and the reply is edited only if the translation
+    differs from the one it shows. Replies holding several messages are rebuilt from the translation of each.
+    """
+
+    def __init__(self, formatter: ReplyFormatter, maxsize: int = 1000, ttl: float = EDIT_TTL) -> None:
+        self.formatter = formatter
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _prune(self, now: float) -> None:
+        # entries are added in the order they expire, so the expired ones are always at the front
+        entries = self._entries
+        while entries and (len(entries) > self.maxsize or next(iter(entries.values())).expires <= now):
+            entries.popitem(last=False)
+
+    def track(
+        self,
+        reply: discord.Message | discord.WebhookMessage,
+        translations: list[tuple[discord.Message, DictionaryArtifact, TranslationResult]],
+    ) -> None:
+        """Remember that ``reply`` shows the translation of every message of ``translations``, in order."""
+        now = time.monotonic()
+        shared = _Reply(reply)
+        for message, artifact, result in translations:
+            entry = _Entry(message, artifact.version, result, shared, now + self.ttl)
+            shared.entries.append(entry)
+            self._entries[message.id] = entry
+            self._entries.move_to_end(message.id)
+        self._prune(now)
+
+    def get(self, message_id: int) -> TranslationResult | None:
+        entry = self._entries.get(message_id)
+        return entry.result if entry is not None and entry.expires > time.monotonic() else None
+
+    def render(self, reply: _Reply) -> str:
+        return "\n".join(self.formatter(entry.message, entry.result.output) for entry in reply.entries)
+
+    async def update(self, message: discord.Message, artifact: DictionaryArtifact) -> bool:
+        """Translate the edited ``message`` again and edit the reply showing it if its translation changed.
+
+        A reply left without any message with abbreviations is deleted. Replies that would no longer fit in a single
+        message are left as they are.
+
+        :return: Whether the reply was edited or deleted.
+        """
+        entry = self._entries.get(message.id)
+        if entry is None or entry.expires <= time.monotonic() or message.content == entry.result.text:
+            return False
+        old = entry.result
+        if artifact.version == entry.version:
+            spans = reanalyze(artifact, old.text, old.spans, message.content)
+        else:
+            spans = artifact.analyze(message.content).spans
+        folded = artifact.fold(message.content)
+        result = TranslationResult(
+            message.content, spans, artifact.expand, None if folded is message.content else folded
+        )
+        entry.message = message
+        entry.version = artifact.version
+        entry.result = result
+        if result.output == old.output:
+            return False
+        reply = entry.reply
+        if not result.changed:
+            # nothing left to expand in this message
+            reply.entries.remove(entry)
+            del self._entries[message.id]
+            if not reply.entries:
+                await reply.message.delete()
+                return True
+        content = self.render(reply)
+        if len(content) > MESSAGE_LIMIT:
+            return False
+        await reply.message.edit(content=content, allowed_mentions=discord.AllowedMentions.none())
+        return True
+
+
+__all__ = ["EDIT_TTL", "EditTracker", "reanalyze"]
@@ -0,0 +1,58 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import re
+import unicodedata
+from typing import Final
+
+# Blocks holding the look-alikes people actually type: accented Latin letters, fullwidth forms, enclosed and
+# mathematical alphanumerics. Other scripts are left alone, Cyrillic or Greek words are not abbreviations in disguise.
+_FOLDED_BLOCKS: Final = (
+    range(0x00C0, 0x0250),  # Latin-1 Supplement, Latin Extended-A and B
+    range(0x1E00, 0x1F00),  # Latin Extended Additional
+    range(0x2460, 0x2500),  # Enclosed Alphanumerics
+    range(0xFF10, 0xFF5B),  # Fullwidth digits and letters
+    range(0x1D400, 0x1D800),  # Mathematical Alphanumeric Symbols
+    range(0x1F130, 0x1F18A),  # Enclosed Alphanumeric Supplement letters
+)
+
+
+def _fold_char(char: str) -> str | None:
+    # compatibility decomposition, then drop the accents
+    decomposed = "".join(c for c in unicodedata.normalize("NFKD", char) if not unicodedata.combining(c))
+    if len(decomposed) == 1 and decomposed.isascii() and decomposed.isalnum():
+        return decomposed
+    return None
+
+
+def _build_table() -> dict[int, str]:
+    # ASCII maps to itself: str.translate then finds the common characters instead of handling a KeyError for each
+    table = {codepoint: chr(codepoint) for codepoint in range(128)}
+    for block in _FOLDED_BLOCKS:
+        for codepoint in block:
+            if (folded := _fold_char(chr(codepoint))) is not None:
+                table[codepoint] = folded
+    return table
+
+
+# Every entry maps one code point to one ASCII character, so a folded text has the same length as the original and
+# every span found in it is also a span of the original.
+FOLD_TABLE: Final = _build_table()
+# a single scan tells whether folding is needed at all, far cheaper than translating texts in other scripts
+_FOLDABLE: Final = re.compile(
+    "[" + "".join(f"{re.escape(chr(block.start))}-{re.escape(chr(block.stop - 1))}" for block in _FOLDED_BLOCKS) + "]"
+)
+
+
+def fold(text: str) -> str:
+    """Map the look-alikes in ``text`` to ASCII letters and digits.
+
+    ASCII texts are returned as is without being scanned, and so are texts without any look-alike, so ``fold(text) is
+    text`` tells whether anything was folded.
+    """
+    if text.isascii() or not _FOLDABLE.search(text):
+        return text
+    folded = text.translate(FOLD_TABLE)
+    return text if folded == text else folded
+
+
+__all__ = ["FOLD_TABLE", "fold"]
@@ -0,0 +1,125 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+from collections import OrderedDict
+from typing import Final, cast, final
+
+import aiocache
+from tortoise.expressions import F
+
+from src.database.models import Guild, GuildAbbreviation
+
+from .artifact import DictionaryArtifact
+
+MAX_EXPANSION_LENGTH: Final = 256
+MAX_GUILD_ENTRIES: Final = 250
+VERSION_TTL: Final = 60 * 60
+
+
+@final
+class GuildDictionaries:
+    """Per-guild abbreviation overrides compiled on top of the base artifact.
+
+    Compiled artifacts live in an LRU keyed by ``(guild id, dictionary version, base version)``. The current version
+    of each guild is kept in the bot cache so every process agrees on it, and a change only recompiles the guild it
+    belongs to.
+    """
+
+    def __init__(self, base: DictionaryArtifact, cache: aiocache.BaseCache, maxsize: int = 256) -> None:
+        self.base = base
+        self.cache = cache
+        self.maxsize = maxsize
+        self._artifacts: OrderedDict[tuple[int, int, str], DictionaryArtifact] = OrderedDict()
+        # the artifact each guild compiled last, by guild and base version, for lookups that cannot wait on the cache
+        self._latest: dict[tuple[int, str], DictionaryArtifact] = {}
+
+    async def _version(self, guild_id: int) -> int:
+        version = cast(int | None, await self.cache.get(f"version:{guild_id}", namespace="deabbreviator_guild"))
+        if version is None:
+            guild = await Guild.get_or_none(id=guild_id)
+            version = guild.dictionary_version if guild else 0
+            await self.cache.set(f"version:{guild_id}", version, namespace="deabbreviator_guild", ttl=VERSION_TTL)
+        return version
+
+    def _store(self, key: tuple[int, int, str], artifact: DictionaryArtifact) -> None:
+        self._artifacts[key] = artifact
+        self._artifacts.move_to_end(key)
+        self._latest[key[0], key[2]] = artifact
+        while len(self._artifacts) > self.maxsize:
+            (guild_id, _, base_version), evicted = self._artifacts.popitem(last=False)
+            if self._latest.get((guild_id, base_version)) is evicted:
+                del self._latest[guild_id, base_version]
+
+    async def _compile(self, guild_id: int, base: DictionaryArtifact) -> DictionaryArtifact:
+        entries = await GuildAbbreviation.filter(guild_id=guild_id).values_list("abbreviation", "expansion")
+        return base.extend(dict(cast(list[tuple[str, str]], entries)))
+
+    async def get(self, guild_id: int, base: DictionaryArtifact | None = None) -> DictionaryArtifact:
+        """Return the artifact to use for ``guild_id``.
+
+        :param guild_id: The guild to get the artifact of.
+        :param base: The artifact the guild's abbreviations are layered on, the default one if omitted.
+        """
+        base = base or self.base
+        version = await self._version(guild_id)
+        if not version:
+            return base
+        key = (guild_id, version, base.version)
+        if (artifact := self._artifacts.get(key)) is not None:
+            self._artifacts.move_to_end(key)
+            return artifact
+        artifact = await self._compile(guild_id, base)
+        self._store(key, artifact)
+        return artifact
+
+    def peek(self, guild_id: int, base: DictionaryArtifact | None = None) -> DictionaryArtifact:
+        """Return the artifact last compiled for ``guild_id`` on top of ``base``, without any cache or database access.
+
+        The guild's version is not checked, so a change made moments ago may be missing. Guilds that have nothing
+        compiled yet get ``base``.
+        """
+        base = base or self.base
+        return self._latest.get((guild_id, base.version), base)
+
+    async def entries(self, guild_id: int) -> dict[str, str]:
+        rows = await GuildAbbreviation.filter(guild_id=guild_id).order_by("abbreviation")
+        return {row.abbreviation: row.expansion for row in rows}
+
+    async def _bump(self, guild_id: int) -> None:
+        old_version = await self._version(guild_id)
+        await Guild.filter(id=guild_id).update(dictionary_version=F("dictionary_version") + 1)
+        guild = await Guild.get(id=guild_id)
+        await self.cache.set(
+            f"version:{guild_id}", guild.dictionary_version, namespace="deabbreviator_guild", ttl=VERSION_TTL
+        )
+        for key in [key for key in self._artifacts if key[:2] == (guild_id, old_version)]:
+            del self._artifacts[key]
+        self._store((guild_id, guild.dictionary_version, self.base.version), await self._compile(guild_id, self.base))
+
+    async def add(self, guild_id: int, abbreviation: str, expansion: str) -> bool:
+        """Add or replace a guild abbreviation.
+
+        :return: ``False`` if the guild already has the maximum number of entries.
+        """
+        await Guild.get_or_create(id=guild_id)
+        exists = await GuildAbbreviation.exists(guild_id=guild_id, abbreviation=abbreviation)
+        if not exists and await GuildAbbreviation.filter(guild_id=guild_id).count() >= MAX_GUILD_ENTRIES:
+            return False
+        await GuildAbbreviation.update_or_create(
+            guild_id=guild_id, abbreviation=abbreviation, defaults={"expansion": expansion}
+        )
+        await self._bump(guild_id)
+        return True
+
+    async def remove(self, guild_id: int, abbreviation: str) -> bool:
+        """Remove a guild abbreviation.
+
+        :return: ``False`` if the guild had no such abbreviation.
+        """
+        deleted = await GuildAbbreviation.filter(guild_id=guild_id, abbreviation=abbreviation).delete()
+        if not deleted:
+            return False
+        await self._bump(guild_id)
+        return True
+
+
+__all__ = ["MAX_EXPANSION_LENGTH", "MAX_GUILD_ENTRIES", "GuildDictionaries"]
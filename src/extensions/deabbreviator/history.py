@@ -0,0 +1,130 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import asyncio
+import tempfile
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from typing import IO, Final, final
+
+import discord
+
+from .artifact import DictionaryArtifact
+from .cache import Cached
+from .stats import HitCounter
+
+# the most messages Discord returns for a single history request
+HISTORY_PAGE: Final = 100
+MAX_MESSAGES: Final = 1000
+# exports up to this size stay in memory, larger ones are spooled to disk
+SPOOL_SIZE: Final = 1024 * 1024
+
+type BatchTranslator = Callable[[Sequence[str], DictionaryArtifact], Awaitable[list[Cached]]]
+
+
+def format_entry(message: discord.Message, text: str) -> str:
+    return f"[{message.created_at:%Y-%m-%d %H:%M}] {message.author.display_name}: {text}\n"
+
+
+def _oldest_first(spool: IO[bytes], sizes: Sequence[int]) -> IO[bytes]:
+    # pages were written newest first as they arrived, they are copied back oldest first one page at a time
+    file = tempfile.SpooledTemporaryFile(SPOOL_SIZE)  # noqa: SIM115
+    end = spool.tell()
+    for size in reversed(sizes):
+        end -= size
+        spool.seek(end)
+        file.write(spool.read(size))
+    file.seek(0)
+    return file
+
+
+@final
+class HistoryExporter:
+    """Translate the latest messages of a channel into a single text file.
+
+    One task pages through the history while another translates the page before it, with at most ``prefetch`` pages
+    waiting in between. Page requests go through the HTTP client of the bot, which reads Discord's rate limit headers
+    and waits for the bucket to refill before sending the next one. At most ``concurrency`` exports run at once, later
+    ones wait for a slot. Translated pages are written to a spooled temporary file as they arrive, so an export never
+    holds more than ``SPOOL_SIZE`` bytes of its transcript in memory.
+    """
+
+    def __init__(
+        self,
+        translate: BatchTranslator,
+        *,
+        concurrency: int = 2,
+        prefetch: int = 2,
+        stats: HitCounter | None = None,
+    ) -> None:
+        self.translate = translate
+        self.prefetch = prefetch
+        self.stats = stats
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    @staticmethod
+    async def _fetch(
+        history: AsyncIterator[discord.Message], pages: asyncio.Queue[list[discord.Message] | None]
+    ) -> None:
+        page: list[discord.Message] = []
+        try:
+            async for message in history:
+                page.append(message)
+                if len(page) == HISTORY_PAGE:
+                    await pages.put(page)
+                    page = []
+            if page:
+                await pages.put(page)
+        finally:
+            # also sent when the history cannot be read, so the translating side stops waiting
+            await pages.put(None)
+
+    async def _translate_page(
+        self, page: list[discord.Message], artifact: DictionaryArtifact, guild_id: int | None
+    ) -> tuple[bytes, int]:
+        messages = [message for message in page if message.content]
+        results = await self.translate([message.content for message in messages], artifact)
+        entries: list[str] = []
+        changed = 0
+        for message, result in zip(messages, results, strict=True):
+            if result is None:
+                entries.append(format_entry(message, message.content))
+                continue
+            translated, keys = result
+            entries.append(format_entry(message, translated))
+            changed += 1
+            if self.stats:
+                self.stats.record(guild_id, keys)
+        # history is read newest first
+        return "".join(reversed(entries)).encode(), changed
+
+    async def export(
+        self,
+        channel: discord.abc.Messageable,
+        artifact: DictionaryArtifact,
+        limit: int = MAX_MESSAGES,
+        guild_id: int | None = None,
+    ) -> tuple[IO[bytes], int]:
+        """Translate the last ``limit`` messages of ``channel``, oldest first.
+
+        :return: The file holding the transcript, positioned at its start, and how many messages were changed.
+        :raises discord.HTTPException: If the history cannot be read.
+        """
+        with tempfile.SpooledTemporaryFile(SPOOL_SIZE) as spool:
+            async with self.semaphore:
+                pages: asyncio.Queue[list[discord.Message] | None] = asyncio.Queue(maxsize=self.prefetch)
+                fetcher = asyncio.create_task(self._fetch(channel.history(limit=limit), pages))
+                sizes: list[int] = []
+                changed = 0
+                try:
+                    while (page := await pages.get()) is not None:
+                        chunk, page_changed = await self._translate_page(page, artifact, guild_id)
+                        spool.write(chunk)
+                        sizes.append(len(chunk))
+                        changed += page_changed
+                    # raises the error that ended the history early, if any
+                    await fetcher
+                finally:
+                    fetcher.cancel()
+            return _oldest_first(spool, sizes), changed
+
+
+__all__ = ["MAX_MESSAGES", "HistoryExporter", "format_entry"]
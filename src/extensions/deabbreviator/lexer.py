@@ -0,0 +1,49 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import re
+from collections.abc import Iterator
+from typing import Final
+
+# Everything Discord renders verbatim or as an entity rather than as prose. A single alternation keeps lexing to one
+# left-to-right scan of the text.
+PROTECTED_PATTERN: Final = re.compile(
+    r"""
+    ```.*?```                                       # fenced code block
+    | ``[^`].*?``                                   # inline code with double backticks
+    | `[^`]+`                                       # inline code
+    | <https?://[^\s>]+>                            # embed-suppressed link
+    | \b[a-zA-Z][\w+.-]{0,15}://\S+                 # url, the bounded scheme keeps failed attempts cheap
+    | <(?:@[!&]?|\#)\d+>                            # user, role and channel mentions
+    | <a?:\w+:\d+>                                  # custom emoji
+    | </[\w -]+:\d+>                                # slash command mention
+    | <t:-?\d+(?::[tTdDfFR])?>                      # timestamp
+    | :\w+:                                         # emoji shortcode
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+# every protected construct contains one of these, texts without any skip the scan entirely
+TRIGGERS: Final = ("`", ":", "<")
+
+
+def segments(text: str) -> Iterator[tuple[int, int, bool]]:
+    """Split ``text`` into consecutive ``(start, end, translatable)`` segments.
+
+    Code, links, mentions, custom emoji and timestamps are yielded as protected segments, everything else as
+    translatable ones.
+    """
+    if not any(trigger in text for trigger in TRIGGERS):
+        if text:
+            yield 0, len(text), True
+        return
+    last = 0
+    for match in PROTECTED_PATTERN.finditer(text):
+        start, end = match.span()
+        if start > last:
+            yield last, start, True
+        yield start, end, False
+        last = end
+    if last < len(text):
+        yield last, len(text), True
+
+
+__all__ = ["PROTECTED_PATTERN", "TRIGGERS", "segments"]
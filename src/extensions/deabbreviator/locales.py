@@ -0,0 +1,94 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Final, final
+
+from src.log import logger as main_logger
+
+from .abbreviations import DICTIONARIES_PATH, load_dictionary
+from .artifact import DictionaryArtifact
+
+logger = main_logger.getChild("deabbreviator")
+
+# locales that share another locale's dictionary file
+LOCALE_ALIASES: Final = {"es-419": "es-ES"}
+
+
+@final
+class LocaleDictionaries:
+    """Locale-specific abbreviations layered on top of the base artifact.
+
+    Nothing is read at startup: a locale's file is loaded and compiled the first time a request in that locale
+    arrives, in a thread so the event loop keeps running, and at most ``maxsize`` compiled locales are kept.
+    """
+
+    def __init__(self, base: DictionaryArtifact, maxsize: int = 8) -> None:
+        self.base = base
+        self.maxsize = maxsize
+        self._artifacts: OrderedDict[str, DictionaryArtifact] = OrderedDict()
+        self._missing: set[str] = set()
+        # compilations in progress, shared by every request waiting for the same locale
+        self._loading: dict[str, asyncio.Task[DictionaryArtifact]] = {}
+
+    def _lookup(self, locale: str) -> DictionaryArtifact | None:
+        # the compiled artifact, the base one for a locale without dictionary, or None if the locale is not loaded yet
+        if (artifact := self._artifacts.get(locale)) is not None:
+            self._artifacts.move_to_end(locale)
+            return artifact
+        return self.base if locale in self._missing else None
+
+    def _compile(self, locale: str) -> DictionaryArtifact | None:
+        # runs in a thread, and only reads the file and the base artifact
+        path = os.path.join(DICTIONARIES_PATH, f"{locale}.yml")
+        try:
+            entries = load_dictionary(path)
+        except FileNotFoundError:
+            return None
+        logger.info(f"Loaded {len(entries)} abbreviations for locale {locale}")
+        return self.base.extend(entries)
+
+    async def _load(self, locale: str) -> DictionaryArtifact:
+        try:
+            artifact = await asyncio.to_thread(self._compile, locale)
+        finally:
+            del self._loading[locale]
+        if artifact is None:
+            self._missing.add(locale)
+            return self.base
+        self._artifacts[locale] = artifact
+        while len(self._artifacts) > self.maxsize:
+            self._artifacts.popitem(last=False)
+        return artifact
+
+    def _start(self, locale: str) -> asyncio.Task[DictionaryArtifact]:
+        if (task := self._loading.get(locale)) is None:
+            task = self._loading[locale] = asyncio.create_task(self._load(locale))
+        return task
+
+    async def get(self, locale: str | None) -> DictionaryArtifact:
+        """Return the artifact to use for ``locale``, or the base one if it has no dictionary."""
+        if not locale:
+            return self.base
+        locale = LOCALE_ALIASES.get(locale, locale)
+        if (artifact := self._lookup(locale)) is not None:
+            return artifact
+        # a request given up on does not cancel the compilation others may be waiting for
+        return await asyncio.shield(self._start(locale))
+
+    def peek(self, locale: str | None) -> DictionaryArtifact:
+        """Return the artifact compiled for ``locale`` without waiting for it.
+
+        A locale that is not compiled yet gets the base artifact, while its compilation starts for the next requests.
+        """
+        if not locale:
+            return self.base
+        locale = LOCALE_ALIASES.get(locale, locale)
+        if (artifact := self._lookup(locale)) is not None:
+            return artifact
+        self._start(locale)
+        return self.base
+
+
+__all__ = ["LocaleDictionaries"]
@@ -1,160 +1,424 @@
 # Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
 
-import re
-from functools import cached_property
-from typing import Any, Final, cast, final
+import io
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable, Sequence
+from itertools import chain, islice
+from typing import Any, Final, cast, final, override
 
 import discord
 from discord.ext import commands
+from schema import Optional, Or, Schema
 
 from src import custom
+from src.i18n.classes import RawTranslation, apply_locale
+from src.log import logger
 from src.utils.cooldown import BucketType, cooldown
 
-default: Final = {"enabled": True}
+from .abbreviations import ABBREVIATIONS, DEFAULT_DICTIONARY_PATH, is_valid_abbreviation
+from .api import share_cache
+from .artifact import DictionaryArtifact, configured_artifact, install_artifact
+from .attachments import MAX_ATTACHMENT_SIZE, UPLOAD_LIMIT, AttachmentTranslator, is_text_attachment
+from .auto import AutoDeabbreviator
+from .batch import reset_pool, shutdown_pool
+from .cache import COMPRESS_THRESHOLD, MAX_CACHED_LENGTH, Cached, cached_translation, cached_translations
+from .edits import EDIT_TTL, EditTracker
+from .guilds import MAX_EXPANSION_LENGTH, MAX_GUILD_ENTRIES, GuildDictionaries
+from .history import MAX_MESSAGES, HistoryExporter
+from .locales import LocaleDictionaries
+from .matchers import BACKENDS, DEFAULT_BACKEND
+from .preferences import Preference, PreferenceVariants, UserPreferences, load_categories
+from .prefilter import fast_path_stats
+from .preview import LatencyHistogram, PreviewCache
+from .relay import WebhookRelay
+from .reload import DictionaryWatcher
+from .result import TranslationResult
+from .stats import FLUSH_INTERVAL, MAX_PENDING, HitCounter
+from .streaming import MESSAGE_LIMIT, iter_pages, iter_translate
+
+default: Final = {
+    "enabled": True,
+    "backend": DEFAULT_BACKEND,
+    "dictionary_path": None,
+    "reload_interval": 5.0,
+    "disambiguate": False,
+    "guild_dictionaries": False,
+    "guild_cache_size": 256,
+    "locale_cache_size": 8,
+    "preview_cache_size": 1024,
+    "user_preferences": False,
+    "preference_variants_size": 64,
+    "max_length": 4000,
+    "max_pages": 3,
+    "cache_max_length": MAX_CACHED_LENGTH,
+    "cache_compress_threshold": COMPRESS_THRESHOLD,
+    "auto_channels": False,
+    "auto_queue_size": 1000,
+    "auto_workers": 2,
+    "auto_batch_size": 50,
+    "relay": False,
+    "relay_cache_size": 256,
+    "auto_edits": True,
+    "auto_edit_cache_size": 1000,
+    "auto_edit_ttl": EDIT_TTL,
+    "hit_stats": False,
+    "hit_stats_interval": FLUSH_INTERVAL,
+    "hit_stats_max_pending": MAX_PENDING,
+    "history_exports": False,
+    "history_max_messages": MAX_MESSAGES,
+    "history_concurrency": 2,
+    "attachments": True,
+    "attachment_max_size": MAX_ATTACHMENT_SIZE,
+    "attachment_concurrency": 2,
+    "api_tokens": [],
+    "api_public": False,
+    "api_concurrency": 4,
+    "api_max_batch": 1000,
+    "api_max_length": 20000,
+}
+
+schema: Final = Schema(
+    {
+        "enabled": bool,
+        Optional("backend"): Or(*BACKENDS),
+        Optional("artifact_path"): Or(str, None),
+        Optional("dictionary_path"): Or(str, None),
+        Optional("reload_interval"): Or(int, float),
+        Optional("disambiguate"): bool,
+        Optional("guild_dictionaries"): bool,
+        Optional("guild_cache_size"): int,
+        Optional("locale_cache_size"): int,
+        Optional("preview_cache_size"): int,
+        Optional("user_preferences"): bool,
+        Optional("preference_variants_size"): int,
+        Optional("max_length"): int,
+        Optional("max_pages"): int,
+        Optional("cache_max_length"): int,
+        Optional("cache_compress_threshold"): int,
+        Optional("auto_channels"): bool,
+        Optional("auto_queue_size"): int,
+        Optional("auto_workers"): int,
+        Optional("auto_batch_size"): int,
+        Optional("relay"): bool,
+        Optional("relay_cache_size"): int,
+        Optional("auto_edits"): bool,
+        Optional("auto_edit_cache_size"): int,
+        Optional("auto_edit_ttl"): Or(int, float),
+        Optional("hit_stats"): bool,
+        Optional("hit_stats_interval"): Or(int, float),
+        Optional("hit_stats_max_pending"): int,
+        Optional("history_exports"): bool,
+        Optional("history_max_messages"): int,
+        Optional("history_concurrency"): int,
+        Optional("attachments"): bool,
+        Optional("attachment_max_size"): int,
+        Optional("attachment_concurrency"): int,
+        Optional("api_tokens"): [str],
+        Optional("api_public"): bool,
+        Optional("api_concurrency"): int,
+        Optional("api_max_batch"): int,
+        Optional("api_max_length"): int,
+    },
+)
 
 
 @final
 class Deabbreviator(commands.Cog):
-    ABBREVIATIONS: Final = {
-        "ngl": "not gonna lie",
-        "nvm": "nevermind",
-        "idk": "I don't know",
-        "brb": "be right back",
-        "btw": "by the way",
-        "ty": "thank you",
-        "thy": "thank you",
-        "tx": "thanks",
-        "thx": "thanks",
-        "yw": "you're welcome",
-        "asap": "as soon as possible",
-        "fyi": "for your information",
-        "np": "no problem",
-        "omw": "on my way",
-        "lmk": "let me know",
-        "afaik": "as far as I know",
-        "nafaik": "not as far as I know",
-        "b4": "before",
-        "bc": "because",
-        "td": "today",
-        "tmr": "tomorrow",
-        "tmrw": "tomorrow",
-        "tmoro": "tomorrow",
-        "yd": "yesterday",
-        "msg": "message",
-        "abt": "about",
-        "dm": "direct message",
-        "pm": "private message",
-        "irl": "in real life",
-        "imo": "in my opinion",
-        "smh": "shaking my head",
-        "sm": "so much",
-        "lol": "laughing out loud",
-        "rofl": "rolling on the floor laughing",
-        "grl": "girl",
-        "ur": "you're",
-        "qt": "cutie",
-        "fr": "for real",
-        "gf": "girlfriend",
-        "bf": "boyfriend",
-        "rn": "right now",
-        "l8r": "later",
-        "wtf": "what the f***",
-        "omg": "oh my god",
-        "ily": "I love you",
-        "ily2": "I love you too",
-        "ilym": "I love you more",
-        "ilyt": "I love you too",
-        "afk": "away from keyboard",
-        "bbl": "be back later",
-        "bbs": "be back soon",
-        "g2g": "got to go",
-        "gtg": "got to go",
-        "dms": "direct messages",
-        "pls": "please",
-        "u": "you",
-        "bst": "bestie",
-        "gae": "good at everything",
-        "dw": "don't worry",
-        "dwab": "don't worry about it",
-        "fs": "for sure",
-        "stfu": "shut the f*** up",
-        "ong": "oh my god",
-        "eg": "example",
-        "aka": "also known as",
-        "tldr": "too long didn't read",
-        "tmi": "too much information",
-        "ttyl": "talk to you later",
-        "tysm": "thank you so much",
-        "wbu": "what about you",
-        "wfh": "work from home",
-        "wym": "what do you mean",
-        "wyd": "what you doing",
-        "wya": "where you at",
-        "u2": "you too",
-        "wb": "welcome back",
-        "gn": "good night",
-        "gm": "good morning",
-        "gd": "good",
-        "gj": "good job",
-        "gg": "good game",
-        "gl": "good luck",
-        "ilysm": "I love you so much",
-        "k": "okay",
-        "kk": "okay",
-        "ok": "okay",
-        "pfp": "profile picture",
-        "fu": "f*** you",
-        "fml": "f*** my life",
-        "ffs": "for f***'s sake",
-        "fgs": "for god's sake",
-        "smth": "something",
-        "idw": "it doesn't work",
-        "idc": "I don't care",
-        "nbd": "no big deal",
-        "nfs": "not for sale",
-        "lgtm": "looks good to me",
-        "lmao": "laughing my a** off",
-        "l8": "late",
-        "sys": "see you soon",
-        "sry": "sorry",
-        "ss": "screenshot",
-        "bff": "best friend forever",
-        "sya": "see you again",
-        "sup": "what's up",
-        "bro": "brother",
-    }
-
-    def __init__(self, bot: custom.Bot) -> None:
+    ABBREVIATIONS: Final = ABBREVIATIONS
+
+    def __init__(self, bot: custom.Bot, config: dict[str, Any] | None = None) -> None:  # pyright: ignore[reportExplicitAny]
         self.bot = bot
+        self.config = config if config is not None else default
+        artifact = configured_artifact(self.config)
+        self.context = artifact.context
+        self.artifact: DictionaryArtifact = self.prepare_artifact(artifact)
+        self.locale_dictionaries = LocaleDictionaries(self.artifact, self.config.get("locale_cache_size", 8))
+        self.guild_dictionaries: GuildDictionaries | None = None
+        if self.config.get("guild_dictionaries", False):
+            self.guild_dictionaries = GuildDictionaries(
+                self.artifact, bot.botkit_cache, self.config.get("guild_cache_size", 256)
+            )
+        self.previews = PreviewCache(self.config.get("preview_cache_size", 1024))
+        self.preferences: UserPreferences | None = None
+        self.variants = PreferenceVariants(load_categories(), self.config.get("preference_variants_size", 64))
+        if self.config.get("user_preferences", False):
+            # the users previewing are the ones whose preferences must be at hand without waiting on the cache
+            self.preferences = UserPreferences(bot.botkit_cache, self.config.get("preview_cache_size", 1024))
+        self.preview_latency = LatencyHistogram()
+        self.stats: HitCounter | None = None
+        if self.config.get("hit_stats", False):
+            self.stats = HitCounter(
+                self.config.get("hit_stats_interval", FLUSH_INTERVAL),
+                self.config.get("hit_stats_max_pending", MAX_PENDING),
+            )
+        self.auto: AutoDeabbreviator | None = None
+        if self.config.get("auto_channels", False):
+            self.auto = AutoDeabbreviator(
+                self.artifact_for_message,
+                self.format_auto_reply,
+                stats=self.stats,
+                queue_size=self.config.get("auto_queue_size", 1000),
+                workers=self.config.get("auto_workers", 2),
+                batch_size=self.config.get("auto_batch_size", 50),
+                relay=WebhookRelay(bot, bot.botkit_cache, self.config.get("relay_cache_size", 256))
+                if self.config.get("relay", False)
+                else None,
+                edits=EditTracker(
+                    self.format_auto_reply,
+                    self.config.get("auto_edit_cache_size", 1000),
+                    self.config.get("auto_edit_ttl", EDIT_TTL),
+                )
+                if self.config.get("auto_edits", True)
+                else None,
+            )
+        self.history: HistoryExporter | None = None
+        if self.config.get("history_exports", False):
+            self.history = HistoryExporter(
+                self.cached_translations,
+                concurrency=self.config.get("history_concurrency", 2),
+                stats=self.stats,
+            )
+        self.attachments: AttachmentTranslator | None = None
+        if self.config.get("attachments", True):
+            self.attachments = AttachmentTranslator(
+                max_size=self.config.get("attachment_max_size", MAX_ATTACHMENT_SIZE),
+                concurrency=self.config.get("attachment_concurrency", 2),
+                stats=self.stats,
+            )
+        self.watcher: DictionaryWatcher | None = None
+        if interval := self.config.get("reload_interval", 5.0):
+            self.watcher = DictionaryWatcher(
+                self.config.get("dictionary_path") or DEFAULT_DICTIONARY_PATH,
+                self.artifact,
+                self.swap_artifact,
+                interval,
+                self.config.get("artifact_path"),
+            )
+
+    @override
+    def cog_unload(self) -> None:
+        if self.auto:
+            self.auto.stop()
+        if self.watcher:
+            self.watcher.stop()
+        if self.attachments:
+            self.attachments.stop()
+        if self.stats:
+            # the counter flushes one last time as its task is cancelled
+            self.stats.stop()
+        shutdown_pool()
+        logger.info(f"Deabbreviator fast path: {fast_path_stats}")
+        logger.info(f"Deabbreviator previews: {self.preview_latency}")
+
+    def prepare_artifact(self, artifact: DictionaryArtifact) -> DictionaryArtifact:
+        """Apply the context rules to ``artifact`` and make it the process-wide one, shared with batch workers."""
+        artifact = artifact.with_context(self.context)
+        install_artifact(artifact)
+        return artifact
+
+    def swap_artifact(self, artifact: DictionaryArtifact) -> None:
+        """Make ``artifact`` the base of every translation started from now on.
 
-    def replace_match(self, match: re.Match[str]) -> str:
-        original_word = match.group()
-        translated_word = self.ABBREVIATIONS[original_word.lower()]
-        if original_word.isupper():
-            return translated_word.upper()
-        if original_word[0].isupper():
-            return translated_word.capitalize()
-        return translated_word
+        Cached results are keyed by dictionary version, so entries of the previous dictionary are simply never read
+        again and expire on their own.
+        """
+        self.artifact = artifact = self.prepare_artifact(artifact)
+        self.locale_dictionaries = LocaleDictionaries(artifact, self.config.get("locale_cache_size", 8))
+        if self.guild_dictionaries:
+            self.guild_dictionaries.base = artifact
+        reset_pool()
 
     def translate_string(self, text: str) -> str:
-        return self.translation_pattern.sub(self.replace_match, text)
-
-    @cached_property
-    def translation_pattern(self) -> re.Pattern[str]:
-        # Escape each word to handle regex special characters and sort by descending length
-        escaped_words = [re.escape(word) for word in self.ABBREVIATIONS]
-        escaped_words.sort(key=lambda x: len(x), reverse=True)
-        # Create the regex pattern to match word boundaries and include word breaks
-        pattern = r"\b(" + "|".join(escaped_words) + r")\b"
-        return re.compile(pattern, flags=re.IGNORECASE)
-
-    async def async_translate_string(self, text: str) -> str:
-        t: Any = None  # pyright: ignore[reportExplicitAny]
-        if t := await self.bot.botkit_cache.get(text, namespace="deabbreviator"):
-            return cast(str, t)
-        t = self.translate_string(text)
-        await self.bot.botkit_cache.set(text, t, namespace="deabbreviator", ttl=60 * 60)
-        return cast(str, t)
+        return self.artifact.translate(text)
+
+    def analyze(self, text: str) -> TranslationResult:
+        return self.artifact.analyze(text)
+
+    async def resolve_artifact(self, locale: str | None, guild_id: int | None) -> DictionaryArtifact:
+        """Return the artifact to translate with for a locale and guild.
+
+        Guild abbreviations take precedence over the ones of the locale, which take precedence over the default ones.
+        """
+        artifact = await self.locale_dictionaries.get(locale)
+        if self.guild_dictionaries and guild_id:
+            return await self.guild_dictionaries.get(guild_id, artifact)
+        return artifact
+
+    async def artifact_for(self, ctx: custom.ApplicationContext) -> DictionaryArtifact:
+        """Return the artifact to translate with for the locale, guild and preferences of whoever invoked ``ctx``."""
+        artifact = await self.resolve_artifact(ctx.locale, ctx.guild_id)
+        if self.preferences and ctx.user:
+            return self.variants.get(artifact, await self.preferences.get(ctx.user.id))
+        return artifact
+
+    async def artifact_for_message(self, message: discord.Message) -> DictionaryArtifact:
+        guild = message.guild
+        return await self.resolve_artifact(guild.preferred_locale if guild else None, guild.id if guild else None)
+
+    def format_auto_reply(self, message: discord.Message, translated: str) -> str:
+        translations: dict[str, RawTranslation] = self.config["translations"]
+        locale = message.guild.preferred_locale if message.guild else None
+        return apply_locale(translations, locale).auto_reply.format(
+            message=translated, user=message.author.display_name, message_link=message.jump_url
+        )
+
+    @commands.Cog.listener("on_ready", once=True)
+    async def on_ready(self) -> None:
+        if self.watcher:
+            self.watcher.start()
+        if self.stats:
+            self.stats.start()
+        if self.auto:
+            await self.auto.load_channels()
+            self.auto.start()
+
+    @commands.Cog.listener("on_message")
+    async def on_message(self, message: discord.Message) -> None:
+        if not self.auto or message.author.bot or not message.content:
+            return
+        if message.channel.id in self.auto.channels:
+            self.auto.submit(message)
+
+    @commands.Cog.listener("on_message_edit")
+    async def on_message_edit(self, before: discord.Message, after: discord.Message) -> None:
+        # embeds loading also count as edits, only changes of the text matter
+        if self.auto and before.content != after.content and after.channel.id in self.auto.channels:
+            await self.auto.edit(after)
+
+    async def async_translate_string(self, text: str, artifact: DictionaryArtifact | None = None) -> str:
+        cached = await self.cached_translation(text, artifact)
+        return text if cached is None else cached[0]
+
+    async def cached_translation(
+        self, text: str, artifact: DictionaryArtifact | None = None
+    ) -> tuple[str, Sequence[str]] | None:
+        """Translate ``text`` through the result cache.
+
+        :return: The translation and the key of every match, or ``None`` if the text has nothing to expand.
+        """
+        return await cached_translation(
+            self.bot.botkit_cache,
+            artifact or self.artifact,
+            text,
+            self.config.get("cache_max_length", MAX_CACHED_LENGTH),
+            self.config.get("cache_compress_threshold", COMPRESS_THRESHOLD),
+        )
+
+    async def cached_translations(
+        self, texts: Sequence[str], artifact: DictionaryArtifact | None = None
+    ) -> list[Cached]:
+        """Like :meth:`cached_translation` for many texts, with a single cache round trip."""
+        return await cached_translations(
+            self.bot.botkit_cache,
+            artifact or self.artifact,
+            texts,
+            self.config.get("cache_max_length", MAX_CACHED_LENGTH),
+            self.config.get("cache_compress_threshold", COMPRESS_THRESHOLD),
+        )
+
+    async def respond_translation(
+        self, ctx: custom.ApplicationContext, text: str, template: Callable[[str], str] = str
+    ) -> None:
+        """Translate ``text`` and send it as one or more pages, or as a file if it does not fit in ``max_pages``.
+
+        Short texts go through the result cache. Longer ones are translated in chunks and streamed into pages, so the
+        full translated text is never held next to the original.
+        """
+        if len(text) > self.config.get("max_length", 4000):
+            await ctx.respond(ctx.translations.max_length)
+            return
+        artifact = await self.artifact_for(ctx)
+        chunks: Iterable[str]
+        keys: Iterable[str]
+        # the pre-filter runs on the way, in the cache lookup or on every chunk
+        counts: Counter[str] | None = None
+        if len(text) <= MESSAGE_LIMIT:
+            cached = await self.cached_translation(text, artifact)
+            if cached is None:
+                await ctx.respond(ctx.translations.no_abbreviations)
+                return
+            a, keys = cached
+            chunks = (a,)
+        else:
+            # filled in as the chunks are translated, complete once every page has been consumed
+            counts = Counter()
+            chunks = iter_translate(text, artifact=artifact, counts=counts)
+            keys = counts.elements()
+
+        footer = template("")
+        max_pages: int = self.config.get("max_pages", 3)
+        pages = iter_pages(chunks, MESSAGE_LIMIT - len(footer))
+        first_pages = list(islice(pages, max_pages + 1))
+        file: io.BytesIO | None = None
+        if len(first_pages) > max_pages:
+            file = io.BytesIO()
+            for page in chain(first_pages, pages):
+                file.write(page.encode())
+            file.seek(0)
+        # every chunk has been translated by now
+        if counts is not None and not counts:
+            await ctx.respond(ctx.translations.no_abbreviations)
+            return
+        if file is None:
+            for i, page in enumerate(first_pages, start=1):
+                await ctx.respond(template(page) if i == len(first_pages) else page)
+        else:
+            await ctx.respond(footer.strip() or None, file=discord.File(file, filename="deabbreviated.txt"))
+        if self.stats:
+            self.stats.record(ctx.guild_id, keys)
+
+    async def respond_attachments(
+        self, ctx: custom.ApplicationContext, message: discord.Message, attachments: Sequence[discord.Attachment]
+    ) -> None:
+        """Translate the text attachments of ``message`` and send the translations back as files.
+
+        Attachments without abbreviations are left out, and so are the ones that would push the upload past the limit
+        of Discord. The translated content of the message is shown above the files if it has abbreviations.
+        """
+        # downloading large files can take longer than Discord waits for the first response
+        await ctx.defer()
+        artifact = await self.artifact_for(ctx)
+        translator = cast(AttachmentTranslator, self.attachments)
+        files: list[discord.File] = []
+        uploaded = 0
+        too_large = False
+        try:
+            for attachment in attachments:
+                translated = await translator.translate(attachment, artifact, ctx.guild_id)
+                if translated is None:
+                    too_large = True
+                    continue
+                file, changed = translated
+                size = file.seek(0, io.SEEK_END)
+                file.seek(0)
+                if not changed or uploaded + size > UPLOAD_LIMIT:
+                    too_large = too_large or bool(changed)
+                    file.close()
+                    continue
+                uploaded += size
+                files.append(discord.File(file, filename=f"deabbreviated-{attachment.filename}"))  # pyright: ignore[reportArgumentType]
+            if not files:
+                await ctx.respond(ctx.translations.too_large if too_large else ctx.translations.no_abbreviations)
+                return
+            text = ctx.translations.attachments.format(count=len(files))
+            if message.content and (cached := await self.cached_translation(message.content, artifact)):
+                text, keys = cached
+                if self.stats:
+                    self.stats.record(ctx.guild_id, keys)
+            content = ctx.translations.success.format(
+                message=text, user=message.author.display_name, message_link=message.jump_url
+            )
+            if len(content) > MESSAGE_LIMIT:
+                content = ctx.translations.success.format(
+                    message=ctx.translations.attachments.format(count=len(files)),
+                    user=message.author.display_name,
+                    message_link=message.jump_url,
+                )
+            await ctx.respond(content, files=files)
+        finally:
+            for file in files:
+                file.close()
 
     @discord.message_command(  # pyright: ignore[reportUntypedFunctionDecorator]
         name="Deabbreviate message",
@@ -167,14 +431,39 @@ class Deabbreviator(commands.Cog):
     )
     @cooldown(key="deabbreviate_message", limit=1, per=5, bucket_type=BucketType.USER)
     async def deabbreviate_message(self, ctx: custom.ApplicationContext, message: discord.Message) -> None:
-        a: str = await self.async_translate_string(message.content)
-        if a == message.content:
-            await ctx.respond(ctx.translations.no_abbreviations)
+        attachments = [a for a in message.attachments if is_text_attachment(a)] if self.attachments else []
+        if attachments:
+            await self.respond_attachments(ctx, message, attachments)
             return
-        await ctx.respond(
-            ctx.translations.success.format(message=a, user=message.author.display_name, message_link=message.jump_url)
+        await self.respond_translation(
+            ctx,
+            message.content,
+            lambda a: ctx.translations.success.format(
+                message=a, user=message.author.display_name, message_link=message.jump_url
+            ),
         )
 
+    async def preview_autocomplete(self, ctx: discord.AutocompleteContext) -> list[discord.OptionChoice]:
+        """Show the translation of the text being typed as the only choice.
+
+        Runs on every keystroke, so the artifact is resolved from memory only: guild abbreviations compiled by an
+        earlier command are used, but the bot cache is never asked whether they are current, and a locale that is not
+        compiled yet is previewed with the default dictionary while it compiles.
+        """
+        start = time.perf_counter()
+        try:
+            text: str = ctx.value or ""
+            interaction = ctx.interaction
+            artifact = self.locale_dictionaries.peek(interaction.locale)
+            if self.guild_dictionaries and interaction.guild_id:
+                artifact = self.guild_dictionaries.peek(interaction.guild_id, artifact)
+            if self.preferences and interaction.user:
+                artifact = self.variants.get(artifact, self.preferences.peek(interaction.user.id))
+            preview = self.previews.preview(interaction.user.id, artifact, text)  # pyright: ignore[reportOptionalMemberAccess]
+            return [discord.OptionChoice(name=preview, value=text)] if preview else []
+        finally:
+            self.preview_latency.record(time.perf_counter() - start)
+
     @discord.slash_command(  # pyright: ignore[reportUntypedFunctionDecorator]
         name="deabbreviate",
         integration_types={discord.IntegrationType.guild_install, discord.IntegrationType.user_install},
@@ -184,14 +473,171 @@ class Deabbreviator(commands.Cog):
             discord.InteractionContextType.private_channel,
         },
     )
+    @discord.option("text", str, autocomplete=preview_autocomplete)  # pyright: ignore[reportUntypedFunctionDecorator]
     @cooldown(key="deabbreviate", limit=1, per=5, bucket_type=BucketType.USER)
     async def deabbreviate(self, ctx: custom.ApplicationContext, text: str) -> None:
-        a: str = await self.async_translate_string(text)
-        if a == text:
-            await ctx.respond(ctx.translations.no_abbreviations)
+        # slash commands do not have an original message to reference
+        await self.respond_translation(ctx, text)
+
+
+@final
+class GuildDictionaryCommands(commands.Cog):
+    dictionary = discord.SlashCommandGroup(
+        name="dictionary",
+        description="Manage this server's custom abbreviations",
+        integration_types={discord.IntegrationType.guild_install},
+        contexts={discord.InteractionContextType.guild},
+        default_member_permissions=discord.Permissions(manage_guild=True),
+    )
+
+    def __init__(self, bot: custom.Bot, dictionaries: GuildDictionaries) -> None:
+        self.bot = bot
+        self.dictionaries = dictionaries
+
+    @dictionary.command(name="add")  # pyright: ignore[reportUntypedFunctionDecorator]
+    @cooldown(key="dictionary", limit=5, per=30, bucket_type=BucketType.GUILD)
+    async def dictionary_add(self, ctx: custom.ApplicationContext, abbreviation: str, expansion: str) -> None:
+        abbreviation = abbreviation.strip().lower()
+        expansion = expansion.strip()
+        if not is_valid_abbreviation(abbreviation) or not expansion or len(expansion) > MAX_EXPANSION_LENGTH:
+            await ctx.respond(ctx.translations.invalid, ephemeral=True)
+            return
+        if not await self.dictionaries.add(cast(int, ctx.guild_id), abbreviation, expansion):
+            await ctx.respond(ctx.translations.limit.format(limit=MAX_GUILD_ENTRIES), ephemeral=True)
+            return
+        await ctx.respond(ctx.translations.success.format(abbreviation=abbreviation, expansion=expansion))
+
+    @dictionary.command(name="remove")  # pyright: ignore[reportUntypedFunctionDecorator]
+    @cooldown(key="dictionary", limit=5, per=30, bucket_type=BucketType.GUILD)
+    async def dictionary_remove(self, ctx: custom.ApplicationContext, abbreviation: str) -> None:
+        abbreviation = abbreviation.strip().lower()
+        if not await self.dictionaries.remove(cast(int, ctx.guild_id), abbreviation):
+            await ctx.respond(ctx.translations.not_found.format(abbreviation=abbreviation), ephemeral=True)
+            return
+        await ctx.respond(ctx.translations.success.format(abbreviation=abbreviation))
+
+    @dictionary.command(name="list")  # pyright: ignore[reportUntypedFunctionDecorator]
+    @cooldown(key="dictionary_list", limit=1, per=5, bucket_type=BucketType.USER)
+    async def dictionary_list(self, ctx: custom.ApplicationContext) -> None:
+        entries = await self.dictionaries.entries(cast(int, ctx.guild_id))
+        if not entries:
+            await ctx.respond(ctx.translations.empty, ephemeral=True)
+            return
+        lines = "\n".join(f"- `{abbreviation}`: {expansion}" for abbreviation, expansion in entries.items())
+        await ctx.respond(discord.utils.escape_mentions(lines)[:2000], ephemeral=True)
+
+
+@final
+class PreferenceCommands(commands.Cog):
+    def __init__(self, bot: custom.Bot, preferences: UserPreferences) -> None:
+        self.bot = bot
+        self.preferences = preferences
+
+    @discord.slash_command(  # pyright: ignore[reportUntypedFunctionDecorator]
+        name="preferences",
+        integration_types={discord.IntegrationType.guild_install, discord.IntegrationType.user_install},
+        contexts={
+            discord.InteractionContextType.guild,
+            discord.InteractionContextType.bot_dm,
+            discord.InteractionContextType.private_channel,
+        },
+    )
+    @cooldown(key="preferences", limit=2, per=10, bucket_type=BucketType.USER)
+    async def preferences_command(
+        self, ctx: custom.ApplicationContext, skip_profanity: bool | None = None, skip_slang: bool | None = None
+    ) -> None:
+        user_id = cast(discord.User, ctx.user).id
+        current = await self.preferences.get(user_id)
+        preferences = current
+        for preference, skip in ((Preference.PROFANITY, skip_profanity), (Preference.SLANG, skip_slang)):
+            if skip is not None:
+                preferences = preferences | preference if skip else preferences & ~preference
+        if preferences != current:
+            await self.preferences.set(user_id, preferences)
+
+        def state(preference: Preference) -> str:
+            return ctx.translations.skipped if preferences & preference else ctx.translations.expanded
+
+        await ctx.respond(
+            ctx.translations.success.format(profanity=state(Preference.PROFANITY), slang=state(Preference.SLANG)),
+            ephemeral=True,
+        )
+
+
+@final
+class AutoDeabbreviateCommands(commands.Cog):
+    def __init__(self, bot: custom.Bot, auto: AutoDeabbreviator) -> None:
+        self.bot = bot
+        self.auto = auto
+
+    @discord.slash_command(  # pyright: ignore[reportUntypedFunctionDecorator]
+        name="autodeabbreviate",
+        integration_types={discord.IntegrationType.guild_install},
+        contexts={discord.InteractionContextType.guild},
+        default_member_permissions=discord.Permissions(manage_channels=True),
+    )
+    @cooldown(key="autodeabbreviate", limit=1, per=5, bucket_type=BucketType.CHANNEL)
+    async def autodeabbreviate(self, ctx: custom.ApplicationContext, enabled: bool, relay: bool = False) -> None:
+        relay = relay and self.auto.relay is not None
+        await self.auto.set_channel(ctx.channel_id, enabled, relay)  # pyright: ignore[reportArgumentType]
+        if not enabled:
+            await ctx.respond(ctx.translations.disabled)
+            return
+        await ctx.respond(ctx.translations.relay_enabled if relay else ctx.translations.enabled)
+
+
+@final
+class HistoryCommands(commands.Cog):
+    def __init__(self, bot: custom.Bot, deabbreviator: Deabbreviator, exporter: HistoryExporter) -> None:
+        self.bot = bot
+        self.deabbreviator = deabbreviator
+        self.exporter = exporter
+
+    @discord.slash_command(  # pyright: ignore[reportUntypedFunctionDecorator]
+        name="deabbreviatehistory",
+        integration_types={discord.IntegrationType.guild_install},
+        contexts={discord.InteractionContextType.guild},
+        default_member_permissions=discord.Permissions(manage_messages=True),
+    )
+    @cooldown(key="deabbreviatehistory", limit=1, per=60, bucket_type=BucketType.CHANNEL)
+    async def deabbreviatehistory(self, ctx: custom.ApplicationContext, messages: int) -> None:
+        max_messages: int = self.deabbreviator.config.get("history_max_messages", MAX_MESSAGES)
+        await ctx.defer()
+        artifact = await self.deabbreviator.artifact_for(ctx)
+        try:
+            file, changed = await self.exporter.export(
+                ctx.channel,  # pyright: ignore[reportArgumentType]
+                artifact,
+                max(1, min(messages, max_messages)),
+                ctx.guild_id,
+            )
+        except discord.Forbidden:
+            await ctx.respond(ctx.translations.forbidden)
             return
-        await ctx.respond(a)  # slash commands do not have an original message to reference
+        with file:
+            if not changed:
+                await ctx.respond(ctx.translations.no_abbreviations)
+                return
+            await ctx.respond(
+                ctx.translations.success.format(count=changed),
+                file=discord.File(file, filename="deabbreviated.txt"),  # pyright: ignore[reportArgumentType]
+            )
 
 
-def setup(bot: custom.Bot) -> None:
-    bot.add_cog(Deabbreviator(bot))
+def setup(bot: custom.Bot, config: dict[str, Any]) -> None:  # pyright: ignore[reportExplicitAny]
+    cog = Deabbreviator(bot, config)
+    bot.add_cog(cog)
+    # the HTTP API served by this process answers from the same result cache as the bot
+    share_cache(bot.botkit_cache)
+    if cog.guild_dictionaries:
+        bot.add_cog(GuildDictionaryCommands(bot, cog.guild_dictionaries))
+    if cog.preferences:
+        bot.add_cog(PreferenceCommands(bot, cog.preferences))
+    if cog.auto:
+        # reading every message of opted-in channels needs the privileged message content intent
+        bot.intents.message_content = True
+        bot.add_cog(AutoDeabbreviateCommands(bot, cog.auto))
+    if cog.history:
+        # like auto deabbreviation, reading the content of past messages needs the message content intent
+        bot.intents.message_content = True
+        bot.add_cog(HistoryCommands(bot, cog, cog.history))
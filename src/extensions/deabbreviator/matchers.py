@@ -0,0 +1,235 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import re
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Iterator
+from collections.abc import Set as AbstractSet
+from itertools import chain
+from typing import Final, final, override
+
+from .compact import CompactDictionary
+
+type Replacer = Callable[[str], str]
+# decides from the text and the span of a match whether it is replaced
+type SpanFilter = Callable[[str, int, int], bool]
+
+# Every abbreviation is made of word characters only, so a match is always a whole ``\w+`` token.
+WORD_PATTERN: Final = re.compile(r"\w+")
+
+
+class Matcher(ABC):
+    """Find whole-word, case-insensitive occurrences of dictionary keys in a text."""
+
+    def __init__(self, keys: Iterable[str]) -> None:
+        self.keys: AbstractSet[str] = frozenset(key.lower() for key in keys)
+
+    @abstractmethod
+    def finditer(self, text: str) -> Iterator[tuple[int, int]]:
+        """Yield the ``(start, end)`` span of every match, from left to right."""
+
+    def sub(self, replace: Replacer, text: str, keep: SpanFilter | None = None) -> str:
+        """Replace every match with ``replace(matched_word)``, skipping those ``keep`` rejects."""
+        parts: list[str] = []
+        last = 0
+        for start, end in self.finditer(text):
+            if keep is not None and not keep(text, start, end):
+                continue
+            parts.append(text[last:start])
+            parts.append(replace(text[start:end]))
+            last = end
+        if not parts:
+            return text
+        parts.append(text[last:])
+        return "".join(parts)
+
+    def extend(self, keys: Iterable[str]) -> "Matcher":
+        """Return a matcher of the same backend for the keys of this one and ``keys``."""
+        return type(self)(chain(self.keys, keys))
+
+    def without(self, keys: Iterable[str]) -> "Matcher":
+        """Return a matcher of the same backend for the keys of this one but ``keys``."""
+        removed = frozenset(key.lower() for key in keys)
+        return type(self)(key for key in self.keys if key not in removed)
+
+
+@final
+class RegexMatcher(Matcher):
+    r"""Single ``\b(a|b|...)\b`` alternation, longest keys first."""
+
+    def __init__(self, keys: Iterable[str]) -> None:
+        super().__init__(keys)
+        # Escape each word to handle regex special characters and sort by descending length
+        escaped_words = [re.escape(word) for word in self.keys]
+        escaped_words.sort(key=len, reverse=True)
+        # Create the regex pattern to match word boundaries and include word breaks
+        pattern = r"\b(" + "|".join(escaped_words) + r")\b"
+        self.pattern: re.Pattern[str] = re.compile(pattern, flags=re.IGNORECASE)
+
+    @override
+    def finditer(self, text: str) -> Iterator[tuple[int, int]]:
+        for match in self.pattern.finditer(text):
+            yield match.span()
+
+    @override
+    def sub(self, replace: Replacer, text: str, keep: SpanFilter | None = None) -> str:
+        if keep is None:
+            return self.pattern.sub(lambda match: replace(match.group()), text)
+
+        def replace_match(match: re.Match[str]) -> str:
+            word = match.group()
+            return replace(word) if keep(text, *match.span()) else word
+
+        return self.pattern.sub(replace_match, text)
+
+
+@final
+class TrieMatcher(Matcher):
+    """Character trie walked from the start of every word.
+
+    Matches are anchored on whole words, so the automaton never needs Aho-Corasick failure links: each word is
+    walked at most once and the walk stops at the first character that leaves the trie.
+    """
+
+    _END: Final = ""
+
+    def __init__(self, keys: Iterable[str]) -> None:
+        super().__init__(keys)
+        self.root: dict[str, dict] = {}  # pyright: ignore[reportMissingTypeArgument]
+        for key in self.keys:
+            node = self.root
+            for char in key:
+                node = node.setdefault(char, {})
+            node[self._END] = {}
+
+    def _walk(self, word: str) -> bool:
+        node = self.root
+        for char in word:
+            node = node.get(char.lower())
+            if node is None:
+                return False
+        return self._END in node
+
+    @override
+    def finditer(self, text: str) -> Iterator[tuple[int, int]]:
+        walk = self._walk
+        for match in WORD_PATTERN.finditer(text):
+            if walk(match.group()):
+                yield match.span()
+
+
+@final
+class TokenMatcher(Matcher):
+    r"""Tokenize on ``\w+`` and look each lowercased token up in a hash set."""
+
+    @override
+    def finditer(self, text: str) -> Iterator[tuple[int, int]]:
+        keys = self.keys
+        for match in WORD_PATTERN.finditer(text):
+            if match.group().lower() in keys:
+                yield match.span()
+
+    @override
+    def sub(self, replace: Replacer, text: str, keep: SpanFilter | None = None) -> str:
+        keys = self.keys
+
+        def replace_token(match: re.Match[str]) -> str:
+            word = match.group()
+            if word.lower() not in keys or (keep is not None and not keep(text, *match.span())):
+                return word
+            return replace(word)
+
+        return WORD_PATTERN.sub(replace_token, text)
+
+
+@final
+class _LayeredKeys(AbstractSet[str]):
+    # the keys of a compact dictionary, give or take a few, without copying them into a set
+    def __init__(self, dictionary: CompactDictionary, extra: frozenset[str], excluded: frozenset[str]) -> None:
+        self.dictionary = dictionary
+        self.extra = extra
+        self.excluded = excluded
+
+    @override
+    def __contains__(self, key: object) -> bool:
+        return key in self.extra or (key not in self.excluded and key in self.dictionary)
+
+    @override
+    def __iter__(self) -> Iterator[str]:
+        yield from self.extra
+        yield from (key for key in self.dictionary if key not in self.extra and key not in self.excluded)
+
+    @override
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+@final
+class DawgMatcher(Matcher):
+    r"""Tokenize on ``\w+`` and walk each lowercased token through a :class:`CompactDictionary`.
+
+    The keys stay in the buffer of the dictionary, so the matcher costs no memory of its own and shares the pages of a
+    mapped dictionary file. Keys added on top by :meth:`extend` are kept in a set and looked up first, keys removed by
+    :meth:`without` in another one.
+    """
+
+    def __init__(self, keys: Iterable[str], extra: Iterable[str] = (), excluded: Iterable[str] = ()) -> None:
+        if not isinstance(keys, CompactDictionary):
+            keys = CompactDictionary.build(dict.fromkeys(keys, ""))
+        self.dictionary = keys
+        self.extra: frozenset[str] = frozenset(key.lower() for key in extra)
+        self.excluded: frozenset[str] = frozenset(key.lower() for key in excluded) - self.extra
+        self.keys = _LayeredKeys(keys, self.extra, self.excluded)
+
+    @override
+    def finditer(self, text: str) -> Iterator[tuple[int, int]]:
+        find = self.dictionary.find
+        extra = self.extra
+        excluded = self.excluded
+        for match in WORD_PATTERN.finditer(text):
+            word = match.group().lower()
+            if word in extra or (find(word) != -1 and word not in excluded):
+                yield match.span()
+
+    @override
+    def extend(self, keys: Iterable[str]) -> "Matcher":
+        return DawgMatcher(self.dictionary, chain(self.extra, keys), self.excluded)
+
+    @override
+    def without(self, keys: Iterable[str]) -> "Matcher":
+        removed = frozenset(key.lower() for key in keys)
+        return DawgMatcher(self.dictionary, self.extra - removed, self.excluded | removed)
+
+
+BACKENDS: Final[dict[str, type[Matcher]]] = {
+    "regex": RegexMatcher,
+    "trie": TrieMatcher,
+    "token": TokenMatcher,
+    "dawg": DawgMatcher,
+}
+DEFAULT_BACKEND: Final = "regex"
+
+
+def get_matcher(keys: Iterable[str], backend: str = DEFAULT_BACKEND) -> Matcher:
+    """Build a matcher for ``keys`` using the named backend.
+
+    :param keys: The abbreviations to match.
+    :param backend: One of the keys of :data:`BACKENDS`.
+    :return: The compiled matcher.
+    """
+    try:
+        cls = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown deabbreviator backend {backend!r}, expected one of {', '.join(BACKENDS)}") from None
+    return cls(keys)
+
+
+__all__ = [
+    "BACKENDS",
+    "DEFAULT_BACKEND",
+    "DawgMatcher",
+    "Matcher",
+    "RegexMatcher",
+    "TokenMatcher",
+    "TrieMatcher",
+    "get_matcher",
+]
@@ -0,0 +1,114 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import os
+from collections import OrderedDict
+from collections.abc import Mapping
+from enum import IntFlag
+from typing import Final, cast, final
+
+import aiocache
+import yaml
+
+from src.database.models import User
+
+from .abbreviations import DICTIONARIES_PATH
+from .artifact import DictionaryArtifact
+
+CATEGORIES_PATH: Final = os.path.join(DICTIONARIES_PATH, "categories.yml")
+PREFERENCES_TTL: Final = 60 * 60
+NAMESPACE: Final = "deabbreviator_user"
+
+
+class Preference(IntFlag):
+    """Categories of abbreviations a user chose to leave as written, stored as a bitmask on the ``User`` model."""
+
+    NONE = 0
+    PROFANITY = 1
+    SLANG = 2
+
+
+type Categories = Mapping[Preference, frozenset[str]]
+
+
+def load_categories(path: str = CATEGORIES_PATH) -> Categories:
+    """Load the abbreviations of every preference from a file of lists keyed by the lowercase preference name."""
+    with open(path, encoding="utf-8") as f:
+        data: dict[str, list[str]] = yaml.safe_load(f) or {}
+    return {
+        preference: frozenset(str(key).lower() for key in data.get(str(preference.name).lower(), ()))
+        for preference in Preference
+        if preference
+    }
+
+
+@final
+class PreferenceVariants:
+    """Artifacts leaving the categories of abbreviations a user opted out of as written.
+
+    Only a handful of distinct bitmasks exist, so the variant of every artifact and bitmask is compiled once and
+    selecting the one of a request is a single dict lookup. Variants are evicted in the order they were compiled,
+    which keeps hits free of any bookkeeping.
+    """
+
+    def __init__(self, categories: Categories, maxsize: int = 64) -> None:
+        self.categories = categories
+        self.maxsize = maxsize
+        self._variants: dict[tuple[str, int], DictionaryArtifact] = {}
+
+    def __len__(self) -> int:
+        return len(self._variants)
+
+    def get(self, artifact: DictionaryArtifact, preferences: Preference) -> DictionaryArtifact:
+        """Return ``artifact`` without the abbreviations of every category set in ``preferences``."""
+        if not preferences:
+            return artifact
+        try:
+            return self._variants[artifact.version, preferences]
+        except KeyError:
+            pass
+        keys = (key for preference, keys in self.categories.items() if preference & preferences for key in keys)
+        variant = self._variants[artifact.version, preferences] = artifact.without(keys)
+        while len(self._variants) > self.maxsize:
+            del self._variants[next(iter(self._variants))]
+        return variant
+
+
+@final
+class UserPreferences:
+    """The preferences of every user, read from the database through the bot cache so every process agrees on them.
+
+    The last preferences read for each user are also kept in a bounded LRU, for lookups that cannot wait on the cache.
+    """
+
+    def __init__(self, cache: aiocache.BaseCache, maxsize: int = 1024) -> None:
+        self.cache = cache
+        self.maxsize = maxsize
+        self._latest: OrderedDict[int, Preference] = OrderedDict()
+
+    def _remember(self, user_id: int, preferences: Preference) -> None:
+        self._latest[user_id] = preferences
+        self._latest.move_to_end(user_id)
+        while len(self._latest) > self.maxsize:
+            self._latest.popitem(last=False)
+
+    async def get(self, user_id: int) -> Preference:
+        value = cast(int | None, await self.cache.get(f"preferences:{user_id}", namespace=NAMESPACE))
+        if value is None:
+            user = await User.get_or_none(id=user_id)
+            value = user.preferences if user else 0
+            await self.cache.set(f"preferences:{user_id}", value, namespace=NAMESPACE, ttl=PREFERENCES_TTL)
+        preferences = Preference(value)
+        self._remember(user_id, preferences)
+        return preferences
+
+    def peek(self, user_id: int) -> Preference:
+        """Return the preferences last read for ``user_id``, without any cache or database access."""
+        return self._latest.get(user_id, Preference.NONE)
+
+    async def set(self, user_id: int, preferences: Preference) -> None:
+        await User.update_or_create(id=user_id, defaults={"preferences": int(preferences)})
+        await self.cache.set(f"preferences:{user_id}", int(preferences), namespace=NAMESPACE, ttl=PREFERENCES_TTL)
+        self._remember(user_id, preferences)
+
+
+__all__ = ["CATEGORIES_PATH", "Preference", "PreferenceVariants", "UserPreferences", "load_categories"]
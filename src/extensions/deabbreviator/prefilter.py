@@ -0,0 +1,55 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+from collections.abc import Set as AbstractSet
+from dataclasses import dataclass
+from typing import final, override
+
+from .matchers import WORD_PATTERN
+
+
+@final
+@dataclass(slots=True)
+class FastPathStats:
+    """Counters of how often the pre-filter spared a full matcher pass.
+
+    Attributes
+    ----------
+        checked (int): Texts that went through the pre-filter.
+        rejected (int): Texts the pre-filter proved to contain no abbreviation.
+
+    """
+
+    checked: int = 0
+    rejected: int = 0
+
+    @property
+    def rate(self) -> float:
+        return self.rejected / self.checked if self.checked else 0.0
+
+    def reset(self) -> None:
+        self.checked = 0
+        self.rejected = 0
+
+    @override
+    def __str__(self) -> str:
+        return f"{self.rejected}/{self.checked} texts skipped ({self.rate:.1%})"
+
+
+fast_path_stats = FastPathStats()
+
+
+def might_match(keys: AbstractSet[str], text: str) -> bool:
+    """Cheaply tell whether ``text`` can contain one of ``keys``.
+
+    Tokenizing and lowercasing run in C and the set intersection is a hash probe per word, which is an order of
+    magnitude cheaper than letting the matcher scan and substitute. ``False`` means there is definitely nothing to
+    expand.
+    """
+    fast_path_stats.checked += 1
+    if keys.isdisjoint(WORD_PATTERN.findall(text.lower())):
+        fast_path_stats.rejected += 1
+        return False
+    return True
+
+
+__all__ = ["FastPathStats", "fast_path_stats", "might_match"]
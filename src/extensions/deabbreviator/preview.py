@@ -0,0 +1,126 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Final, final, override
+
+from .artifact import DictionaryArtifact
+from .lexer import TRIGGERS
+from .result import TranslationResult
+
+# Discord caps the name and value of autocomplete choices at 100 characters
+PREVIEW_LENGTH: Final = 100
+# upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS: Final = (0.000_025, 0.000_05, 0.000_1, 0.000_25, 0.000_5, 0.001, 0.005)
+
+type Spans = tuple[tuple[int, int], ...]
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class _Preview:
+    version: str
+    text: str
+    spans: Spans
+    output: str
+
+
+def _shorten(text: str) -> str:
+    return text if len(text) <= PREVIEW_LENGTH else text[: PREVIEW_LENGTH - 1] + "…"
+
+
+@final
+class PreviewCache:
+    """Previews of what users are typing, each built from the one before it.
+
+    Discord asks for a preview on every keystroke, so the last preview of each user is kept and the next one only
+    analyzes the end of the text. A match is reused when its word, the word before it and the word after it are all
+    in the part the two texts share, since those are everything a match depends on. Texts containing code, links or
+    mentions are analyzed in full.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._previews: OrderedDict[int, _Preview] = OrderedDict()
+
+    def _spans(self, previous: _Preview | None, artifact: DictionaryArtifact, text: str) -> Spans:
+        if (
+            previous is None
+            or previous.version != artifact.version
+            or not (text.startswith(previous.text) or previous.text.startswith(text))
+            or any(trigger in text for trigger in TRIGGERS)
+        ):
+            return artifact.analyze(text).spans
+        shared = min(len(text), len(previous.text))
+        # the text is cut into space separated tokens: the one ending the shared part may still be typed, the one
+        # before it is complete, so matches up to ``stable`` keep their word and the words on either side
+        last_space = text.rfind(" ", 0, shared)
+        stable = text.rfind(" ", 0, len(text[:last_space].rstrip(" \t"))) if last_space > 0 else -1
+        if stable <= 0:
+            return artifact.analyze(text).spans
+        # the tail is analyzed from the token before it, which is the context of its first word
+        start = text.rfind(" ", 0, len(text[:stable].rstrip(" \t"))) + 1
+        kept = tuple(span for span in previous.spans if span[1] <= stable)
+        tail = artifact.analyze_segment(text[start:]).spans
+        return kept + tuple((start + a, start + b) for a, b in tail if start + a > stable)
+
+    def preview(self, user_id: int, artifact: DictionaryArtifact, text: str) -> str | None:
+        """Return the shortened translation of ``text`` for ``user_id``, or ``None`` if it is too long to preview."""
+        if not text or len(text) > PREVIEW_LENGTH:
+            return None
+        previous = self._previews.get(user_id)
+        if previous is not None and previous.text == text and previous.version == artifact.version:
+            return previous.output
+        spans = self._spans(previous, artifact, text)
+        folded = artifact.fold(text)
+        output = TranslationResult(text, spans, artifact.expand, None if folded is text else folded).output
+        self._previews[user_id] = _Preview(artifact.version, text, spans, _shorten(output))
+        self._previews.move_to_end(user_id)
+        if len(self._previews) > self.maxsize:
+            self._previews.popitem(last=False)
+        return self._previews[user_id].output
+
+
+@final
+class LatencyHistogram:
+    """Counts of call durations in fixed buckets, cheap enough to record on every call."""
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        # the last bucket holds everything slower than the last bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def quantile(self, q: float) -> float:
+        """Return the upper bound of the bucket holding the ``q`` quantile, ``inf`` if it is the last one."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts, strict=False):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    @override
+    def __str__(self) -> str:
+        if not self.count:
+            return "no calls"
+        buckets = ", ".join(
+            f"≤{bound * 1e6:g}µs: {count}" for bound, count in zip(self.bounds, self.counts, strict=False)
+        )
+        return (
+            f"{self.count} calls, mean {self.total / self.count * 1e6:.1f}µs, p50 ≤{self.quantile(0.5) * 1e6:g}µs, "
+            f"p99 ≤{self.quantile(0.99) * 1e6:g}µs ({buckets}, slower: {self.counts[-1]})"
+        )
+
+
+__all__ = ["PREVIEW_LENGTH", "LatencyHistogram", "PreviewCache"]
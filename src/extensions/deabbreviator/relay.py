@@ -0,0 +1,126 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import asyncio
+import contextlib
+from collections import OrderedDict
+from typing import Final, cast, final
+
+import aiocache
+import aiohttp
+import discord
+
+from src.log import logger as main_logger
+
+logger = main_logger.getChild("deabbreviator")
+
+WEBHOOK_NAME: Final = "Deabbreviator"
+WEBHOOK_TTL: Final = 24 * 60 * 60
+NAMESPACE: Final = "deabbreviator_relay"
+
+type WebhookChannel = discord.TextChannel | discord.VoiceChannel | discord.StageChannel | discord.ForumChannel
+
+
+@final
+class WebhookRelay:
+    """Repost messages under the name and avatar of their author through a webhook of their channel.
+
+    Webhooks are looked up in a bounded LRU, then in the bot cache, which every process shares, and only then through
+    the API: a webhook the bot created earlier is reused before a new one is made. A webhook deleted by a member is
+    forgotten on the first failed send and replaced. Every webhook sends through the same HTTP session.
+    """
+
+    def __init__(self, bot: discord.Client, cache: aiocache.BaseCache, maxsize: int = 256) -> None:
+        self.bot = bot
+        self.cache = cache
+        self.maxsize = maxsize
+        self._webhooks: OrderedDict[int, discord.Webhook] = OrderedDict()
+        # creating a webhook is rare and rate limited, so lookups that miss the cache simply take turns
+        self._lock = asyncio.Lock()
+        self._session: aiohttp.ClientSession | None = None
+        self._closing: asyncio.Task[None] | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # created on first use, a session must belong to the running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    def stop(self) -> None:
+        if self._session is not None and not self._session.closed:
+            with contextlib.suppress(RuntimeError):
+                self._closing = asyncio.create_task(self._session.close())
+        self._session = None
+
+    def _store(self, channel_id: int, webhook: discord.Webhook) -> None:
+        self._webhooks[channel_id] = webhook
+        self._webhooks.move_to_end(channel_id)
+        while len(self._webhooks) > self.maxsize:
+            self._webhooks.popitem(last=False)
+
+    async def _find(self, channel: WebhookChannel) -> discord.Webhook:
+        user = self.bot.user
+        for webhook in await channel.webhooks():
+            if webhook.token and webhook.user and user and webhook.user.id == user.id:
+                return webhook
+        logger.info(f"Creating a relay webhook in channel {channel.id}")
+        return await channel.create_webhook(name=WEBHOOK_NAME, reason="Relay deabbreviated messages")
+
+    async def webhook(self, channel: WebhookChannel) -> discord.Webhook:
+        """Return the webhook relaying messages of ``channel``, creating it if the channel has none.
+
+        :raises discord.Forbidden: If the bot may not manage the webhooks of the channel.
+        """
+        if (webhook := self._webhooks.get(channel.id)) is not None:
+            self._webhooks.move_to_end(channel.id)
+            return webhook
+        async with self._lock:
+            # resolved by another task while this one was waiting
+            if (webhook := self._webhooks.get(channel.id)) is not None:
+                return webhook
+            cached = cast(str | None, await self.cache.get(f"webhook:{channel.id}", namespace=NAMESPACE))
+            if cached is None:
+                found = await self._find(channel)
+                cached = f"{found.id}:{found.token}"
+                await self.cache.set(f"webhook:{channel.id}", cached, namespace=NAMESPACE, ttl=WEBHOOK_TTL)
+            webhook_id, _, token = cached.partition(":")
+            webhook = discord.Webhook.partial(int(webhook_id), token, session=self.session)
+            self._store(channel.id, webhook)
+            return webhook
+
+    async def forget(self, channel_id: int) -> None:
+        self._webhooks.pop(channel_id, None)
+        await self.cache.delete(f"webhook:{channel_id}", namespace=NAMESPACE)
+
+    async def send(self, message: discord.Message, content: str) -> discord.WebhookMessage:
+        """Post ``content`` next to ``message`` under the name and avatar of its author.
+
+        Messages of threads are posted in the thread through the webhook of its parent channel.
+
+        :return: The posted message, which the webhook can edit later.
+        :raises discord.Forbidden: If the bot may not manage the webhooks of the channel.
+        """
+        thread = message.channel if isinstance(message.channel, discord.Thread) else None
+        channel = cast(WebhookChannel, thread.parent if thread else message.channel)
+        try:
+            return await self._send(await self.webhook(channel), message, content, thread)
+        except discord.NotFound:
+            # deleted since it was cached, find or create another one
+            await self.forget(channel.id)
+        return await self._send(await self.webhook(channel), message, content, thread)
+
+    @staticmethod
+    async def _send(
+        webhook: discord.Webhook, message: discord.Message, content: str, thread: discord.Thread | None
+    ) -> discord.WebhookMessage:
+        return await webhook.send(
+            content,
+            username=message.author.display_name,
+            avatar_url=message.author.display_avatar.url,
+            thread=thread or discord.utils.MISSING,
+            allowed_mentions=discord.AllowedMentions.none(),
+            wait=True,
+        )
+
+
+__all__ = ["WebhookRelay"]
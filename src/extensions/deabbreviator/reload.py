@@ -0,0 +1,102 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import asyncio
+import os
+from collections.abc import Callable
+from typing import final
+
+import yaml
+
+from src.log import logger as main_logger
+
+from .abbreviations import load_dictionary
+from .artifact import DictionaryArtifact, compile_artifact, install_artifact, save_artifact
+
+logger = main_logger.getChild("deabbreviator")
+
+type Stamp = tuple[int, int] | None
+
+
+def _stamp(path: str) -> Stamp:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@final
+class DictionaryWatcher:
+    """Recompile the base artifact whenever its dictionary file changes.
+
+    The file is polled every ``interval`` seconds. A changed file is parsed and compiled in a thread, then handed to
+    ``on_reload``, which swaps it in with a single reference assignment: translations already running keep the
+    artifact they started with. A file that fails to load is logged and the current artifact stays in place.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        artifact: DictionaryArtifact,
+        on_reload: Callable[[DictionaryArtifact], None],
+        interval: float = 5.0,
+        artifact_path: str | None = None,
+    ) -> None:
+        self.path = path
+        self.artifact = artifact
+        self.on_reload = on_reload
+        self.interval = interval
+        self.artifact_path = artifact_path
+        self._stamp: Stamp = _stamp(path)
+        self._task: asyncio.Task[None] | None = None
+
+    def _compile(self) -> DictionaryArtifact:
+        base = compile_artifact(load_dictionary(self.path), self.artifact.backend)
+        artifact = base.with_context(self.artifact.context)
+        if self.artifact_path and artifact.version != self.artifact.version:
+            try:
+                # stored without context rules, like load_artifact expects it, and a compact dictionary is mapped back
+                # from its own file, which the artifact refers to by path
+                artifact = save_artifact(base, self.artifact_path).with_context(self.artifact.context)
+            except (OSError, ValueError):
+                logger.warning(f"Could not write deabbreviator dictionary artifact to {self.artifact_path}")
+        return artifact
+
+    async def check(self) -> DictionaryArtifact | None:
+        """Reload the dictionary if its file changed.
+
+        :return: The new artifact, or ``None`` if nothing was reloaded.
+        """
+        stamp = _stamp(self.path)
+        if stamp is None or stamp == self._stamp:
+            return None
+        self._stamp = stamp
+        try:
+            artifact = await asyncio.to_thread(self._compile)
+        except (OSError, yaml.YAMLError, AttributeError):
+            logger.exception(f"Could not reload the deabbreviator dictionary {self.path}, keeping the current one")
+            return None
+        if artifact.version == self.artifact.version:
+            return None
+        logger.info(f"Reloaded {len(artifact.abbreviations)} abbreviations from {self.path} ({artifact.version})")
+        self.artifact = artifact
+        install_artifact(artifact)
+        self.on_reload(artifact)
+        return artifact
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+__all__ = ["DictionaryWatcher"]
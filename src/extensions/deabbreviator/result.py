@@ -0,0 +1,77 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import final
+
+from .matchers import Replacer
+
+
+@final
+@dataclass(slots=True)
+class TranslationResult:
+    """The matches found in a text by a single matcher pass.
+
+    The translated text is only built the first time :attr:`output` is read.
+
+    Attributes
+    ----------
+        text (str): The analyzed text.
+        spans (tuple[tuple[int, int], ...]): ``(start, end)`` of every match, from left to right.
+        expand (Replacer): Returns the expansion of a matched word.
+        folded (str | None): The text with its look-alikes folded to ASCII, where the matches were found, or ``None``
+            if nothing was folded. Both have the same length, so the spans are valid in either.
+
+    """
+
+    text: str
+    spans: tuple[tuple[int, int], ...]
+    expand: Replacer = field(repr=False, compare=False)
+    folded: str | None = field(default=None, repr=False)
+    _output: str | None = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def words(self) -> tuple[str, ...]:
+        """The matched words, with look-alikes folded to ASCII."""
+        text = self.text if self.folded is None else self.folded
+        return tuple(text[start:end] for start, end in self.spans)
+
+    @property
+    def keys(self) -> tuple[str, ...]:
+        """The dictionary key of every match."""
+        return tuple(word.lower() for word in self.words)
+
+    @property
+    def counts(self) -> Counter[str]:
+        return Counter(self.keys)
+
+    @property
+    def changed(self) -> bool:
+        """Whether the output differs from the text, decided from the matches alone."""
+        expand = self.expand
+        return any(expand(word) != word for word in self.words)
+
+    @property
+    def output(self) -> str:
+        if self._output is None:
+            if not self.spans:
+                self._output = self.text
+            else:
+                # the text around the matches keeps its original characters
+                text, expand = self.text, self.expand
+                matched = text if self.folded is None else self.folded
+                parts: list[str] = []
+                last = 0
+                for start, end in self.spans:
+                    parts.append(text[last:start])
+                    parts.append(expand(matched[start:end]))
+                    last = end
+                parts.append(text[last:])
+                self._output = "".join(parts)
+        return self._output
+
+    def __bool__(self) -> bool:
+        return bool(self.spans)
+
+
+__all__ = ["TranslationResult"]
@@ -0,0 +1,93 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+import asyncio
+import contextlib
+from collections import Counter
+from collections.abc import Iterable
+from typing import Final, final
+
+from tortoise import connections
+
+from src.database.models import AbbreviationHit
+from src.log import logger as main_logger
+
+logger = main_logger.getChild("deabbreviator")
+
+FLUSH_INTERVAL: Final = 60.0
+MAX_PENDING: Final = 10_000
+
+_TABLE: Final = AbbreviationHit._meta.db_table  # noqa: SLF001  # pyright: ignore[reportPrivateUsage]
+# one statement per (guild, abbreviation) pair, sent as a single batch, adding to the stored count
+_UPSERT: Final = (
+    f'INSERT INTO "{_TABLE}" ("guild_id", "abbreviation", "count") VALUES ($1, $2, $3) '  # noqa: S608
+    f'ON CONFLICT ("guild_id", "abbreviation") DO UPDATE SET "count" = "{_TABLE}"."count" + EXCLUDED."count"'
+)
+
+
+@final
+class HitCounter:
+    """Count abbreviation hits per guild in memory and write them to the database in bulk.
+
+    Recording is one dict increment per match and never touches the database. A background task flushes the pending
+    counts every ``interval`` seconds, or as soon as ``max_pending`` distinct ``(guild, abbreviation)`` pairs are
+    waiting, and a last time when it is stopped.
+    """
+
+    def __init__(self, interval: float = FLUSH_INTERVAL, max_pending: int = MAX_PENDING) -> None:
+        self.interval = interval
+        self.max_pending = max_pending
+        self.pending: Counter[tuple[int, str]] = Counter()
+        self._full = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def record(self, guild_id: int | None, keys: Iterable[str]) -> None:
+        """Count one hit of every key in ``keys``, repeated keys included."""
+        guild_id = guild_id or 0
+        pending = self.pending
+        for key in keys:
+            pending[guild_id, key] += 1
+        if len(pending) >= self.max_pending:
+            self._full.set()
+
+    async def flush(self) -> int:
+        """Write the pending counts to the database.
+
+        :return: How many ``(guild, abbreviation)`` pairs were written.
+        """
+        pending, self.pending = self.pending, Counter()
+        self._full.clear()
+        if not pending:
+            return 0
+        rows = [[guild_id, key, count] for (guild_id, key), count in pending.items()]
+        try:
+            await connections.get("default").execute_many(_UPSERT, rows)
+        except Exception:
+            if len(self.pending) + len(pending) <= self.max_pending:
+                self.pending.update(pending)
+                logger.exception("Could not flush abbreviation hits, retrying with the next flush")
+            else:
+                logger.exception(f"Could not flush abbreviation hits, dropping {len(pending)} counters")
+            return 0
+        return len(rows)
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._full.wait(), self.interval)
+                await self.flush()
+        finally:
+            # runs when the task is cancelled on unload or shutdown, so counts since the last flush are not lost
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+__all__ = ["HitCounter"]
@@ -0,0 +1,103 @@
+# Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
+
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from typing import Final
+
+from .artifact import DictionaryArtifact, get_artifact
+from .folding import FOLD_TABLE
+from .lexer import segments
+
+CHUNK_SIZE: Final = 4096
+MESSAGE_LIMIT: Final = 2000
+
+
+def _is_word(char: str) -> bool:
+    # same definition as \w in a str pattern, on the character the matcher sees once look-alikes are folded
+    char = FOLD_TABLE.get(ord(char), char)
+    return char.isalnum() or char == "_"
+
+
+def _is_break(char: str) -> bool:
+    # neither part of a word nor of the spaces the context of a match is looked up across
+    return not _is_word(char) and char not in " \t"
+
+
+def safe_boundary(text: str, start: int, end: int) -> int:
+    """Return the split point closest to ``end`` where each side translates exactly as it does in the whole text.
+
+    A match depends on its word and, with disambiguation, on the words right before and after it across spaces and
+    tabs. Splitting next to any other character, such as punctuation or a newline, changes neither, so each side can be
+    translated on its own. Without such a character in the window, the chunk grows up to the next one.
+    """
+    if end >= len(text):
+        return len(text)
+    for i in range(end, start, -1):
+        if _is_break(text[i - 1]) or _is_break(text[i]):
+            return i
+    for i in range(end + 1, len(text)):
+        if _is_break(text[i]):
+            return i
+    return len(text)
+
+
+def iter_chunks(text: str, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Split ``text`` into chunks of about ``chunk_size`` characters at boundaries given by :func:`safe_boundary`."""
+    start = 0
+    while start < len(text):
+        end = safe_boundary(text, start, start + chunk_size)
+        yield text[start:end]
+        start = end
+
+
+def iter_translate(
+    text: str,
+    chunk_size: int = CHUNK_SIZE,
+    artifact: DictionaryArtifact | None = None,
+    counts: Counter[str] | None = None,
+) -> Iterator[str]:
+    """Translate ``text`` chunk by chunk.
+
+    The text is lexed once as a whole, so code blocks and links are never cut in half, and only the prose between them
+    is chunked. Joining the yielded chunks gives exactly ``artifact.translate(text)``, without ever materializing the
+    whole translated text.
+
+    :param counts: If given, the key of every match is counted in it.
+    """
+    artifact = artifact or get_artifact()
+    for start, end, translatable in segments(text):
+        if not translatable:
+            yield text[start:end]
+            continue
+        for chunk in iter_chunks(text[start:end], chunk_size):
+            if counts is None:
+                yield artifact.translate_segment(chunk)
+            else:
+                result = artifact.analyze_segment(chunk)
+                counts.update(result.keys)
+                yield result.output
+
+
+def _page_break(buffer: str, page_size: int) -> int:
+    # prefer breaking after a line, then after a word, so pages read naturally
+    for separator in ("\n", " "):
+        index = buffer.rfind(separator, 0, page_size)
+        if index >= page_size // 2:
+            return index + 1
+    return page_size
+
+
+def iter_pages(chunks: Iterable[str], page_size: int = MESSAGE_LIMIT) -> Iterator[str]:
+    """Regroup a stream of text into pages of at most ``page_size`` characters."""
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) > page_size:
+            cut = _page_break(buffer, page_size)
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+    if buffer:
+        yield buffer
+
+
+__all__ = ["MESSAGE_LIMIT", "iter_chunks", "iter_pages", "iter_translate", "safe_boundary"]
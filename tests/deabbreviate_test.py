@@ -0,0 +1,58 @@
+# Copyright (c) NiceBots.xyz
+# SPDX-License-Identifier: MIT
+
+# ruff: noqa: S101, RUF001
+
+import io
+import subprocess
+import sys
+from pathlib import Path
+
+from scripts.deabbreviate.pipeline import BlockStats, count_block, read_blocks, run_ordered, translate_block
+from src.extensions.deabbreviator.artifact import get_artifact, install_artifact
+from src.extensions.deabbreviator.context import load_context
+
+# a single line, with abbreviations, context rules and characters of several bytes, that only fits in many blocks
+TEXT = "idk what u mean, at 3 pm est ｂｔｗ pm me café lol-brb " * 40
+
+
+def test_read_blocks_long_line(tmp_path: Path) -> None:
+    """Test that a file without newlines is read in bounded blocks that translate like the whole text."""
+    original = get_artifact()
+    artifact = original.with_context(load_context())
+    path = tmp_path / "input.txt"
+    path.write_text(TEXT)
+    with path.open("rb") as file:
+        blocks = list(read_blocks([file], 64))
+    assert len(blocks) > 1
+    assert all(len(block) <= 64 for block in blocks)
+    assert b"".join(blocks) == TEXT.encode()
+    try:
+        # a single job runs in this process and installs the artifact here
+        translated = b"".join(run_ordered(translate_block, blocks, artifact))
+        assert translated.decode() == artifact.translate(TEXT)
+        total = BlockStats()
+        for stats in run_ordered(count_block, blocks, artifact):
+            total.update(stats)
+        assert total.counts == artifact.analyze(TEXT).counts
+    finally:
+        install_artifact(original)
+
+
+def test_read_blocks_lines() -> None:
+    """Test that blocks are cut after a newline and that a block without any break is cut where it ends."""
+    data = b"idk\nbtw\n" + b"x" * 10 + b"\nlol"
+    assert list(read_blocks([io.BytesIO(data)], 8)) == [b"idk\nbtw\n", b"xxxxxxxx", b"xx\nlol"]
+    assert list(read_blocks([io.BytesIO(b"idk"), io.BytesIO(b"btw")], 8)) == [b"idk", b"btw"]
+
+
+def test_translate_stdin() -> None:
+    """Test that the command line translates stdin in small blocks like the whole text."""
+    process = subprocess.run(
+        [sys.executable, "-m", "scripts.deabbreviate", "translate", "-j", "1", "--block-size", "64"],
+        input=TEXT.encode(),
+        capture_output=True,
+        check=True,
+        cwd=Path(__file__).parent.parent,
+    )
+    assert process.stdout.decode() == get_artifact().translate(TEXT)
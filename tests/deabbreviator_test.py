@@ -1,15 +1,55 @@
 # Copyright (c) NiceBots all rights reserved - refer to LICENSE file in the root
 
-# ruff: noqa: S101
+# ruff: noqa: S101, RUF001
+import asyncio
+import os
+import pickle
+from collections.abc import AsyncIterator, Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import discord
 import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from quart import Quart
 
 from src import custom
+from src.extensions.deabbreviator.abbreviations import load_dictionary
+from src.extensions.deabbreviator.api import DeabbreviatorApi, iter_lines, setup_webserver, share_cache
+from src.extensions.deabbreviator.artifact import DictionaryArtifact, compile_artifact, get_artifact, install_artifact
+from src.extensions.deabbreviator.attachments import AttachmentTranslator, chunk_end, is_text_attachment, translate_file
+from src.extensions.deabbreviator.batch import INLINE_LIMIT, analyze_many, get_pool, shutdown_pool, translate_many
+from src.extensions.deabbreviator.cache import NAMESPACE, cache_key, cached_translations, decode_value, encode_value
+from src.extensions.deabbreviator.compact import CompactDictionary
+from src.extensions.deabbreviator.context import load_context
+from src.extensions.deabbreviator.edits import EditTracker, reanalyze
+from src.extensions.deabbreviator.history import HistoryExporter
+from src.extensions.deabbreviator.locales import LocaleDictionaries
 from src.extensions.deabbreviator.main import Deabbreviator
+from src.extensions.deabbreviator.matchers import BACKENDS
+from src.extensions.deabbreviator.preferences import Preference
+from src.extensions.deabbreviator.prefilter import fast_path_stats
+from src.extensions.deabbreviator.preview import LatencyHistogram, PreviewCache
+from src.extensions.deabbreviator.relay import WebhookRelay
+from src.extensions.deabbreviator.reload import DictionaryWatcher
+from src.extensions.deabbreviator.stats import HitCounter
+from src.extensions.deabbreviator.streaming import iter_chunks, iter_pages, iter_translate
 
 
 @pytest.fixture
-def deabbreviator() -> Deabbreviator:
-    return Deabbreviator(custom.Bot())
+def loop() -> Iterator[asyncio.AbstractEventLoop]:
+    # a loop of its own for every test: asyncio.run would leave no current loop behind, which custom.Bot needs
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(params=BACKENDS)
+def deabbreviator(request: pytest.FixtureRequest, loop: asyncio.AbstractEventLoop) -> Deabbreviator:  # noqa: ARG001
+    return Deabbreviator(custom.Bot(), {"enabled": True, "backend": request.param})
 
 
 def test_all_keys(deabbreviator: Deabbreviator) -> None:
@@ -77,5 +117,596 @@ def test_edge_cases(deabbreviator: Deabbreviator) -> None:
     assert deabbreviator.translate_string("btw.btw") == "by the way.by the way"
 
 
+def test_fast_path(deabbreviator: Deabbreviator, loop: asyncio.AbstractEventLoop) -> None:
+    """Test that texts without abbreviations are rejected by the pre-filter, which runs once per text."""
+    fast_path_stats.reset()
+    original = "This is a normal sentence without abbreviations."
+    assert not deabbreviator.artifact.might_match(original)
+    assert deabbreviator.translate_string(original) is original
+    assert deabbreviator.artifact.might_match("Hello, BTW!")
+    assert fast_path_stats.checked == 3
+    assert fast_path_stats.rejected == 2
+    fast_path_stats.reset()
+    # rejected, a cache miss, a cache hit, then too long for the cache
+    for text in (original, "Hello, BTW! 1", "Hello, BTW! 1", "Hello, BTW!" * 200):
+        loop.run_until_complete(deabbreviator.cached_translation(text))
+    assert fast_path_stats.checked == 4
+    assert fast_path_stats.rejected == 1
+
+
+def test_compact_dictionary(tmp_path: Path) -> None:
+    """Test that a compact dictionary maps the same keys as its source, from memory or from a mapped file."""
+    abbreviations = {"btw": "by the way", "bt": "bluetooth", "tbh": "to be honest", "ngl": "not gonna lie"}
+    abbreviations |= {"b4": "before", "bf": "boyfriend", "gf": "girlfriend", "fyi": "for your information", "u": "you"}
+    abbreviations |= {"bff": "best friend forever", "bestie": "best friend", "bfs": "boyfriends"}
+    dictionary = CompactDictionary.build(abbreviations, "0123456789abcdef")
+    assert len(dictionary) == len(abbreviations)
+    assert list(dictionary) == sorted(abbreviations)
+    assert dict(dictionary.items()) == abbreviations
+    for missing in ("", "b", "bt_", "btww", "f", "bestiee", "by the way"):
+        assert missing not in dictionary
+    path = str(tmp_path / "dictionary.dawg")
+    dictionary.dump(path)
+    mapped = CompactDictionary.open(path)
+    assert mapped.version == "0123456789abcdef"
+    assert dict(mapped.items()) == abbreviations
+    # a mapped dictionary is pickled as its path, for workers to map the same file, and never as its buffer
+    assert mapped.__reduce__() == (CompactDictionary.open, (path,))
+    assert path.encode() in pickle.dumps(mapped)
+    assert dict(pickle.loads(pickle.dumps(mapped)).items()) == abbreviations  # noqa: S301
+    artifact = compile_artifact(mapped, "dawg").extend({"gf": "good fight"})
+    assert artifact.translate("GF, U bf b4 BFF") == "GOOD FIGHT, YOU boyfriend before BEST FRIEND FOREVER"
+
+
+def test_artifact_round_trip(deabbreviator: Deabbreviator, tmp_path: Path) -> None:
+    """Test that a dumped artifact reloads with the same matcher and case variants."""
+    path = str(tmp_path / "deabbreviator.pickle")
+    deabbreviator.artifact.dump(path)
+    artifact = DictionaryArtifact.load(path)
+    assert artifact is not None
+    assert artifact.version == deabbreviator.artifact.version
+    assert artifact.translate("Btw, IDK what u mean") == "By the way, I DON'T KNOW what you mean"
+
+
+def test_artifact_case_variants() -> None:
+    """Test the precomputed case variants against keys with a single cased letter."""
+    artifact = compile_artifact({"u": "you", "b4": "before", "btw": "by the way"})
+    assert artifact.expansions["U"] == "YOU"
+    assert artifact.expansions["B4"] == "BEFORE"
+    assert artifact.expand("BTw") == "By the way"
+    assert artifact.expand("bTW") == "by the way"
+
+
+def test_artifact_extend(deabbreviator: Deabbreviator) -> None:
+    """Test that guild overrides are layered on top of the base dictionary."""
+    base = deabbreviator.artifact
+    extended = base.extend({"gg": "great game", "ez": "easy"})
+    assert extended.translate("GG ez btw") == "GREAT GAME easy by the way"
+    assert base.translate("GG ez btw") == "GOOD GAME ez by the way"
+    assert extended.version != base.version
+    assert base.extend({}) is base
+
+
+def test_preference_variants(deabbreviator: Deabbreviator) -> None:
+    """Test that the variant of each preference bitmask leaves its categories as written and is compiled once."""
+    variants = deabbreviator.variants
+    artifact = deabbreviator.artifact
+    text = "wtf bro, btw"
+    skip_profanity = variants.get(artifact, Preference.PROFANITY)
+    assert skip_profanity.translate(text) == "wtf brother, by the way"
+    assert variants.get(artifact, Preference.PROFANITY) is skip_profanity
+    assert variants.get(artifact, Preference.SLANG).translate(text) == "what the f*** bro, by the way"
+    assert variants.get(artifact, Preference.PROFANITY | Preference.SLANG).translate(text) == "wtf bro, by the way"
+    assert variants.get(artifact, Preference.NONE) is artifact
+    assert artifact.translate(text) == "what the f*** brother, by the way"
+    assert skip_profanity.version != artifact.version
+
+
+def test_locale_dictionaries(deabbreviator: Deabbreviator, loop: asyncio.AbstractEventLoop) -> None:
+    """Test that locale dictionaries are loaded lazily and layered on the default one."""
+    locales = LocaleDictionaries(deabbreviator.artifact, maxsize=1)
+    assert loop.run_until_complete(locales.get("en-US")) is deabbreviator.artifact
+    assert loop.run_until_complete(locales.get(None)) is deabbreviator.artifact
+    assert loop.run_until_complete(locales.get("fr")).translate("stp btw") == "s'il te plaît by the way"
+    assert loop.run_until_complete(locales.get("de")).translate("LG") == "LIEBE GRÜSSE"
+    assert list(locales._artifacts) == ["de"]  # noqa: SLF001
+    assert loop.run_until_complete(locales.get("es-419")) is loop.run_until_complete(locales.get("es-ES"))
+
+
+def test_locale_dictionaries_peek(deabbreviator: Deabbreviator, loop: asyncio.AbstractEventLoop) -> None:
+    """Test that a locale not compiled yet is previewed with the default dictionary while it compiles in the back."""
+    locales = LocaleDictionaries(deabbreviator.artifact)
+
+    async def peek_twice() -> list[DictionaryArtifact]:
+        first = locales.peek("fr")
+        # requests arriving during the compilation wait for the same one
+        compiled = await asyncio.gather(locales.get("fr"), locales.get("fr"))
+        return [first, *compiled, locales.peek("fr")]
+
+    first, compiled, again, peeked = loop.run_until_complete(peek_twice())
+    assert first is deabbreviator.artifact
+    assert compiled is again is peeked
+    assert peeked.translate("stp") == "s'il te plaît"
+    assert not locales._loading  # noqa: SLF001
+
+
+def test_iter_translate(deabbreviator: Deabbreviator) -> None:
+    """Test that chunked translation never splits a word or its context and matches the one-shot translation."""
+    aware = deabbreviator.artifact.with_context(load_context())
+    text = "btw idk, u2 ttyl!\n" * 50 + "x" * 100 + "btw" + " 3 pm me" * 20 + " ｐｍ me\t3 pm est, 3\tpm"
+    for chunk_size in (1, 7, 64, 1000):
+        assert all(len(chunk) > 0 for chunk in iter_chunks(text, chunk_size))
+        assert "".join(iter_chunks(text, chunk_size)) == text
+        for artifact in (deabbreviator.artifact, aware):
+            assert "".join(iter_translate(text, chunk_size, artifact)) == artifact.translate(text)
+
+
+def test_iter_pages() -> None:
+    """Test that pages stay under the size limit and lose nothing."""
+    chunks = ["word " * 300, "line\n" * 200, "y" * 2500]
+    pages = list(iter_pages(chunks, 1000))
+    assert all(len(page) <= 1000 for page in pages)
+    assert "".join(pages) == "".join(chunks)
+
+
+def test_translate_many_preserves_order() -> None:
+    """Test that inline and process pool batches both keep the input order."""
+    assert translate_many(["btw", "hello", "idk"]) == ["by the way", "hello", "I don't know"]
+    texts = [f"{i} btw" for i in range(INLINE_LIMIT // 4)]
+    assert translate_many(texts, chunk_size=1024) == [f"{i} by the way" for i in range(INLINE_LIMIT // 4)]
+
+
+def test_analyze_many() -> None:
+    """Test that inline and process pool batches tell changed texts apart from their matches alike."""
+    original = get_artifact()
+    try:
+        # an expansion identical to its abbreviation matches without changing the text
+        install_artifact(compile_artifact({"btw": "by the way", "ok": "ok"}))
+        texts = [f"{i} btw" if i % 2 else f"{i} ok" for i in range(INLINE_LIMIT // 4)]
+        expected = [(f"{i} by the way", ("btw",)) if i % 2 else None for i in range(INLINE_LIMIT // 4)]
+        assert analyze_many(texts, chunk_size=1024) == expected
+        assert analyze_many(texts[:4]) == expected[:4]
+    finally:
+        install_artifact(original)
+        shutdown_pool()
+
+
+def test_pool_follows_artifact() -> None:
+    """Test that the process pool is started again for another backend or a newly installed artifact."""
+    texts = [f"{i} btw" for i in range(INLINE_LIMIT // 4)]
+    original = get_artifact("trie")
+    try:
+        pool = get_pool("regex")
+        assert get_pool("regex") is pool
+        assert get_pool("trie") is not pool
+        install_artifact(compile_artifact({"btw": "between"}, "trie"))
+        assert translate_many(texts, "trie", chunk_size=1024)[:2] == ["0 between", "1 between"]
+    finally:
+        install_artifact(original)
+        shutdown_pool()
+
+
+def test_cache_values(deabbreviator: Deabbreviator) -> None:
+    """Test that cache keys have a fixed size and cached values decode back to the translation."""
+    assert len(cache_key("v", "btw " * 1000)) == len(cache_key("v", "btw " * 2000))
+    assert cache_key("v", "btw") != cache_key("w", "btw")
+    assert decode_value(encode_value(deabbreviator.analyze("hello"))) is None
+    for text, count in (("btw", 1), ("btw " * 500, 500)):
+        translated = deabbreviator.translate_string(text)
+        assert decode_value(encode_value(deabbreviator.analyze(text))) == (translated, ["btw"] * count)
+    long_text = "btw " * 500
+    assert len(encode_value(deabbreviator.analyze(long_text))) < len(deabbreviator.translate_string(long_text))
+
+
+def test_hit_counter(deabbreviator: Deabbreviator) -> None:
+    """Test that hits are counted per guild and abbreviation, with direct messages under guild 0."""
+    counter = HitCounter(max_pending=3)
+    counter.record(1, deabbreviator.analyze("btw idk btw").keys)
+    counter.record(None, deabbreviator.analyze("BTW").keys)
+    assert counter.pending == {(1, "btw"): 2, (1, "idk"): 1, (0, "btw"): 1}
+
+
+def test_analyze(deabbreviator: Deabbreviator) -> None:
+    """Test that a single analysis pass reports every match and builds the same output as translate_string."""
+    result = deabbreviator.analyze("Btw, BTW idk. hello")
+    assert result.spans == ((0, 3), (5, 8), (9, 12))
+    assert result.words == ("Btw", "BTW", "idk")
+    assert result.counts == {"btw": 2, "idk": 1}
+    assert result.changed
+    assert result.output == "By the way, BY THE WAY I don't know. hello"
+    assert not deabbreviator.analyze("hello there")
+    assert not deabbreviator.analyze("hello there").changed
+    text = "Hey there! btw, I'll be late idk maybe 30min? " * 20
+    assert deabbreviator.analyze(text).output == deabbreviator.translate_string(text)
+
+
+def test_dictionary_watcher(tmp_path: Path, loop: asyncio.AbstractEventLoop) -> None:
+    """Test that an edited dictionary file is swapped in and a broken one keeps the current artifact."""
+    path = tmp_path / "default.yml"
+    path.write_text("btw: by the way\n")
+    artifact = compile_artifact(load_dictionary(str(path)))
+    original = get_artifact(artifact.backend)
+    swapped: list[DictionaryArtifact] = []
+    watcher = DictionaryWatcher(str(path), artifact, swapped.append)
+    try:
+        assert loop.run_until_complete(watcher.check()) is None
+        path.write_text("btw: between\nidk: I do not know\n")
+        new = loop.run_until_complete(watcher.check())
+        assert new is not None
+        assert swapped == [new]
+        assert new.translate("btw idk") == "between I do not know"
+        assert artifact.translate("btw idk") == "by the way idk"
+        path.write_text("btw: [broken")
+        assert loop.run_until_complete(watcher.check()) is None
+        assert watcher.artifact is new
+    finally:
+        install_artifact(original)
+
+
+def test_dictionary_watcher_compact(tmp_path: Path, loop: asyncio.AbstractEventLoop) -> None:
+    """Test that a reloaded compact dictionary is mapped from its file, which the stored artifact refers to by path."""
+    path = tmp_path / "default.yml"
+    path.write_text("btw: by the way\n")
+    artifact_path = str(tmp_path / "deabbreviator.pickle")
+    artifact = compile_artifact(load_dictionary(str(path)), "dawg")
+    original = get_artifact("dawg")
+    watcher = DictionaryWatcher(str(path), artifact, lambda _: None, artifact_path=artifact_path)
+    try:
+        path.write_text("btw: between\nidk: I do not know\n")
+        new = loop.run_until_complete(watcher.check())
+        assert new is not None
+        assert isinstance(new.abbreviations, CompactDictionary)
+        assert new.abbreviations.path == os.path.abspath(f"{artifact_path}.dawg")
+        assert new.translate("btw idk") == "between I do not know"
+        stored = DictionaryArtifact.load(artifact_path)
+        assert stored is not None
+        assert stored.version == new.version
+        assert isinstance(stored.abbreviations, CompactDictionary)
+        assert stored.abbreviations.path == new.abbreviations.path
+    finally:
+        install_artifact(original)
+
+
+def test_protected_segments(deabbreviator: Deabbreviator) -> None:
+    """Test that code, links, mentions, emoji and timestamps are left untouched."""
+    for text in (
+        "`btw`",
+        "``idk ` btw``",
+        "```py\nbtw = idk\n```",
+        "https://example.com/msg/btw?idk=1",
+        "<https://example.com/btw>",
+        "<@123> <@!123> <@&123> <#123>",
+        "<:btw:123> <a:idk:123> :btw:",
+        "</btw idk:123> <t:1700000000:R>",
+    ):
+        assert deabbreviator.translate_string(text) == text
+        assert not deabbreviator.analyze(text).changed
+    text = "btw `btw` https://example.com/msg btw <@123> idk"
+    expected = "by the way `btw` https://example.com/msg by the way <@123> I don't know"
+    assert deabbreviator.translate_string(text) == expected
+    assert deabbreviator.analyze(text).output == expected
+    long_text = (text + "\n```\nidk\n```\n") * 100
+    assert "".join(iter_translate(long_text, 64, deabbreviator.artifact)) == deabbreviator.translate_string(long_text)
+
+
+def test_disambiguation(deabbreviator: Deabbreviator) -> None:
+    """Test that context rules leave ambiguous abbreviations alone and change nothing else."""
+    artifact = deabbreviator.artifact.with_context(load_context())
+    assert artifact.version != deabbreviator.artifact.version
+    assert artifact.translate("see you at 3 pm EST") == "see you at 3 pm EST"
+    assert artifact.translate("pm me later") == "private message me later"
+    assert artifact.translate("the gm said 10 k views") == "the gm said 10 k views"
+    assert artifact.translate("Gm, send ss pls") == "Good morning, send screenshot please"
+    assert artifact.analyze("3 pm, pm me").spans == ((6, 8),)
+    text = "Hey there! btw, I'll be late idk maybe 30min?"
+    assert artifact.translate(text) == deabbreviator.translate_string(text)
+
+
+def test_cached_translations(deabbreviator: Deabbreviator, loop: asyncio.AbstractEventLoop) -> None:
+    """Test that batches go through the cache and keep their order."""
+    texts = ["idk", "hello there", "brb", "idk"]
+    expected = [deabbreviator.translate_string(text) for text in texts]
+
+    async def translate() -> list[str]:
+        results = await cached_translations(deabbreviator.bot.botkit_cache, deabbreviator.artifact, texts)
+        return [text if r is None else r[0] for text, r in zip(texts, results, strict=True)]
+
+    assert loop.run_until_complete(translate()) == expected
+    # the second batch is answered from the cache
+    assert loop.run_until_complete(translate()) == expected
+
+
+async def _body(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+def test_iter_lines(loop: asyncio.AbstractEventLoop) -> None:
+    """Test that request bodies are split into lines across chunks and that long lines are dropped."""
+
+    async def lines(*chunks: bytes) -> list[bytes | None]:
+        return [line async for line in iter_lines(_body(*chunks), 8)]
+
+    assert loop.run_until_complete(lines(b"ab\nc", b"d\n", b"ef")) == [b"ab", b"cd", b"ef"]
+    assert loop.run_until_complete(lines(b"a\n0123456789", b"0123456789\nb\n")) == [b"a", None, b"b", b""]
+
+
+def test_api_artifact(tmp_path: Path, loop: asyncio.AbstractEventLoop) -> None:
+    """Test that the HTTP API translates with the dictionary and context rules of the extension configuration."""
+    path = tmp_path / "default.yml"
+    path.write_text("zzq: zebra quest\npm: private message\n")
+    original = get_artifact()
+    try:
+        api = DeabbreviatorApi({"dictionary_path": str(path), "disambiguate": True, "api_public": True})
+        results = loop.run_until_complete(api.translate(["zzq", "at 3 pm est", "pm me"]))
+        assert results == [("zebra quest", True), ("at 3 pm est", False), ("private message me", True)]
+    finally:
+        install_artifact(original)
+
+
+def test_api_bot_cache(deabbreviator: Deabbreviator, loop: asyncio.AbstractEventLoop) -> None:
+    """Test that the HTTP API writes to the cache instance of the bot, the only one sharing a memory cache's entries."""
+    cache = deabbreviator.bot.botkit_cache
+    key = cache_key(deabbreviator.artifact.version, "idk lol")
+    api = DeabbreviatorApi({"api_public": True})
+    share_cache(cache)
+    try:
+        assert api.cache is cache
+        loop.run_until_complete(api.translate(["idk lol"]))
+        assert loop.run_until_complete(cache.exists(key, namespace=NAMESPACE))
+    finally:
+        share_cache(None)
+    assert api.cache is not cache
+
+
+def test_api_tokens(loop: asyncio.AbstractEventLoop) -> None:
+    """Test that the HTTP API refuses requests without a valid token unless it is made public."""
+
+    async def status(config: dict[str, object], token: str | None = None) -> int:
+        app = Quart(__name__)
+        setup_webserver(app, None, config)  # pyright: ignore[reportArgumentType]
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        response = await app.test_client().post("/deabbreviator/translate", json={"texts": ["idk"]}, headers=headers)
+        return response.status_code
+
+    assert loop.run_until_complete(status({})) == 401
+    assert loop.run_until_complete(status({"api_public": True})) == 200
+    assert loop.run_until_complete(status({"api_tokens": ["secret"]}, "secret")) == 200
+    assert loop.run_until_complete(status({"api_tokens": ["secret"]}, "other")) == 401
+
+
+def test_api_stream_slot(loop: asyncio.AbstractEventLoop) -> None:
+    """Test that a stream gives its slot back once it is answered, and when it is dropped before it was sent."""
+    api = DeabbreviatorApi({"api_concurrency": 1, "api_public": True})
+    slot = api.limiter.acquire("client")
+    assert slot is not None
+    assert api.limiter.acquire("client") is None
+    stream = api.stream(slot, _body(b'{"text": "idk"}\n'))
+    del slot
+    assert api.limiter.active == {"client": 1}
+    # the client disconnected before the response was sent
+    del stream
+    assert not api.limiter.active
+
+    async def answer() -> list[bytes]:
+        stream = api.stream(api.limiter.acquire("client"), _body(b'{"text": "idk"}\n'))  # pyright: ignore[reportArgumentType]
+        return [line async for line in stream]
+
+    assert loop.run_until_complete(answer()) == [b'{"text":"I don\'t know","changed":true}\n']
+    assert not api.limiter.active
+
+
+def test_history_export(deabbreviator: Deabbreviator, loop: asyncio.AbstractEventLoop) -> None:
+    """Test that channel history is exported oldest first across several pages."""
+    contents = [f"line {i} idk" if i % 3 == 0 else f"line {i}" for i in range(250)]
+
+    class Channel:
+        async def history(self, limit: int) -> AsyncIterator[SimpleNamespace]:
+            # newest first, like Discord
+            for content in reversed(contents[-limit:]):
+                yield SimpleNamespace(
+                    content=content,
+                    created_at=datetime(2026, 1, 1, tzinfo=UTC),
+                    author=SimpleNamespace(display_name="user"),
+                )
+
+    exporter = HistoryExporter(deabbreviator.cached_translations)
+    file, changed = loop.run_until_complete(exporter.export(Channel(), deabbreviator.artifact, 200))  # pyright: ignore[reportArgumentType]
+    lines = file.read().decode().splitlines()
+    assert len(lines) == 200
+    assert lines[0] == "[2026-01-01 00:00] user: line 50"
+    # the boundary between the two pages
+    assert lines[99] == "[2026-01-01 00:00] user: line 149"
+    assert lines[100] == f"[2026-01-01 00:00] user: line 150 {deabbreviator.translate_string('idk')}"
+    assert lines[-1] == f"[2026-01-01 00:00] user: line 249 {deabbreviator.translate_string('idk')}"
+    assert lines[1] == f"[2026-01-01 00:00] user: line 51 {deabbreviator.translate_string('idk')}"
+    assert changed == sum(1 for content in contents[-200:] if "idk" in content)
+
+
+def test_confusable_folding(deabbreviator: Deabbreviator) -> None:
+    """Test that look-alikes of abbreviations are expanded and that the rest of the text keeps its characters."""
+    assert deabbreviator.translate_string("ｂｔｗ café") == "by the way café"
+    assert deabbreviator.translate_string("𝐁𝐓𝐖, naïve") == "BY THE WAY, naïve"
+    assert deabbreviator.translate_string("ïdk `ｉｄｋ`") == "I don't know `ｉｄｋ`"
+    assert deabbreviator.translate_string("привет") == "привет"
+    result = deabbreviator.analyze("ok ｂｔｗ")
+    assert result.spans == ((0, 2), (3, 6))
+    assert result.keys == ("ok", "btw")
+
+
+def test_preview_cache(deabbreviator: Deabbreviator) -> None:
+    """Test that previews built keystroke by keystroke match a full translation."""
+    artifact = deabbreviator.artifact.with_context(load_context())
+    previews = PreviewCache()
+    text = "idk what u  mean, btw at 3 pm est or ｐｍ me"
+    for end in [*range(1, len(text) + 1), len(text) - 5, len(text)]:
+        assert previews.preview(1, artifact, text[:end]) == artifact.translate(text[:end])
+    assert previews.preview(1, artifact, "idk " * 30) is None
+
+
+def test_latency_histogram() -> None:
+    """Test that latencies are counted in their bucket and that quantiles return the upper bound of a bucket."""
+    histogram = LatencyHistogram((0.001, 0.01))
+    for seconds in (0.0005, 0.0005, 0.005, 0.5):
+        histogram.record(seconds)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.quantile(0.5) == 0.001
+    assert histogram.quantile(0.99) == float("inf")
+
+
+def test_translate_file(deabbreviator: Deabbreviator, tmp_path: Path) -> None:
+    """Test that a file translated in small chunks matches the translation of its whole text."""
+    artifact = deabbreviator.artifact.with_context(load_context())
+    text = "idk\n`a\nb idk` u\n3\npm est\n```\nbtw\n\nidk\n```\nbtw ｂｔｗ `\nok\n" * 20 + "lol"
+    data = text.encode() + b"\xff idk"
+    path = tmp_path / "log.txt"
+    path.write_bytes(data)
+    for size in (4, 16, 64, 4096):
+        start = 0
+        while start < len(data):
+            end = chunk_end(data, start, size)
+            assert end > start
+            start = end
+        with path.open("rb") as source:
+            output, counts = translate_file(source, artifact, size)
+        assert output.read() == artifact.translate(data.decode(errors="surrogateescape")).encode(
+            errors="surrogateescape"
+        )
+        assert counts["idk"] == artifact.analyze(text).counts["idk"] + 1
+
+
+def test_attachment_translator(deabbreviator: Deabbreviator, loop: asyncio.AbstractEventLoop) -> None:
+    """Test that attachments are streamed in chunks and given up on once larger than the limit."""
+    data = b"idk what u mean\nbtw"
+    downloads: list[str] = []
+
+    async def serve(request: web.Request) -> web.StreamResponse:
+        downloads.append(request.path)
+        if request.path == "/missing.txt":
+            raise web.HTTPNotFound
+        response = web.StreamResponse()
+        await response.prepare(request)
+        # the body arrives in several chunks, twice over for the file larger than it was announced
+        for _ in range(2 if request.path == "/big.txt" else 1):
+            for line in data.splitlines(keepends=True):
+                await response.write(line)
+        await response.write_eof()
+        return response
+
+    def attachment(size: int, url: str) -> discord.Attachment:
+        payload = {"id": 1, "size": size, "filename": "log.txt", "url": url}
+        return discord.Attachment(data=payload, state=SimpleNamespace(http=None))  # pyright: ignore[reportArgumentType]
+
+    async def run() -> None:
+        app = web.Application()
+        app.router.add_get("/{name}", serve)
+        async with TestServer(app) as server:
+            translator = AttachmentTranslator(max_size=len(data))
+            url = str(server.make_url("/log.txt"))
+            assert is_text_attachment(attachment(len(data), url))
+            translated = await translator.translate(attachment(len(data), url), deabbreviator.artifact)
+            assert translated is not None
+            file, changed = translated
+            assert file.read() == deabbreviator.translate_string(data.decode()).encode()
+            assert changed == 3
+            # announced larger than the limit, which is never downloaded
+            assert await translator.translate(attachment(len(data) + 1, url), deabbreviator.artifact) is None
+            # announced within the limit, but streamed past it
+            big = str(server.make_url("/big.txt"))
+            assert await translator.translate(attachment(len(data), big), deabbreviator.artifact) is None
+            with pytest.raises(discord.HTTPException):
+                await translator.translate(attachment(1, str(server.make_url("/missing.txt"))), deabbreviator.artifact)
+            await translator.session.close()
+        assert downloads == ["/log.txt", "/big.txt", "/missing.txt"]
+
+    loop.run_until_complete(run())
+
+
+def test_webhook_relay(loop: asyncio.AbstractEventLoop) -> None:
+    """Test that relay webhooks are created once and then found in memory, in the cache, or on the channel."""
+    bot_user = SimpleNamespace(id=1)
+    bot = SimpleNamespace(user=bot_user)
+    cache = custom.make_cache()
+    calls: list[str] = []
+
+    class Channel:
+        id = 10
+
+        def __init__(self) -> None:
+            self.hooks: list[SimpleNamespace] = [SimpleNamespace(id=99, token=None, user=SimpleNamespace(id=2))]
+
+        async def webhooks(self) -> list[SimpleNamespace]:
+            calls.append("webhooks")
+            return self.hooks
+
+        async def create_webhook(self, name: str, reason: str) -> SimpleNamespace:  # noqa: ARG002
+            calls.append("create")
+            self.hooks.append(SimpleNamespace(id=100, token=f"token{len(self.hooks)}", user=bot_user))
+            return self.hooks[-1]
+
+    async def resolve() -> list[int]:
+        channel = Channel()
+        relay, other = WebhookRelay(bot, cache), WebhookRelay(bot, cache)  # pyright: ignore[reportArgumentType]
+        ids = [(await relay.webhook(channel)).id for _ in range(2)]  # pyright: ignore[reportArgumentType]
+        # another process shares the cache
+        ids.append((await other.webhook(channel)).id)  # pyright: ignore[reportArgumentType]
+        # a webhook deleted from the cache is found again on the channel
+        await relay.forget(channel.id)
+        ids.append((await relay.webhook(channel)).id)  # pyright: ignore[reportArgumentType]
+        await relay.session.close()
+        await other.session.close()
+        return ids
+
+    assert loop.run_until_complete(resolve()) == [100, 100, 100, 100]
+    assert calls == ["webhooks", "create", "webhooks"]
+
+
+def test_reanalyze(deabbreviator: Deabbreviator) -> None:
+    """Test that matching only around an edit finds the same matches as analyzing the edited text."""
+    artifact = deabbreviator.artifact.with_context(load_context())
+    text = "idk what u mean, at 3 pm est ｂｔｗ\npm me ok"
+    edits = ["idk what u mean, at 3 pm est ｂｔｗ\npm me lol", "idk what you mean, at 3 pm est ｂｔｗ\npm me ok"]
+    edits += ["idk what u mean, at 3 pm ｂｔｗ\npm me ok", "idk what u mean, at pm est ｂｔｗ\npm me ok", "ok", ""]
+    edits += ["idk what u mean, at 3 pm est ｂｔｗ pm me ok", "idk whatu mean, at 3 pm est ｂｔｗ\npm me ok"]
+    for edited in edits:
+        assert reanalyze(artifact, text, artifact.analyze(text).spans, edited) == artifact.analyze(edited).spans
+
+
+def test_edit_tracker(deabbreviator: Deabbreviator, loop: asyncio.AbstractEventLoop) -> None:
+    """Test that edits update a shared reply only when the translation changes, and delete it once it is empty."""
+    artifact = deabbreviator.artifact
+    contents: list[str] = []
+
+    class Reply:
+        deleted = False
+
+        async def edit(self, content: str, **_: object) -> None:
+            contents.append(content)
+
+        async def delete(self) -> None:
+            self.deleted = True
+
+    def message(message_id: int, content: str) -> SimpleNamespace:
+        return SimpleNamespace(id=message_id, content=content)
+
+    async def edit(message_id: int, content: str) -> bool:
+        return await tracker.update(message(message_id, content), artifact)  # pyright: ignore[reportArgumentType]
+
+    tracker = EditTracker(lambda m, output: f"{m.id}: {output}")
+    reply = Reply()
+    first, second = message(1, "idk"), message(2, "btw")
+    tracker.track(reply, [(m, artifact, artifact.analyze(m.content)) for m in (first, second)])  # pyright: ignore[reportArgumentType]
+    idk, btw, lol = (deabbreviator.translate_string(key) for key in ("idk", "btw", "lol"))
+    assert loop.run_until_complete(edit(1, "idk lol"))
+    assert contents == [f"1: {idk} {lol}\n2: {btw}"]
+    # the author expanded the abbreviation themselves, the reply already says so
+    assert not loop.run_until_complete(edit(1, f"{idk} lol"))
+    assert loop.run_until_complete(edit(2, "hi"))
+    assert contents[-1] == f"1: {idk} {lol}"
+    assert loop.run_until_complete(edit(1, "hello"))
+    assert reply.deleted
+    assert len(tracker) == 0
+
+
 if __name__ == "__main__":
     pytest.main([__file__])